@@ -33,7 +33,7 @@ setup(
                       "sphinx-rtd-theme",
                       ],
     # ext_modules=cythonize("*.pyx", language_level=3),
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     description="simulate and animate supersolids.",
     long_description=long_description,
     long_description_content_type="text/markdown"
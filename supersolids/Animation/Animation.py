@@ -9,7 +9,10 @@
 Base class for Animations
 
 """
-from typing import Optional, Callable
+import time
+from typing import Optional, Callable, Tuple
+
+import numpy as np
 
 from supersolids.helper import functions
 
@@ -26,6 +29,8 @@ class Animation:
                  camera_phi_func: Optional[Callable] = None,
                  camera_z_func: Optional[Callable] = None,
                  filename: str = "split.mp4",
+                 steps_per_frame: int = 1,
+                 frame_budget: Optional[float] = None,
                  ):
         """
         Base class with configured properties for the animation.
@@ -53,6 +58,12 @@ class Animation:
 
         :param filename: Filename with filetype to save the movie to
 
+        :param steps_per_frame: Number of time steps done between two drawn frames.
+
+        :param frame_budget: If not None, wall-clock seconds after which the time steps
+            for a frame are stopped early (at least one step is done),
+            so the view stays responsive for expensive steps.
+
         """
         self.Res = Res
         self.dim = Res.dim
@@ -68,3 +79,44 @@ class Animation:
         self.camera_z_func: Optional[Callable] = camera_z_func
 
         self.filename: str = filename
+
+        self.steps_per_frame: int = steps_per_frame
+        self.frame_budget: Optional[float] = frame_budget
+
+    def advance(self, System, accuracy: float = 10 ** -6,
+                steps_max: Optional[int] = None) -> Tuple[float, int, bool]:
+        """
+        Does the time steps of System between two drawn frames
+        (see steps_per_frame and frame_budget).
+        Convergence and divergence are checked after every single step.
+
+        :param System: Schrödinger equations for the specified system
+
+        :param accuracy: Convergence is reached when relative error of mu is smaller
+            than accuracy, where :math:`\mu = - \\log(\psi_{normed}) / (2 dt)`
+
+        :param steps_max: If not None, maximum number of steps to do
+            (e.g. the steps left until max_timesteps)
+
+        :return: mu_rel of the last step, number of steps done
+            and if the System converged or diverged
+
+        """
+        steps = self.steps_per_frame
+        if steps_max is not None:
+            steps = min(steps, steps_max)
+
+        mu_rel = np.nan
+        time_start = time.perf_counter()
+        for step in range(1, steps + 1):
+            mu_old = System.mu
+            System.time_step()
+            mu_rel = np.abs((System.mu - mu_old) / System.mu)
+
+            if (mu_rel < accuracy) or np.isnan(mu_rel):
+                return mu_rel, step, True
+            if ((self.frame_budget is not None)
+                    and (time.perf_counter() - time_start >= self.frame_budget)):
+                return mu_rel, step, False
+
+        return mu_rel, steps, False
@@ -9,9 +9,10 @@
 Implements an Animation with matplotlib (for Systems in 1D or 2D).
 
 """
+import math
 import sys
 from os import sep
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 
 import numpy as np
 from matplotlib import animation, cm
@@ -20,16 +21,35 @@ from matplotlib import pyplot as plt
 from supersolids.Animation import Animation
 from supersolids.Schroedinger import Schroedinger
 from supersolids.helper import functions
+from supersolids.helper.segment_encoder import SegmentWriter
+from supersolids.helper.video_sink import SinkWriter
+
+
+# ways to draw 2D systems: 3D surface with contours or heatmap (fast)
+render_modes_2d: List[str] = ["surface", "heatmap"]
 
 
 class MatplotlibAnimation(Animation.Animation):
-    def __init__(self, Anim: Animation.Animation):
+    def __init__(self, Anim: Animation.Animation,
+                 render_2d: str = "surface",
+                 lod_max: int = 512,
+                 clim: Optional[Tuple[float, float]] = None,
+                 ):
         """
         Creates an Animation for a Schroedinger equation for the 1D or 2D case.
         Methods need the object Schroedinger with the parameters of the equation
 
         :param Anim: Base class Animation with configured properties for the animation.
 
+        :param render_2d: For 2D, "surface" recreates a 3D surface with contours each frame,
+            "heatmap" keeps one image, whose data is updated (much faster).
+
+        :param lod_max: For the heatmap, maximum number of shown grid points per direction.
+            Finer grids are downsampled by striding.
+
+        :param clim: For the heatmap, color limits of :math:`|\psi|^2`.
+            If None, the limits of the first frame are used.
+
         """
         super().__init__(Res=Anim.Res,
                          plot_psi_sol=Anim.plot_psi_sol,
@@ -41,12 +61,25 @@ class MatplotlibAnimation(Animation.Animation):
                          camera_phi_func=Anim.camera_phi_func,
                          camera_z_func=Anim.camera_z_func,
                          filename=Anim.filename,
+                         steps_per_frame=Anim.steps_per_frame,
+                         frame_budget=Anim.frame_budget,
                          )
 
         assert 1 <= self.dim <= 2, ("Spatial dimension needs to be 1 or 2, "
                                     f"but it is {self.dim}."
                                     "This is not implemented.")
         self.dim = self.Res.dim
+        # time steps left for the animation, set by start
+        self.steps_left: Optional[int] = None
+
+        assert render_2d in render_modes_2d, (f"render_2d needs to be one of "
+                                              f"{render_modes_2d}, but it is {render_2d}.")
+        self.render_2d: str = render_2d
+        self.lod_max: int = lod_max
+        self.clim: Optional[Tuple[float, float]] = clim
+        # index slices of the shown part of the grid (2D), computed once
+        self.crop_slices: Optional[Tuple[slice, slice]] = None
+        self.psi_image = None
 
         # matplotlib
         if self.dim == 1:
@@ -67,6 +100,14 @@ class MatplotlibAnimation(Animation.Animation):
                 ax.legend(prop=dict(size=12))
                 ax.grid()
 
+        elif (self.dim == 2) and (self.render_2d == "heatmap"):
+            self.fig = plt.figure()
+            self.ax = self.fig.add_subplot(111)
+
+            self.title = self.ax.set_title("")
+            self.ax.set_xlabel(r'$x$')
+            self.ax.set_ylabel(r'$y$')
+
         elif self.dim == 2:
             self.fig = plt.figure()
             self.ax = self.fig.add_subplot(111, projection='3d')
@@ -194,6 +235,68 @@ class MatplotlibAnimation(Animation.Animation):
 
         return V_pos, V_plot_val
 
+    def get_steps_total(self, System: Schroedinger) -> int:
+        """
+        Number of time steps of the animation. As FuncAnimation shows the
+        initial state for frame_index 0 and 1, max_timesteps - 2 steps are done.
+
+        """
+        return max(0, System.max_timesteps - 2)
+
+    def get_frames(self, System: Schroedinger) -> int:
+        """
+        Number of frames needed to do all time steps with steps_per_frame steps per frame.
+        With a frame_budget less steps may be done per frame,
+        then the animation ends before max_timesteps.
+
+        """
+        return 2 + math.ceil(self.get_steps_total(System) / self.steps_per_frame)
+
+    def get_plot_data(self, System: Schroedinger) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Positions and values of :math:`|\psi|^2` to plot for the current state of System.
+        In 2D the mesh is cropped to the plot limits.
+
+        :param System: Defines the Schroedinger equation for a given problem
+
+        :return: Tuple of positions and :math:`|\psi|^2` at these positions
+
+        """
+        if System.dim == 1:
+            return System.x, np.abs(System.psi_val) ** 2.0
+
+        # here we crop the calculated mesh to the viewable mesh,
+        # but the rest is still calculated to not change
+        # the boundary conditions. Essentially we just zoom.
+        if self.crop_slices is None:
+            self.crop_slices = self.get_crop_slices(System)
+        rows, cols = self.crop_slices
+
+        return System.pos[rows, cols], np.abs(System.psi_val[rows, cols]) ** 2.0
+
+    def get_crop_slices(self, System: Schroedinger) -> Tuple[slice, slice]:
+        """
+        Index slices of the 2D grid (rows are y, columns are x) inside the plot limits.
+        For the heatmap the slices stride, so at most lod_max points per direction are shown.
+
+        :param System: Defines the Schroedinger equation for a given problem
+
+        :return: Slices for the rows and columns of System.psi_val
+
+        """
+        x_lim = self.ax.get_xlim()
+        y_lim = self.ax.get_ylim()
+        cols = np.flatnonzero((x_lim[0] <= System.x) & (System.x <= x_lim[1]))
+        rows = np.flatnonzero((y_lim[0] <= System.y) & (System.y <= y_lim[1]))
+
+        stride_rows, stride_cols = 1, 1
+        if self.render_2d == "heatmap":
+            stride_rows = max(1, math.ceil(len(rows) / self.lod_max))
+            stride_cols = max(1, math.ceil(len(cols) / self.lod_max))
+
+        return (slice(int(rows[0]), int(rows[-1]) + 1, stride_rows),
+                slice(int(cols[0]), int(cols[-1]) + 1, stride_cols))
+
     def animate(self, frame_index: int,
                 System: Schroedinger,
                 accuracy: float = 10 ** -6,
@@ -218,6 +321,91 @@ class MatplotlibAnimation(Animation.Animation):
                                         "but Animation.dim is {self.dim} "
                                         f"and Schroedinger.dim is {System.dim}")
 
+        # FuncAnimation calls animate 3 times with frame_index=0,
+        # so we want to start plotting with frame_index=1,
+        # and do time steps from upon the next frame, hence frame_index>=2
+        if frame_index >= 2:
+            mu_rel, steps_done, stop = self.advance(System, accuracy=accuracy,
+                                                    steps_max=self.steps_left)
+            if self.steps_left is not None:
+                self.steps_left -= steps_done
+            print(f"mu_rel: {mu_rel}")
+            if stop:
+                print(f"accuracy reached: {mu_rel}")
+                self.anim.event_source.stop()
+
+        psi_pos, psi_prob = self.get_plot_data(System)
+
+        return self.draw(frame_index, System, psi_pos, psi_prob, System.t)
+
+    def animate_cached(self, frame_index: int, System: Schroedinger):
+        """
+        Draws the frame from the frame cache filled by :meth:`record`,
+        without any time steps of System.
+
+        :param frame_index: Current index of frame (same meaning as in :meth:`animate`)
+
+        :param System: Schroedinger equation used for the constant parts of the plot
+
+        """
+        cache_index = max(0, frame_index - 1)
+
+        return self.draw(frame_index, System, self.cache_pos,
+                         self.frame_cache[cache_index], self.frame_times[cache_index])
+
+    def record(self, System: Schroedinger, accuracy: float = 10 ** -6) -> None:
+        """
+        Runs the solver once (same steps as :meth:`animate` would do)
+        and caches the data to plot for each frame,
+        so the animation can be rendered and saved without time steps.
+
+        :param System: Defines the Schroedinger equation for a given problem
+
+        :param accuracy: Convergence is reached when relative error of mu is smaller
+            than accuracy, where :math:`\mu = - \\log(\psi_{normed}) / (2 dt)`
+
+        """
+        self.cache_pos, psi_prob = self.get_plot_data(System)
+        self.frame_cache: List[np.ndarray] = [psi_prob]
+        self.frame_times: List[float] = [System.t]
+
+        steps_left = self.get_steps_total(System)
+        while steps_left > 0:
+            mu_rel, steps_done, stop = self.advance(System, accuracy=accuracy,
+                                                    steps_max=steps_left)
+            steps_left -= steps_done
+
+            # positions are the same for every frame
+            _, psi_prob = self.get_plot_data(System)
+            self.frame_cache.append(psi_prob)
+            self.frame_times.append(System.t)
+
+            if len(self.frame_cache) % 10 == 0:
+                print(f"Recorded {len(self.frame_cache)}, mu_rel: {mu_rel}")
+            if stop:
+                print(f"accuracy reached: {mu_rel}")
+                break
+
+    def draw(self, frame_index: int,
+             System: Schroedinger,
+             psi_pos: np.ndarray,
+             psi_prob: np.ndarray,
+             t: float,
+             ):
+        """
+        Draws :math:`|\psi|^2` given by psi_pos and psi_prob.
+
+        :param frame_index: Current index of frame
+
+        :param System: Schroedinger equation used for the constant parts of the plot
+
+        :param psi_pos: Positions to plot (see :meth:`get_plot_data`)
+
+        :param psi_prob: :math:`|\psi|^2` at psi_pos
+
+        :param t: Time of the frame
+
+        """
         # As V is constant, calculate and plot it just one time (at first
         # frame)
         if frame_index == 0:
@@ -225,6 +413,16 @@ class MatplotlibAnimation(Animation.Animation):
                 if self.plot_V:
                     self.V_pos, self.V_plot_val = self.get_V_plot_values(
                         0, 0, System, reserve=1.0)
+            elif (System.dim == 2) and (self.render_2d == "heatmap"):
+                if self.plot_V:
+                    # static contour lines of the trap
+                    rows, cols = self.get_crop_slices(System)
+                    self.V_line = self.ax.contour(System.pos[rows, cols, 0],
+                                                  System.pos[rows, cols, 1],
+                                                  System.V_val[rows, cols],
+                                                  levels=10,
+                                                  cmap=cm.Blues,
+                                                  alpha=self.alpha_V)
             elif System.dim == 2:
                 if self.plot_V:
                     self.V_pos, self.V_plot_val = self.get_V_plot_values(
@@ -253,38 +451,46 @@ class MatplotlibAnimation(Animation.Animation):
         # causing problems with removing corresponding plot_lines
         # so we want to start plotting with frame_index=1,
         # and delete from upon the next frame, hence frame_index>=2
-        if frame_index >= 2:
-            if System.dim == 2:
-                # Delete old plot, if it exists
-                self.psi_line.remove()
-
-                # Delete old contours, if they exists.
-                # psi_x_line is a ContourPlotSet without remove,
-                # collections gives a list of PolyColletion with remove
-                for contour in self.psi_x_line.collections:
-                    contour.remove()
-                for contour in self.psi_y_line.collections:
-                    contour.remove()
-                for contour in self.psi_z_line.collections:
-                    contour.remove()
-
-            mu_old = System.mu
-            System.time_step()
-            mu_rel = np.abs((System.mu - mu_old) / System.mu)
-            print(f"mu_rel: {mu_rel}")
-            if mu_rel < accuracy:
-                print(f"accuracy reached: {mu_rel}")
-                self.anim.event_source.stop()
+        if (frame_index >= 2) and (System.dim == 2) and (self.render_2d == "surface"):
+            # Delete old plot, if it exists
+            self.psi_line.remove()
+
+            # Delete old contours, if they exists.
+            # psi_x_line is a ContourPlotSet without remove,
+            # collections gives a list of PolyColletion with remove
+            for contour in self.psi_x_line.collections:
+                contour.remove()
+            for contour in self.psi_y_line.collections:
+                contour.remove()
+            for contour in self.psi_z_line.collections:
+                contour.remove()
 
         if frame_index % 10 == 0:
             print(f"Round {frame_index}")
 
         if System.dim == 1:
-            self.psi_line.set_data(System.x, np.abs(System.psi_val) ** 2.0)
+            self.psi_line.set_data(psi_pos, psi_prob)
             if self.plot_V:
                 self.V_line.set_data(self.V_pos, self.V_plot_val)
             if self.plot_psi_sol:
                 self.psi_sol_line.set_data(System.x, System.psi_sol_val)
+        elif (System.dim == 2) and (self.render_2d == "heatmap"):
+            if self.psi_image is None:
+                extent = [psi_pos[0, 0, 0], psi_pos[0, -1, 0],
+                          psi_pos[0, 0, 1], psi_pos[-1, 0, 1]]
+                self.psi_image = self.ax.imshow(psi_prob,
+                                                origin="lower",
+                                                extent=extent,
+                                                aspect="auto",
+                                                interpolation="nearest",
+                                                cmap=cm.viridis,
+                                                alpha=self.alpha_psi,
+                                                )
+                if self.clim is not None:
+                    self.psi_image.set_clim(*self.clim)
+                self.fig.colorbar(self.psi_image, ax=self.ax)
+            else:
+                self.psi_image.set_data(psi_prob)
         elif System.dim == 2:
             if frame_index >= 1:
                 # rotate camera
@@ -299,14 +505,6 @@ class MatplotlibAnimation(Animation.Animation):
                 self.ax.azim = camera_phi
                 self.ax.elev = camera_z
 
-                # here we crop the calculated mesh to the viewable mesh,
-                # but the rest is still calculated to not change
-                # the boundary conditions. Essentially we just zoom.
-                psi_pos, psi_val = crop_pos_to_limits(self.ax,
-                                                      System.pos,
-                                                      System.psi,
-                                                      func_val=System.psi_val)
-                psi_prob = np.abs(psi_val) ** 2.0
                 self.psi_line = self.ax.plot_surface(psi_pos[:, :, 0],
                                                      psi_pos[:, :, 1],
                                                      psi_prob,
@@ -352,10 +550,12 @@ class MatplotlibAnimation(Animation.Animation):
         self.title.set_text(f"g = {System.g:.2}, dt = {System.dt:.6}, "
                             f"max_timesteps = {System.max_timesteps:d}, "
                             f"imag_time = {System.imag_time},\n"
-                            f"t = {System.t:02.05f}")
+                            f"t = {t:02.05f}")
 
         if System.dim == 1:
             return self.psi_line, self.V_line, self.psi_sol_line, self.title
+        elif self.render_2d == "heatmap":
+            return self.psi_image, self.title
         else:
             if self.plot_V:
                 if frame_index == 0:
@@ -370,6 +570,12 @@ class MatplotlibAnimation(Animation.Animation):
 
     def start(self, System: Schroedinger,
               accuracy: float = 10 ** -6,
+              video_sink: bool = False,
+              framerate: int = 15,
+              vcodec: str = "libx264",
+              crf: Optional[int] = None,
+              frames_per_segment: Optional[int] = None,
+              record_first: bool = False,
               ):
         """
         Sets the plot limits appropriate,
@@ -380,6 +586,24 @@ class MatplotlibAnimation(Animation.Animation):
 
         :param System: Defines the Schroedinger equation for a given problem
 
+        :param video_sink: If True, the frames are piped directly into ffmpeg
+            (see :class:`supersolids.helper.video_sink.VideoSink`)
+
+        :param framerate: Frames per second of the movie
+
+        :param vcodec: Video codec used by ffmpeg
+
+        :param crf: Constant rate factor (quality, lower is better),
+            None for the default of the codec
+
+        :param frames_per_segment: If not None, the movie is encoded in segments
+            of this length on multiple processes
+            (see :class:`supersolids.helper.segment_encoder.SegmentEncoder`)
+
+        :param record_first: If True, the solver runs first and the data to plot
+            is cached (see :meth:`record`), then the movie is rendered from the cache
+            without any time steps.
+
         """
         assert isinstance(System, Schroedinger), (
             f"System needs to be {Schroedinger},"
@@ -390,17 +614,38 @@ class MatplotlibAnimation(Animation.Animation):
                                         f"and Schroedinger.dim is {System.dim}")
 
         # blit=True means only re-draw the parts that have changed.
-        self.anim = animation.FuncAnimation(self.fig, self.animate,
-                                            fargs=(System,
-                                                   accuracy),
-                                            frames=System.max_timesteps,
-                                            interval=30,
-                                            blit=True,
-                                            cache_frame_data=False)
+        if record_first:
+            self.record(System, accuracy=accuracy)
+            # frame_index 0 and 1 both show the initial state (see animate)
+            self.anim = animation.FuncAnimation(self.fig, self.animate_cached,
+                                                fargs=(System,),
+                                                frames=len(self.frame_cache) + 1,
+                                                interval=30,
+                                                blit=True,
+                                                cache_frame_data=False)
+        else:
+            self.steps_left = self.get_steps_total(System)
+            self.anim = animation.FuncAnimation(self.fig, self.animate,
+                                                fargs=(System,
+                                                       accuracy),
+                                                frames=self.get_frames(System),
+                                                interval=30,
+                                                blit=True,
+                                                cache_frame_data=False)
 
         # requires either mencoder or ffmpeg to be installed on your system
-        self.anim.save("results" + sep + self.filename,
-                       fps=15, dpi=300, extra_args=['-vcodec', 'libx264'])
+        if video_sink:
+            writer = SinkWriter(fps=framerate, vcodec=vcodec, crf=crf)
+        elif frames_per_segment is not None:
+            writer = SegmentWriter(fps=framerate, vcodec=vcodec, crf=crf,
+                                   frames_per_segment=frames_per_segment)
+        else:
+            extra_args = ["-vcodec", vcodec]
+            if crf is not None:
+                extra_args += ["-crf", str(crf)]
+            writer = animation.FFMpegWriter(fps=framerate, extra_args=extra_args)
+
+        self.anim.save("results" + sep + self.filename, writer=writer, dpi=300)
 
 
 def plot_2d(resolution=32,
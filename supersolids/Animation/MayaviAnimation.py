@@ -11,8 +11,8 @@ Functions for Potential and initial wave function :math:`\psi_0`
 """
 import zipfile
 
-import dill
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
 from ffmpeg import input
@@ -21,6 +21,11 @@ from mayavi import mlab
 from supersolids.Animation import Animation
 from supersolids.Schroedinger import Schroedinger
 from supersolids.helper import functions, constants, get_path
+from supersolids.helper.isosurface import load_mesh
+from supersolids.helper.live_solver import LiveSolver
+from supersolids.helper.prefetch import FramePrefetcher
+from supersolids.helper.segment_encoder import encode_parallel
+from supersolids.helper.video_sink import VideoSink
 
 
 def axes_style():
@@ -41,6 +46,7 @@ class MayaviAnimation(Animation.Animation):
                  slice_indices: np.ndarray = [0, 0, 0],
                  dir_path: Path = Path.home().joinpath("supersolids", "results"),
                  offscreen: bool = False,
+                 video_sink: bool = False,
                  ):
         """
         Creates an Animation with mayavi for a Schroedinger equation
@@ -56,6 +62,10 @@ class MayaviAnimation(Animation.Animation):
 
         :param dir_path: Path where to look for old directories (movie data)
 
+        :param video_sink: If True, the frames are piped directly into ffmpeg
+            (see :class:`supersolids.helper.video_sink.VideoSink`)
+            instead of being saved as pictures by the movie_maker.
+
         """
         super().__init__(Res=Anim.Res,
                          plot_psi_sol=Anim.plot_psi_sol,
@@ -67,6 +77,8 @@ class MayaviAnimation(Animation.Animation):
                          camera_phi_func=Anim.camera_phi_func,
                          camera_z_func=Anim.camera_z_func,
                          filename=Anim.filename,
+                         steps_per_frame=Anim.steps_per_frame,
+                         frame_budget=Anim.frame_budget,
                          )
 
         if not dir_path.is_dir():
@@ -77,6 +89,9 @@ class MayaviAnimation(Animation.Animation):
         self.offscreen = offscreen
         # dir_path need to be saved to access it after the figure closed
         self.dir_path = dir_path
+        self.video_sink: bool = video_sink
+        self.sink: Optional[VideoSink] = None
+        self.live_solver: Optional[LiveSolver] = None
 
         if not self.offscreen:
             mlab.options.offscreen = self.offscreen
@@ -86,21 +101,48 @@ class MayaviAnimation(Animation.Animation):
             # anti_aliasing default is 8,
             # and removes res issues when downscaling, but takes longer
             self.fig.scene.anti_aliasing_frames = 8
-            self.fig.scene.movie_maker.record = True
+            self.fig.scene.movie_maker.record = not self.video_sink
             # set dir_path to save images to
             self.fig.scene.movie_maker.directory = dir_path
 
             self.fig.scene.show_axes = True
 
+    def open_sink(self, input_path: Path) -> None:
+        """
+        Starts the video sink for the movie in input_path, if video_sink is used.
+
+        """
+        if self.video_sink:
+            if not input_path.is_dir():
+                input_path.mkdir(parents=True)
+            self.sink = VideoSink(Path(input_path, self.filename))
+
+    def capture(self) -> None:
+        """
+        Pipes the current scene into the video sink, if it is used.
+        The screenshots follow the window size, if the window is resized while recording,
+        the sink crops or pads them to the size of the first frame.
+
+        """
+        if self.sink is not None:
+            self.sink.write(mlab.screenshot(figure=self.fig, mode="rgb", antialiased=True))
+
     def create_movie(self,
                      dir_path: Path = None,
                      input_data_file_pattern: str = "*.png",
-                     delete_input: bool = True) -> Path:
+                     delete_input: bool = True,
+                     framerate: int = 25,
+                     vcodec: Optional[str] = None,
+                     crf: Optional[int] = None,
+                     frames_per_segment: Optional[int] = None,
+                     max_workers: Optional[int] = None) -> Path:
         """
         Creates movie filename with all matching pictures from
         input_data_file_pattern.
         By default deletes all input pictures after creation of movie
         to save disk space.
+        If the video sink is used, the movie was already encoded while animating,
+        so it is just finished.
 
         :param dir_path: Path where to look for old directories (movie data)
 
@@ -109,7 +151,26 @@ class MayaviAnimation(Animation.Animation):
         :param delete_input: Condition if the input pictures should be deleted,
             after creation the creation of the animation as e.g. mp4
 
+        :param framerate: Frames per second of the movie
+
+        :param vcodec: Video codec used by ffmpeg, None for its default
+
+        :param crf: Constant rate factor (quality, lower is better),
+            None for the default of the codec
+
+        :param frames_per_segment: If not None, the pictures are encoded
+            in segments of this length on max_workers processes
+            (see :func:`supersolids.helper.segment_encoder.encode_parallel`)
+
+        :param max_workers: Number of processes for segmented encoding, None for all cores
+
         """
+        if self.sink is not None:
+            self.sink.close()
+            input_path = self.sink.output_path.parent
+            self.sink = None
+            return input_path
+
         if dir_path is None:
             input_path, _, _, _ = get_path.get_path(self.dir_path)
         else:
@@ -122,9 +183,24 @@ class MayaviAnimation(Animation.Animation):
         # requires either mencoder or ffmpeg to be installed on your system
         # from command line:
         # ffmpeg -f image2 -r 10 -i anim%05d.png -qscale 0 anim.mp4 -pass 2
-        input(input_data,
-              pattern_type="glob",
-              framerate=25).output(str(output_path)).run()
+        if frames_per_segment is None:
+            output_kwargs = {}
+            if vcodec is not None:
+                output_kwargs["vcodec"] = vcodec
+            if crf is not None:
+                output_kwargs["crf"] = crf
+            input(input_data,
+                  pattern_type="glob",
+                  framerate=framerate).output(str(output_path), **output_kwargs).run()
+        else:
+            pictures = sorted(x for x in input_path.glob(input_data_file_pattern)
+                              if x.is_file())
+            encode_parallel(pictures, output_path,
+                            framerate=framerate,
+                            vcodec=vcodec or "libx264",
+                            crf=crf,
+                            frames_per_segment=frames_per_segment,
+                            max_workers=max_workers)
 
         if delete_input:
             # remove all input files (pictures),
@@ -207,11 +283,13 @@ class MayaviAnimation(Animation.Animation):
     def animate_npz(self,
                     dir_path: Path = None,
                     dir_name: str = None,
-                    filename_schroedinger=f"schroedinger.pkl",
+                    filename_schroedinger=f"schroedinger.json",
                     filename_steps=f"step_",
                     steps_format: str = "%06d",
                     steps_per_npz: int = 10,
                     frame_start: int = 0,
+                    prefetch: int = 4,
+                    filename_mesh: Optional[str] = None,
                     ):
 
         if (dir_path is None) or (dir_path == Path("~/supersolids/results").expanduser()):
@@ -224,29 +302,57 @@ class MayaviAnimation(Animation.Animation):
 
         self.dir_path = input_path
         self.fig.scene.movie_maker.directory = self.dir_path
-        _, last_index, _, _ = get_path.get_path(self.dir_path,
-                                                dir_name=filename_steps,
-                                                file_pattern=".npz"
-                                                )
+        self.open_sink(input_path)
+
+        # steps can be saved at irregular intervals (see output_scheduler),
+        # so the saved frames are looked up. Frames are shown at least
+        # steps_per_npz apart, but the last frame is always shown.
+        frames = get_path.get_step_frames(input_path, filename_steps=filename_steps)
+        frames_shown = []
+        for frame in frames:
+            if frame < frame_start:
+                continue
+            if ((not frames_shown)
+                    or (frame - frames_shown[-1] >= steps_per_npz)
+                    or (frame == frames[-1])):
+                frames_shown.append(frame)
 
         print("Load schroedinger")
-        with open(Path(input_path, filename_schroedinger), "rb") as f:
-            # WARNING: this is just the input Schroedinger at t=0
-            System = dill.load(file=f)
+        # WARNING: this is just the input Schroedinger at t=0
+        System = Schroedinger.load(Path(input_path, filename_schroedinger))
 
         prob_plot, slice_x_plot, slice_y_plot, slice_z_plot, V_plot, psi_sol_plot = self.prepare(System)
 
         yield
 
+        # the next frames are loaded and reduced to |psi|^2 in the background,
+        # while the current one is rendered
+        prefetcher = FramePrefetcher([Path(input_path, filename_steps + steps_format % frame + ".npz")
+                                      for frame in frames_shown],
+                                     prefetch=prefetch)
+        frames_loaded = iter(prefetcher)
+
+        # precomputed isosurfaces (see tools/extract_isosurfaces) replace contour3d,
+        # so only triangles are uploaded instead of contouring the grid on the UI thread
+        mesh_prefetcher = None
+        mesh_plot = None
+        if filename_mesh is not None:
+            mesh_prefetcher = FramePrefetcher([Path(input_path,
+                                                    filename_mesh + steps_format % frame + ".npz")
+                                               for frame in frames_shown],
+                                              reduce=load_mesh,
+                                              prefetch=prefetch)
+            meshes_loaded = iter(mesh_prefetcher)
+
         # read new frames until Exception (last frame read)
-        frame = frame_start
-        while True:
+        for frame in frames_shown:
             print(f"frame={frame}")
             try:
-                # get the psi_val of Schroedinger at other timesteps (t!=0)
-                psi_val_path = Path(input_path, filename_steps + steps_format % frame + ".npz")
-                with open(psi_val_path, "rb") as f:
-                    psi_val_pkl = np.load(file=f)["psi_val"]
+                # get |psi|^2 of Schroedinger at other timesteps (t!=0)
+                prob_3d = next(frames_loaded)
+                mesh = None
+                if mesh_prefetcher is not None:
+                    mesh = next(meshes_loaded)
 
                 # Update legend (especially time)
                 text = (f"N={System.N}, "
@@ -265,7 +371,7 @@ class MayaviAnimation(Animation.Animation):
                         f"processed={frame / System.max_timesteps:05.03f}%"
                         )
 
-                if frame == frame_start:
+                if frame == frames_shown[0]:
                     # create title for first frame
                     title = mlab.title(text=text,
                                        height=0.95,
@@ -277,11 +383,31 @@ class MayaviAnimation(Animation.Animation):
                 title.set(text=text)
 
                 # Update plot functions
-                prob_3d = np.abs(psi_val_pkl) ** 2
                 slice_x_plot.mlab_source.trait_set(scalars=prob_3d)
                 slice_y_plot.mlab_source.trait_set(scalars=prob_3d)
                 slice_z_plot.mlab_source.trait_set(scalars=prob_3d)
-                prob_plot.mlab_source.trait_set(scalars=prob_3d)
+                if (mesh is not None) and (len(mesh[1]) > 0):
+                    verts, faces, vert_levels = mesh
+                    if mesh_plot is None:
+                        mesh_plot = mlab.triangular_mesh(verts[:, 0], verts[:, 1], verts[:, 2],
+                                                         faces,
+                                                         scalars=vert_levels,
+                                                         colormap="spectral",
+                                                         opacity=self.alpha_psi,
+                                                         transparent=True)
+                    else:
+                        mesh_plot.mlab_source.reset(x=verts[:, 0], y=verts[:, 1],
+                                                    z=verts[:, 2], triangles=faces,
+                                                    scalars=vert_levels)
+                    mesh_plot.visible = True
+                    prob_plot.visible = False
+                else:
+                    # no mesh for this frame, contour it
+                    prob_plot.mlab_source.trait_set(scalars=prob_3d)
+                    prob_plot.visible = True
+                    if mesh_plot is not None:
+                        mesh_plot.visible = False
+                self.capture()
 
                 yield
 
@@ -295,13 +421,12 @@ class MayaviAnimation(Animation.Animation):
             except FileNotFoundError:
                 yield None
                 break
+        else:
+            yield None
 
-            frame = frame + steps_per_npz
-            if frame == last_index + steps_per_npz:
-                yield None
-                break
-            elif frame > last_index:
-                frame = last_index
+        prefetcher.close()
+        if mesh_prefetcher is not None:
+            mesh_prefetcher.close()
 
         # Finally close
         mlab.close(all=True)
@@ -331,7 +456,16 @@ class MayaviAnimation(Animation.Animation):
         """
         prob_plot, slice_x_plot, slice_y_plot, slice_z_plot, V_plot, psi_sol_plot = self.prepare(System)
 
-        for frame in range(0, System.max_timesteps):
+        # same directory as the movie_maker would create
+        _, last_index, dir_name, counting_format = get_path.get_path(self.dir_path)
+        self.open_sink(Path(self.dir_path, dir_name + counting_format % (last_index + 1)))
+
+        # the initial state is shown first, then max_timesteps - 1 steps are done,
+        # steps_per_frame of them between two frames
+        steps_total: int = System.max_timesteps - 1
+        step: int = 0
+        frame: int = 0
+        while (frame == 0) or (step < steps_total):
             if not interactive:
                 # rotate camera
                 camera_r, camera_phi, camera_z = functions.camera_3d_trajectory(
@@ -351,25 +485,24 @@ class MayaviAnimation(Animation.Animation):
             # The initial plot needs to be shown first,
             # also a timestep is needed for mu_rel
             if frame > 0:
-                mu_old = System.mu
-                System.time_step()
-
-                mu_rel = np.abs((System.mu - mu_old) / System.mu)
+                mu_rel, steps_done, stop = self.advance(System, accuracy=accuracy,
+                                                        steps_max=steps_total - step)
+                step += steps_done
 
                 # Stop animation when accuracy is reached
-                if mu_rel < accuracy:
+                if stop and (mu_rel < accuracy):
                     print(f"Accuracy reached: {mu_rel}")
                     yield None
                     break
 
-                elif np.isnan(mu_rel) and np.isnan(System.mu):
+                elif stop:
                     assert np.isnan(System.E), ("E should be nan, when mu is nan."
                                                 "Then the system is divergent.")
                     print(f"Accuracy NOT reached! System diverged.")
                     yield None
                     break
 
-            if frame == (System.max_timesteps - 1):
+            if step == steps_total:
                 # Animation stops at the next step, to actually show the last step
                 print(f"Maximum timesteps are reached. Animation is stopped.")
 
@@ -390,7 +523,7 @@ class MayaviAnimation(Animation.Animation):
                     f"mu_rel={mu_rel:+05.05e}, "
                     f"E={System.E:+05.03f}, "
                     f"t={System.t:07.05f}, "
-                    f"processed={frame/System.max_timesteps:05.03f}%"
+                    f"processed={step/System.max_timesteps:05.03f}%"
                     )
 
             if frame == 0:
@@ -410,8 +543,115 @@ class MayaviAnimation(Animation.Animation):
             slice_y_plot.mlab_source.trait_set(scalars=prob_3d)
             slice_z_plot.mlab_source.trait_set(scalars=prob_3d)
             prob_plot.mlab_source.trait_set(scalars=prob_3d)
+            self.capture()
+
+            frame += 1
+            yield
+
+        # Finally close
+        mlab.close(all=True)
+
+    @mlab.animate(delay=10, ui=True)
+    def animate_live(self, System: Schroedinger, accuracy: float = 10 ** -6,
+                     interactive: bool = True, publish_interval: float = 0.05):
+        """
+        Animates solving of the Schroedinger equations of System with mayavi in 3D,
+        while the time steps are done on a background thread
+        (see :class:`supersolids.helper.live_solver.LiveSolver`).
+        Every UI tick shows the newest published density, frames computed in between
+        are dropped, so the solver never waits for the rendering.
+
+        :param System: Schrödinger equations for the specified system
+
+        :param accuracy: Convergence is reached when relative error of mu is smaller
+            than accuracy, where :math:`\mu = - \\log(\psi_{normed}) / (2 dt)`
+
+        :param interactive: Condition for interactive mode. When camera functions are used,
+            then interaction is not possible. So interactive=True turn the usage
+            of camera functions off.
+
+        :param publish_interval: Minimum wall-clock seconds between published densities
+
+        """
+        prob_plot, slice_x_plot, slice_y_plot, slice_z_plot, V_plot, psi_sol_plot = self.prepare(System)
+
+        # same directory as the movie_maker would create
+        _, last_index, dir_name, counting_format = get_path.get_path(self.dir_path)
+        self.open_sink(Path(self.dir_path, dir_name + counting_format % (last_index + 1)))
+
+        self.live_solver = LiveSolver(System, accuracy=accuracy,
+                                      publish_interval=publish_interval)
+        self.live_solver.start()
+
+        title = None
+        frame: int = 0
+        version_seen: int = 0
+        while True:
+            # read done before the frame, so the last published frame is not missed
+            done = not self.live_solver.is_alive()
+            latest = self.live_solver.frame.latest(version_seen)
+            if latest is None:
+                if done:
+                    break
+                yield
+                continue
+
+            version_seen, prob_3d, info = latest
+            if not interactive:
+                # rotate camera
+                camera_r, camera_phi, camera_z = functions.camera_3d_trajectory(
+                    frame,
+                    r_func=self.camera_r_func,
+                    phi_func=self.camera_phi_func,
+                    z_func=self.camera_z_func
+                )
+
+                mlab.view(distance=camera_r,
+                          azimuth=camera_phi,
+                          elevation=camera_z)
+
+            text = (f"N={System.N}, "
+                    f"Box={System.Box}, "
+                    f"Res={System.Res}, "
+                    f"max_timesteps={System.max_timesteps:d}, "
+                    f"dt={System.dt:.6f}, "
+                    f"g={System.g:.2}, "
+                    f"g_qf={System.g_qf:.2}, "
+                    f"e_dd={System.e_dd:05.03f},\n"
+                    f"a_s/a_0={System.a_s/constants.a_0:05.02f}, "
+                    f"w_y/2pi={System.w_y/(2*np.pi):05.02f}, "
+                    f"w_z/2pi={System.w_z/(2*np.pi):05.02f}, "
+                    f"imag_time={System.imag_time}, "
+                    f"mu={info['mu']:+05.03f}, "
+                    f"mu_rel={info['mu_rel']:+05.05e}, "
+                    f"E={info['E']:+05.03f}, "
+                    f"t={info['t']:07.05f}, "
+                    f"processed={info['step']/System.max_timesteps:05.03f}%"
+                    )
+
+            if title is None:
+                # create title for first frame
+                title = mlab.title(text=text,
+                                   height=0.95,
+                                   line_width=1.0,
+                                   size=1.0,
+                                   color=(0, 0, 0),
+                                   )
+
+            title.set(text=text)
+
+            # Update plot functions
+            slice_x_plot.mlab_source.trait_set(scalars=prob_3d)
+            slice_y_plot.mlab_source.trait_set(scalars=prob_3d)
+            slice_z_plot.mlab_source.trait_set(scalars=prob_3d)
+            prob_plot.mlab_source.trait_set(scalars=prob_3d)
+            self.capture()
 
+            frame += 1
             yield
 
+        print(f"Live solver finished with status {self.live_solver.status} "
+              f"after {self.live_solver.steps} steps.")
+
         # Finally close
         mlab.close(all=True)
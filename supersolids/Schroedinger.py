@@ -11,14 +11,23 @@ Numerical solver for non-linear time-dependent Schrodinger equation.
 """
 
 import functools
+import json
 import sys
-from typing import Callable, Union, Optional
+import time
+from typing import Any, Callable, Dict, Tuple, Union, Optional
 from pathlib import Path
 
 import dill
 import numpy as np
+# workers of the transforms can be set by scipy.fft.set_workers (see helper/threads)
+from scipy import fft
 
 from supersolids.helper import constants, functions, get_path
+from supersolids.helper.manifest import Manifest, replace_atomic, save_npz_atomic
+from supersolids.helper.output_scheduler import OutputScheduler, StepScheduler
+from supersolids.helper.products import Products
+from supersolids.helper.registry import Registry, statuses_ended
+from supersolids.helper.watchdog import Watchdog
 
 
 class Schroedinger:
@@ -63,6 +72,7 @@ class Schroedinger:
                  psi_sol: Optional[Callable] = functions.thomas_fermi_3d,
                  mu_sol: Optional[Callable] = functions.mu_3d,
                  psi_0_noise: np.ndarray = functions.noise_mesh,
+                 shared: Optional[Dict[str, np.ndarray]] = None,
                  ) -> None:
         """
         Schrödinger equations for the specified system.
@@ -80,6 +90,11 @@ class Schroedinger:
 
         :param max_timesteps: Maximum timesteps  with length dt for the animation.
 
+        :param shared: Grid-invariant arrays (x_mesh, y_mesh, z_mesh, pos, k_squared, H_kin,
+            V_k_val) already built for the same Box, Res, dt and imag_time
+            (e.g. in shared memory, see :mod:`supersolids.helper.shared_grid`),
+            used instead of building own copies. None to build all.
+
         """
         assert isinstance(Res, functions.Resolution), (
             f"box: {type(Res)} is not type {type(functions.Resolution)}")
@@ -114,6 +129,10 @@ class Schroedinger:
         # E = mu - 0.5 * g * integral psi_val ** 2
         self.E: float = E
 
+        # how the last simulate_raw ended (see supersolids.helper.registry.statuses)
+        self.status: Optional[str] = None
+        self.reason: Optional[str] = None
+
         self.psi: Callable = psi_0
 
         if V is not None:
@@ -121,6 +140,10 @@ class Schroedinger:
         else:
             self.V = None
 
+        # keep the given functions, to be able to describe them in the metadata
+        self.V_interaction: Optional[Callable] = V_interaction
+        self.mu_sol_func: Optional[Callable] = mu_sol
+
         if psi_sol is not None:
             self.psi_sol: Callable = functools.partial(psi_sol, g=self.g)
         else:
@@ -197,6 +220,10 @@ class Schroedinger:
         if self.dim > 3:
             sys.exit("Spatial dimension over 3. This is not implemented.")
 
+        shared = shared or {}
+        # k_squared, H_kin and V_k_val are only taken together, as they are built together
+        k_shared: bool = all(key in shared for key in ["k_squared", "H_kin", "V_k_val"])
+
         if self.dim == 1:
             if psi_0_noise is None:
                 self.psi_val: np.ndarray = self.psi(self.x)
@@ -213,18 +240,26 @@ class Schroedinger:
             else:
                 self.psi_sol_val: np.ndarray = self.psi_sol(self.x)
 
-            self.k_squared: np.ndarray = self.kx ** 2.0
-            self.H_kin: np.ndarray = np.exp(
-                self.U * (0.5 * self.k_squared) * self.dt)
+            if k_shared:
+                self.k_squared: np.ndarray = shared["k_squared"]
+                self.H_kin: np.ndarray = shared["H_kin"]
+                self.V_k_val: np.ndarray = shared["V_k_val"]
+            else:
+                self.k_squared = self.kx ** 2.0
+                self.H_kin = np.exp(self.U * (0.5 * self.k_squared) * self.dt)
 
-            if V_interaction is None:
-                # For no interaction the identity is needed with respect to 2D
-                # * 2D (array with 1.0 everywhere)
-                self.V_k_val: np.ndarray = np.full(self.psi_val.shape, 1.0)
+                if V_interaction is None:
+                    # For no interaction the identity is needed with respect to 2D
+                    # * 2D (array with 1.0 everywhere)
+                    self.V_k_val = np.full(self.psi_val.shape, 1.0)
 
         elif self.dim == 2:
-            self.x_mesh, self.y_mesh, self.pos = functions.get_meshgrid(self.x,
-                                                                        self.y)
+            if "pos" in shared:
+                self.x_mesh, self.y_mesh, self.pos = (shared["x_mesh"], shared["y_mesh"],
+                                                      shared["pos"])
+            else:
+                self.x_mesh, self.y_mesh, self.pos = functions.get_meshgrid(self.x,
+                                                                            self.y)
 
             if psi_0_noise is None:
                 self.psi_val = self.psi(self.pos)
@@ -241,35 +276,44 @@ class Schroedinger:
             else:
                 self.psi_sol_val = self.psi_sol(self.pos)
 
-            kx_mesh, ky_mesh, _ = functions.get_meshgrid(self.kx, self.ky)
-            self.k_squared = kx_mesh ** 2.0 + ky_mesh ** 2.0
-            # here a number (U) is multiplied elementwise with an (1D, 2D or
-            # 3D) array (k_squared)
-            self.H_kin = np.exp(self.U * (0.5 * self.k_squared) * self.dt)
-
-            if V_interaction is None:
-                # For no interaction the identity is needed with respect to 2D
-                # * 2D (array with 1.0 everywhere)
-                self.V_k_val = np.full(self.psi_val.shape, 1.0)
+            if k_shared:
+                self.k_squared = shared["k_squared"]
+                self.H_kin = shared["H_kin"]
+                self.V_k_val = shared["V_k_val"]
             else:
-                self.V_k_val = V_interaction(kx_mesh, ky_mesh, g=self.g)
+                kx_mesh, ky_mesh, _ = functions.get_meshgrid(self.kx, self.ky)
+                self.k_squared = kx_mesh ** 2.0 + ky_mesh ** 2.0
+                # here a number (U) is multiplied elementwise with an (1D, 2D or
+                # 3D) array (k_squared)
+                self.H_kin = np.exp(self.U * (0.5 * self.k_squared) * self.dt)
+
+                if V_interaction is None:
+                    # For no interaction the identity is needed with respect to 2D
+                    # * 2D (array with 1.0 everywhere)
+                    self.V_k_val = np.full(self.psi_val.shape, 1.0)
+                else:
+                    self.V_k_val = V_interaction(kx_mesh, ky_mesh, g=self.g)
 
         elif self.dim == 3:
-            try:
-                self.x_mesh, self.y_mesh, self.z_mesh = np.mgrid[
-                                                        self.Box.x0: self.Box.x1:
-                                                        complex(0, self.Res.x),
-                                                        self.Box.y0: self.Box.y1:
-                                                        complex(0, self.Res.y),
-                                                        self.Box.z0: self.Box.z1:
-                                                        complex(0, self.Res.z)
-                                                        ]
-            except KeyError:
-                sys.exit(
-                    f"Keys x0, x1, y0, y1, z0, z1 of box needed, "
-                    f"but it has the keys: {self.Box.keys()}, "
-                    f"Keys x, y, z of res needed, "
-                    f"but it has the keys: {self.Res.keys()}")
+            if "z_mesh" in shared:
+                self.x_mesh, self.y_mesh, self.z_mesh = (shared["x_mesh"], shared["y_mesh"],
+                                                         shared["z_mesh"])
+            else:
+                try:
+                    self.x_mesh, self.y_mesh, self.z_mesh = np.mgrid[
+                                                            self.Box.x0: self.Box.x1:
+                                                            complex(0, self.Res.x),
+                                                            self.Box.y0: self.Box.y1:
+                                                            complex(0, self.Res.y),
+                                                            self.Box.z0: self.Box.z1:
+                                                            complex(0, self.Res.z)
+                                                            ]
+                except KeyError:
+                    sys.exit(
+                        f"Keys x0, x1, y0, y1, z0, z1 of box needed, "
+                        f"but it has the keys: {self.Box.keys()}, "
+                        f"Keys x, y, z of res needed, "
+                        f"but it has the keys: {self.Res.keys()}")
 
             if psi_0_noise is None:
                 self.psi_val = self.psi(self.x_mesh, self.y_mesh, self.z_mesh)
@@ -292,25 +336,211 @@ class Schroedinger:
                 print(f"Trapez Norm for psi_sol: "
                       f"{self.get_norm_trapez(self.psi_sol_val)}")
 
-            kx_mesh, ky_mesh, kz_mesh, _ = functions.get_meshgrid_3d(self.kx,
-                                                                     self.ky,
-                                                                     self.kz)
-            self.k_squared = kx_mesh ** 2.0 + ky_mesh ** 2.0 + kz_mesh ** 2.0
-
-            # here a number (U) is multiplied elementwise with an (1D, 2D or
-            # 3D) array (k_squared)
-            self.H_kin = np.exp(self.U * (0.5 * self.k_squared) * self.dt)
-
-            if V_interaction is None:
-                # For no interaction the identity is needed with respect to 2D
-                # * 2D (array with 1.0 everywhere)
-                self.V_k_val = np.full(self.psi_val.shape, 1.0)
+            if k_shared:
+                self.k_squared = shared["k_squared"]
+                self.H_kin = shared["H_kin"]
+                self.V_k_val = shared["V_k_val"]
             else:
-                self.V_k_val = V_interaction(kx_mesh, ky_mesh, kz_mesh)
+                kx_mesh, ky_mesh, kz_mesh, _ = functions.get_meshgrid_3d(self.kx,
+                                                                         self.ky,
+                                                                         self.kz)
+                self.k_squared = kx_mesh ** 2.0 + ky_mesh ** 2.0 + kz_mesh ** 2.0
+
+                # here a number (U) is multiplied elementwise with an (1D, 2D or
+                # 3D) array (k_squared)
+                self.H_kin = np.exp(self.U * (0.5 * self.k_squared) * self.dt)
+
+                if V_interaction is None:
+                    # For no interaction the identity is needed with respect to 2D
+                    # * 2D (array with 1.0 everywhere)
+                    self.V_k_val = np.full(self.psi_val.shape, 1.0)
+                else:
+                    self.V_k_val = V_interaction(kx_mesh, ky_mesh, kz_mesh)
 
         # attributes for animation
         self.t: float = 0.0
 
+    def to_metadata(self) -> Dict[str, Any]:
+        """
+        Describes the System by its parameters and the names (and keyword
+        arguments) of the functions for the potential and initial state.
+        Derived arrays (meshes, k_squared, H_kin, V_k_val, psi_val)
+        are not included, they are rebuilt by :meth:`from_metadata`.
+
+        :return: Dictionary, which can be saved as json
+
+        """
+        return {"N": self.N,
+                "Box": self.Box.to_dict(),
+                "Res": self.Res.to_dict(),
+                "max_timesteps": self.max_timesteps,
+                "dt": self.dt,
+                "g": self.g,
+                "g_qf": self.g_qf,
+                "w_x": self.w_x,
+                "w_y": self.w_y,
+                "w_z": self.w_z,
+                "a_s": self.a_s,
+                "e_dd": self.e_dd,
+                "imag_time": bool(self.imag_time),
+                "mu": float(np.real(self.mu)),
+                "E": float(np.real(self.E)),
+                "t": self.t,
+                "psi_0": functions.callable_to_spec(self.psi),
+                "V": functions.callable_to_spec(self.V),
+                "V_interaction": functions.callable_to_spec(self.V_interaction),
+                "psi_sol": functions.callable_to_spec(self.psi_sol),
+                "mu_sol": functions.callable_to_spec(self.mu_sol_func),
+                }
+
+    def save_metadata(self, schroedinger_path: Path) -> None:
+        """
+        Saves the metadata (see :meth:`to_metadata`) as json to schroedinger_path.
+        If V can not be described by name (e.g. lambda),
+        V_val is saved next to it in a npz with the same name.
+
+        :param schroedinger_path: Path of the json file
+
+        """
+        metadata = self.to_metadata()
+        if (metadata["V"] is None) and (self.V is not None):
+            arrays_path = Path(schroedinger_path).with_suffix(".npz")
+            save_npz_atomic(arrays_path, V_val=self.V_val)
+            metadata["V_val"] = arrays_path.name
+        else:
+            metadata["V_val"] = None
+
+        replace_atomic(schroedinger_path,
+                       lambda f: f.write(json.dumps(metadata, indent=4).encode()))
+
+    @classmethod
+    def from_metadata(cls, metadata: Union[Path, Dict[str, Any]],
+                      base_path: Optional[Path] = None,
+                      **kwargs) -> "Schroedinger":
+        """
+        Constructs a System from the metadata saved by :meth:`save_metadata`.
+        Derived arrays are rebuilt from the parameters,
+        psi_val is the initial state without noise.
+
+        :param metadata: Path of the json file or the dictionary itself
+
+        :param base_path: Directory of the files referenced by the metadata (e.g. V_val).
+            None for the directory of the json file.
+
+        :param kwargs: Arguments of Schroedinger to overwrite the saved ones
+            (e.g. V for a lambda, which could not be saved by name)
+
+        :return: Schroedinger System
+
+        """
+        if not isinstance(metadata, dict):
+            schroedinger_path = Path(metadata)
+            with open(schroedinger_path, "r") as f:
+                metadata = json.load(f)
+            if base_path is None:
+                base_path = schroedinger_path.parent
+
+        parameters = {"N": metadata["N"],
+                      "Box": functions.Box(**metadata["Box"]),
+                      "Res": functions.Resolution(**metadata["Res"]),
+                      "max_timesteps": metadata["max_timesteps"],
+                      "dt": metadata["dt"],
+                      "g": metadata["g"],
+                      "g_qf": metadata["g_qf"],
+                      "w_x": metadata["w_x"],
+                      "w_y": metadata["w_y"],
+                      "w_z": metadata["w_z"],
+                      "a_s": metadata["a_s"],
+                      "e_dd": metadata["e_dd"],
+                      "imag_time": metadata["imag_time"],
+                      "mu": metadata["mu"],
+                      "E": metadata["E"],
+                      "psi_0": functions.spec_to_callable(metadata["psi_0"]),
+                      "V": functions.spec_to_callable(metadata["V"]),
+                      "V_interaction": functions.spec_to_callable(
+                          metadata["V_interaction"]),
+                      "psi_sol": functions.spec_to_callable(metadata["psi_sol"]),
+                      "mu_sol": functions.spec_to_callable(metadata["mu_sol"]),
+                      "psi_0_noise": None,
+                      }
+        if parameters["psi_0"] is None:
+            # the initial state is replaced by the saved psi_val anyway
+            parameters["psi_0"] = functions.psi_gauss_3d
+        parameters.update(kwargs)
+
+        System = cls(**parameters)
+        System.t = metadata.get("t", 0.0)
+
+        V_val_name = metadata.get("V_val", None)
+        if (V_val_name is not None) and ("V" not in kwargs):
+            if base_path is None:
+                raise ValueError(f"The potential of this metadata is saved in {V_val_name}. "
+                                 "Give base_path (directory of it) or V.")
+            with open(Path(base_path, V_val_name), "rb") as f:
+                System.V_val = np.load(file=f)["V_val"]
+
+        return System
+
+    @classmethod
+    def load(cls, schroedinger_path: Path) -> "Schroedinger":
+        """
+        Loads a saved System, either from its metadata (json)
+        or from a pickled Schroedinger of older runs (pkl).
+        If schroedinger_path does not exist, the other format is tried.
+
+        :param schroedinger_path: Path of the json or pkl file
+
+        :return: Schroedinger System
+
+        """
+        schroedinger_path = Path(schroedinger_path)
+        if not schroedinger_path.is_file():
+            for suffix in [".json", ".pkl"]:
+                if schroedinger_path.with_suffix(suffix).is_file():
+                    schroedinger_path = schroedinger_path.with_suffix(suffix)
+                    break
+
+        if schroedinger_path.suffix == ".json":
+            return cls.from_metadata(schroedinger_path)
+        else:
+            with open(schroedinger_path, "rb") as f:
+                return dill.load(file=f)
+
+    @classmethod
+    def load_last_frame(cls,
+                        input_path: Path,
+                        filename_schroedinger: str = "schroedinger.json",
+                        filename_steps: str = "step_",
+                        steps_format: str = "%06d",
+                        ) -> Tuple["Schroedinger", Dict[str, Any]]:
+        """
+        Loads the System of a run at its last valid saved frame
+        (found via the manifest), e.g. to resume an interrupted run.
+        t, mu and E are restored from the manifest
+        (for older runs without manifest t is reconstructed from the frame).
+
+        :param input_path: Path of the movieNNN directory of the run
+
+        :return: System with psi_val of the last valid frame and
+            the manifest entry of that frame (keys frame, file, ...)
+
+        """
+        System = cls.load(Path(input_path, filename_schroedinger))
+
+        entry = Manifest(input_path).last_valid(filename_steps=filename_steps,
+                                                steps_format=steps_format)
+        if entry is None:
+            sys.exit(f"No valid frame found in {input_path}.")
+
+        with open(Path(input_path, entry["file"]), "rb") as f:
+            System.psi_val = np.load(file=f)["psi_val"]
+
+        System.t = entry.get("t", System.dt * entry["frame"])
+        System.mu = entry.get("mu", System.mu)
+        System.E = entry.get("E", System.E)
+
+        return System, entry
+
     def get_density(self, p: float = 2.0) -> np.ndarray:
         """
         Calculates :math:`|\psi|^p` for 1D, 2D or 3D (depending on self.dim).
@@ -407,7 +637,7 @@ class Schroedinger:
         # (transform back and forth)
         psi_2: np.ndarray = self.get_density(p=2.0)
         psi_3: np.ndarray = self.get_density(p=3.0)
-        U_dd: np.ndarray = np.fft.ifftn(self.V_k_val * np.fft.fftn(psi_2))
+        U_dd: np.ndarray = fft.ifftn(self.V_k_val * fft.fftn(psi_2))
         # update H_pot before use
         H_pot: np.ndarray = np.exp(self.U
                                    * (0.5 * self.dt)
@@ -418,18 +648,18 @@ class Schroedinger:
         # multiply element-wise the (1D, 2D or 3D) arrays with each other
         self.psi_val = H_pot * self.psi_val
 
-        self.psi_val = np.fft.fftn(self.psi_val)
+        self.psi_val = fft.fftn(self.psi_val)
         # H_kin is just dependent on U and the grid-points, which are constants,
         # so it does not need to be recalculated
         # multiply element-wise the (1D, 2D or 3D) array (H_kin) with psi_val
         # (1D, 2D or 3D)
         self.psi_val = self.H_kin * self.psi_val
-        self.psi_val = np.fft.ifftn(self.psi_val)
+        self.psi_val = fft.ifftn(self.psi_val)
 
         # update H_pot, psi_2, U_dd before use
         psi_2 = self.get_density(p=2.0)
         psi_3 = self.get_density(p=3.0)
-        U_dd = np.fft.ifftn(self.V_k_val * np.fft.fftn(psi_2))
+        U_dd = fft.ifftn(self.V_k_val * fft.fftn(psi_2))
         H_pot = np.exp(self.U
                        * (0.5 * self.dt)
                        * (self.V_val
@@ -469,62 +699,210 @@ class Schroedinger:
     def simulate_raw(self,
                      accuracy: float = 10 ** -6,
                      dir_path: Path = Path.home().joinpath("supersolids", "results"),
-                     filename_schroedinger=f"schroedinger.pkl",
+                     filename_schroedinger=f"schroedinger.json",
                      filename_steps=f"step_",
                      steps_format: str = "%06d",
                      steps_per_npz: int = 10,
                      frame_start: int = 0,
-                     ):
+                     use_registry: bool = True,
+                     products: Optional[Products] = None,
+                     output_scheduler: Optional[OutputScheduler] = None,
+                     input_path: Optional[Path] = None,
+                     watchdog: Optional[Watchdog] = None,
+                     stop_path: Optional[Path] = None,
+                     ) -> Path:
+        """
+        Evolves the System offscreen and saves psi_val every steps_per_npz
+        steps into a new movieNNN directory in dir_path.
+
+        :param accuracy: Convergence is reached when relative error of mu is smaller
+            than accuracy, where :math:`\mu = - \\log(\psi_{normed}) / (2 dt)`
+
+        :param dir_path: Path where to look for old directories (movie data)
+
+        :param steps_per_npz: Number of dt steps skipped between saved npz.
+            Only used, if output_scheduler is None.
+
+        :param frame_start: Counter of first saved npz.
+
+        :param use_registry: Condition if the run is recorded in the
+            registry of dir_path (see :class:`supersolids.helper.registry.Registry`)
+
+        :param products: Reduced data products (slices, cuts, column densities)
+            to record at their own cadence, independent of steps_per_npz.
+            None to only save full snapshots.
+
+        :param output_scheduler: Decides at which frames psi_val is saved
+            (see :mod:`supersolids.helper.output_scheduler`).
+            If None, every steps_per_npz steps are saved.
+            The final frame is always saved.
 
+        :param input_path: Path of an existing movieNNN directory to append to
+            (e.g. to resume an interrupted run). If None, a new one is created.
+
+        :param watchdog: Checks the run every few steps and stops it as diverged
+            with a reason, before mu gets NaN (see :mod:`supersolids.helper.watchdog`).
+            None to only stop, when mu is NaN.
+
+        :param stop_path: If this file exists, the run stops after the current step
+            with status cancelled (e.g. created by the job service to cancel the run).
+            The frame is saved, so the run can be resumed.
+
+        :return: Path of the movieNNN directory of the run.
+            The status and reason of the end are set as status and reason.
+
+        """
         print(f"Accuracy goal: {accuracy}")
 
         # Create a results dir, if there is none
         if not dir_path.is_dir():
-            dir_path.mkdir(parents=True)
+            dir_path.mkdir(parents=True, exist_ok=True)
 
-        # Initialize mu_rel
-        mu_rel = self.mu
+        if output_scheduler is None:
+            output_scheduler = StepScheduler(steps_per_npz=steps_per_npz)
 
-        _, last_index, dir_name, counting_format = get_path.get_path(dir_path)
-        input_path = Path(dir_path, dir_name + counting_format % (last_index + 1))
+        if input_path is None:
+            # created atomically, as parallel runs (e.g. sweeps) share dir_path
+            input_path = get_path.new_path(dir_path)
 
         # Create a movie dir, if there is none
         if not input_path.is_dir():
             input_path.mkdir(parents=True)
 
-        # save used Schroedinger
-        with open(Path(input_path, filename_schroedinger), "wb") as f:
-            dill.dump(obj=self, file=f)
+        # save parameters of the used Schroedinger (not the arrays),
+        # a resumed run keeps the ones of its start
+        schroedinger_path = Path(input_path, filename_schroedinger)
+        if not schroedinger_path.is_file():
+            self.save_metadata(schroedinger_path)
+
+        manifest = Manifest(input_path)
+        # a run, which already ended, is not continued (e.g. resumed by mistake)
+        status_end = manifest.get_status()
+        if use_registry:
+            registry = Registry(dir_path)
+            row = registry.get(input_path.name)
+            if row is not None and row["status"] in statuses_ended:
+                status_end = row["status"]
+        if status_end in statuses_ended:
+            raise ValueError(f"The run in {input_path} already ended ({status_end}).")
+
+        if use_registry:
+            if registry.get(input_path.name) is None:
+                registry.register(self, input_path, status="running",
+                                  accuracy=accuracy)
+            else:
+                registry.update(input_path.name, status="running")
+
+        if watchdog is not None:
+            watchdog.reset()
 
+        run_start: float = time.perf_counter()
+        status: str = "max_timesteps"
+        reason: Optional[str] = None
+        frame_last: int = frame_start
+        frame: int = frame_start
+        mu_rel: float = np.nan
         frame_end = frame_start + self.max_timesteps
-        for frame in range(frame_start, frame_end):
-            mu_old = self.mu
-            self.time_step()
-
-            # save psi_val after steps_per_pickle steps of dt (to save disk space)
-            if ((frame % steps_per_npz) == 0) or (frame == frame_end - 1):
-                with open(Path(input_path,
-                               filename_steps + steps_format % frame + ".npz"),
-                          "wb"
-                          ) as g:
-                    np.savez_compressed(g, psi_val=self.psi_val)
-
-            print(f"t={self.t:07.05f}, mu_rel={mu_rel:+05.05e}, "
-                  f"processed={(frame - frame_start) / self.max_timesteps:05.03f}%")
-
-            mu_rel = np.abs((self.mu - mu_old) / self.mu)
-
-            # Stop animation when accuracy is reached
-            if mu_rel < accuracy:
-                print(f"Accuracy reached: {mu_rel}")
-                break
-
-            elif np.isnan(mu_rel) and np.isnan(self.mu):
-                assert np.isnan(self.E), ("E should be nan, when mu is nan."
-                                          "Then the system is divergent.")
-                print(f"Accuracy NOT reached! System diverged.")
-                break
-
-            if frame == (self.max_timesteps - 1):
-                # Animation stops at the next step, to actually show the last step
-                print(f"Maximum timesteps are reached. Animation is stopped.")
+        try:
+            for frame in range(frame_start, frame_end):
+                mu_old = self.mu
+                self.time_step()
+
+                mu_rel = np.abs((self.mu - mu_old) / self.mu)
+                converged: bool = mu_rel < accuracy
+                diverged: bool = np.isnan(mu_rel) and np.isnan(self.mu)
+                if (watchdog is not None) and not (converged or diverged):
+                    if watchdog.is_due(frame):
+                        reason = watchdog.check(self, frame)
+                        diverged = reason is not None
+                cancelled: bool = (stop_path is not None) and stop_path.exists()
+                # the final frame is always saved
+                frame_final: bool = (converged or diverged or cancelled
+                                     or (frame == frame_end - 1))
+
+                # save psi_val only when output_scheduler demands it (to save disk space)
+                if frame_final or output_scheduler.is_due(self, frame):
+                    entry = {"frame": frame, "file": None, "t": self.t,
+                             "mu": float(np.real(self.mu)),
+                             "E": float(np.real(self.E)),
+                             "frame_end": frame_end}
+                    if frame_final:
+                        # marks the run as ended, so it is not resumed
+                        if converged:
+                            entry["status"] = "converged"
+                        elif diverged:
+                            entry["status"] = "diverged"
+                        elif cancelled:
+                            entry["status"] = "cancelled"
+                        else:
+                            entry["status"] = "max_timesteps"
+                    if np.all(np.isfinite(self.psi_val)):
+                        # written atomically and listed in the manifest afterwards,
+                        # so an interrupted run can be resumed from its last valid frame
+                        entry["file"] = filename_steps + steps_format % frame + ".npz"
+                        save_npz_atomic(Path(input_path, entry["file"]),
+                                        psi_val=self.psi_val)
+                        output_scheduler.saved(self, frame)
+                        frame_last = frame
+                    else:
+                        print(f"psi_val of frame {frame} is not finite, it is not saved.")
+                    manifest.append(**entry)
+
+                if products is not None:
+                    if frame_final or products.is_due(frame):
+                        products.record(self, frame)
+                    if products.is_full():
+                        products.flush(input_path)
+
+                print(f"t={self.t:07.05f}, mu_rel={mu_rel:+05.05e}, "
+                      f"processed={(frame - frame_start) / self.max_timesteps:05.03f}%")
+
+                # Stop animation when accuracy is reached
+                if converged:
+                    print(f"Accuracy reached: {mu_rel}")
+                    status = "converged"
+                    break
+
+                elif diverged:
+                    if reason is None:
+                        assert np.isnan(self.E), ("E should be nan, when mu is nan."
+                                                  "Then the system is divergent.")
+                        reason = "mu is nan"
+                    print(f"Accuracy NOT reached! System diverged: {reason}")
+                    status = "diverged"
+                    break
+
+                elif cancelled:
+                    print(f"Stopped, as {stop_path} exists.")
+                    status = "cancelled"
+                    reason = f"cancelled by {stop_path.name}"
+                    break
+
+                if frame == (self.max_timesteps - 1):
+                    # Animation stops at the next step, to actually show the last step
+                    print(f"Maximum timesteps are reached. Animation is stopped.")
+
+        except BaseException as e:
+            # e.g. KeyboardInterrupt, keep the registry consistent before raising
+            self.status, self.reason = "aborted", repr(e)
+            if products is not None:
+                products.flush(input_path)
+            if use_registry:
+                registry.finish(self, input_path.name, "aborted", reason=repr(e),
+                                steps=frame - frame_start, frame_last=frame_last,
+                                run_time=time.perf_counter() - run_start)
+            raise
+
+        if products is not None:
+            products.flush(input_path)
+
+        self.status, self.reason = status, reason
+        if use_registry:
+            registry.finish(self, input_path.name, status,
+                            reason=reason,
+                            mu_rel=float(mu_rel),
+                            steps=frame - frame_start + 1,
+                            frame_last=frame_last,
+                            run_time=time.perf_counter() - run_start)
+
+        return input_path
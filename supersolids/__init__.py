@@ -4,5 +4,7 @@ __all__ = ["Animation",
            "tools",
            "multi_core",
            "Schroedinger",
+           "service",
            "single_core",
+           "worker",
            ]
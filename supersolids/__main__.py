@@ -26,6 +26,8 @@ from supersolids.tools.simulate_case import simulate_case
 from supersolids.tools.cut_1d import prepare_cuts
 from supersolids.helper import constants
 from supersolids.helper import functions
+from supersolids.helper import output_scheduler
+from supersolids.helper import products
 
 
 # Script runs, if script is run as main script (called by python *.py)
@@ -70,6 +72,27 @@ if __name__ == "__main__":
     parser.add_argument("-noise", metavar="noise", type=json.loads,
                         default=None, action='store', nargs=2,
                         help="Min and max of gauss noise added to psi.")
+    parser.add_argument("-steps_per_npz", metavar="steps_per_npz",
+                        type=int, default=10,
+                        help="Number of dt steps skipped between saved npz.")
+    parser.add_argument("-save_policy", metavar="save_policy", type=str, default="steps",
+                        choices=output_scheduler.policies,
+                        help="When to save psi_val: every steps_per_npz steps (steps), "
+                             "every save_seconds (wall_clock) or when the relative change "
+                             "of the density exceeds save_change (change). "
+                             "The final frame is always saved.")
+    parser.add_argument("-save_seconds", metavar="save_seconds", type=float, default=60.0,
+                        help="Wall-clock seconds between saved npz for -save_policy=wall_clock.")
+    parser.add_argument("-save_change", metavar="save_change", type=float, default=10 ** -2,
+                        help="Relative L2 change of the density since the last saved npz "
+                             "needed to save the next one for -save_policy=change.")
+    parser.add_argument("-steps_per_products", metavar="steps_per_products",
+                        type=int, default=None,
+                        help="Number of dt steps between recorded reduced data products "
+                             "(slices, cuts, column densities). If None, none are recorded.")
+    parser.add_argument("-products", metavar="products", type=str, nargs="+",
+                        default=["slices", "cuts"], choices=products.kinds,
+                        help=f"Reduced data products to record. Any of {products.kinds}")
     parser.add_argument("--V_none", default=False, action="store_true",
                         help="If not used, a gauss potential is used."
                              "If used, no potential is used.")
@@ -83,6 +106,30 @@ if __name__ == "__main__":
                         help="If flag is not used, interactive animation is "
                              "shown and saved as mp4, else Schroedinger is "
                              "saved as pkl and allows offscreen usage.")
+    parser.add_argument("--video_sink", default=False, action="store_true",
+                        help="Pipe the frames of the animation directly into ffmpeg "
+                             "instead of saving pictures first.")
+    parser.add_argument("-frames_per_segment", metavar="frames_per_segment",
+                        type=int, default=None,
+                        help="If set, the movie is encoded in segments of this many frames "
+                             "on all cores and joined afterwards.")
+    parser.add_argument("-steps_per_frame", metavar="steps_per_frame",
+                        type=int, default=1,
+                        help="Number of time steps between two drawn frames of the animation.")
+    parser.add_argument("-frame_budget", metavar="frame_budget",
+                        type=float, default=None,
+                        help="Wall-clock seconds after which the time steps for a frame "
+                             "are stopped early.")
+    parser.add_argument("--live_thread", default=False, action="store_true",
+                        help="For 3D: do the time steps on a background thread, "
+                             "the animation shows the newest state and drops frames.")
+    parser.add_argument("--record_first", default=False, action="store_true",
+                        help="For 1D and 2D: run the solver first and render the movie "
+                             "from the cached frames afterwards.")
+    parser.add_argument("-render_2d", metavar="render_2d", type=str, default="surface",
+                        choices=["surface", "heatmap"],
+                        help="For 2D: draw a 3D surface with contours or a heatmap (fast), "
+                             "for the heatmap z_lim are the color limits.")
     args = parser.parse_args()
     print(f"args: {args}")
 
@@ -225,6 +272,8 @@ if __name__ == "__main__":
                                     r_0=40.0, phi_0=45.0, z_0=50.0,
                                     z_per_frame=0.0),
                                 filename="anim.mp4",
+                                steps_per_frame=args.steps_per_frame,
+                                frame_budget=args.frame_budget,
                                 )
 
     if Box.dim == 3:
@@ -232,6 +281,17 @@ if __name__ == "__main__":
     else:
         slice_indices = [None, None, None]
 
+    if args.steps_per_products is None:
+        Products = None
+    else:
+        Products = products.Products(steps_per_products=args.steps_per_products,
+                                     products=args.products)
+
+    Scheduler = output_scheduler.get_scheduler(policy=args.save_policy,
+                                               steps_per_npz=args.steps_per_npz,
+                                               seconds=args.save_seconds,
+                                               threshold=args.save_change)
+
     # TODO: get mayavi lim to work
     # 3D works in single core mode
     SystemResult: Schroedinger = simulate_case(
@@ -244,6 +304,14 @@ if __name__ == "__main__":
                                     offscreen=args.offscreen,
                                     x_lim=x_lim, # from here just matplotlib
                                     y_lim=y_lim,
+                                    steps_per_npz=args.steps_per_npz,
+                                    products=Products,
+                                    output_scheduler=Scheduler,
+                                    video_sink=args.video_sink,
+                                    frames_per_segment=args.frames_per_segment,
+                                    record_first=args.record_first,
+                                    live_thread=args.live_thread,
+                                    render_2d=args.render_2d,
                                     )
 
     print("Single core done")
@@ -1,5 +1,23 @@
 #!/usr/bin/env python
 __all__ = ["constants",
+           "cost_model",
            "functions",
-           "simulate_case",
+           "isosurface",
+           "job_service",
+           "live_solver",
+           "manifest",
+           "output_scheduler",
+           "phase_diagram",
+           "prefetch",
+           "products",
+           "registry",
+           "resample",
+           "result_cache",
+           "segment_encoder",
+           "shared_grid",
+           "sweep",
+           "threads",
+           "video_sink",
+           "watchdog",
+           "work_queue",
            ]
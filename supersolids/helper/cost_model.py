@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Predicts run time and memory of sweep cases from their grid,
+calibrated with the past runs in the registry.
+
+The time per step is modelled as :math:`c \\, n \\log_2 n` (FFTs of n grid points)
+and the memory as :math:`b \\, n` plus the memory of an empty worker,
+with c and b fitted separately for each dimension with and without DDI.
+
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import psutil
+
+from supersolids.helper.registry import Registry
+
+# used without past runs, rough values of a single thread
+time_per_point_default: float = 2.0 * 10 ** -8
+bytes_per_point_default: float = 600.0
+# memory of a worker before any arrays (python, numpy, scipy)
+memory_base: int = 200 * 1024 ** 2
+
+
+def get_features(res: Dict[str, Optional[int]]) -> Tuple[int, int, bool]:
+    """
+    :return: Number of grid points, dimension and if DDI is used (3D, see sweep.build_system)
+
+    """
+    sizes = [value for value in res.values() if value is not None]
+    dim = len(sizes)
+
+    return int(np.prod(sizes)), dim, dim == 3
+
+
+def get_memory_available() -> int:
+    """
+    :return: Bytes of RAM available for new processes
+
+    """
+    return int(psutil.virtual_memory().available)
+
+
+class MemoryPeak:
+    """
+    Peak resident memory (RSS) of this process above its RSS when entered,
+    sampled on a thread. Unlike tracemalloc, it includes the native buffers
+    (e.g. of scipy.fft) and does not slow down every allocation.
+
+    """
+    def __init__(self, interval: float = 0.05):
+        """
+        :param interval: Seconds between the samples of the RSS
+
+        """
+        self.interval: float = interval
+        self.process: psutil.Process = psutil.Process()
+        self.stop: threading.Event = threading.Event()
+        self.watcher: threading.Thread = threading.Thread(target=self.watch, daemon=True)
+        self.rss_start: int = 0
+        self.rss_peak: int = 0
+
+    def sample(self) -> None:
+        self.rss_peak = max(self.rss_peak, self.process.memory_info().rss)
+
+    def watch(self) -> None:
+        while not self.stop.wait(self.interval):
+            self.sample()
+
+    @property
+    def peak(self) -> int:
+        """
+        :return: Bytes of the peak above the RSS when entered
+            (the memory of the worker itself is memory_base of the CostModel)
+
+        """
+        return self.rss_peak - self.rss_start
+
+    def __enter__(self) -> "MemoryPeak":
+        self.rss_start = self.process.memory_info().rss
+        self.rss_peak = self.rss_start
+        self.watcher.start()
+
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop.set()
+        self.watcher.join()
+        self.sample()
+
+
+class CostModel:
+    """
+    Time per step and peak memory of a case, fitted to past runs.
+
+    """
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None):
+        """
+        :param rows: Past runs as rows of the registry (see Registry.query), None for defaults
+
+        """
+        self.time_per_point: Dict[Tuple[int, bool], float] = {}
+        self.bytes_per_point: Dict[Tuple[int, bool], float] = {}
+        self.steps_fraction: Dict[int, float] = {}
+        if rows:
+            self.calibrate(rows)
+
+    @classmethod
+    def from_registry(cls, dir_path: Path) -> "CostModel":
+        return cls(Registry(dir_path).query())
+
+    def calibrate(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Fits the coefficients to the runs in rows, which finished with run_time and steps.
+        The time uses the median (robust against slow outliers),
+        the memory the maximum (a too small prediction could kill the node).
+
+        """
+        times: Dict[Tuple[int, bool], List[float]] = {}
+        memories: Dict[Tuple[int, bool], List[float]] = {}
+        fractions: Dict[int, List[float]] = {}
+        for row in rows:
+            points, dim, _ = get_features({"x": row["res_x"], "y": row["res_y"],
+                                           "z": row["res_z"]})
+            key = (dim, bool(row["ddi"]))
+            if row["run_time"] and row["steps"]:
+                times.setdefault(key, []).append(
+                    row["run_time"] / row["steps"] / (points * np.log2(max(points, 2))))
+                if row["max_timesteps"]:
+                    fractions.setdefault(dim, []).append(
+                        min(1.0, row["steps"] / row["max_timesteps"]))
+            if row.get("memory_peak"):
+                memories.setdefault(key, []).append(row["memory_peak"] / points)
+
+        self.time_per_point = {key: float(np.median(values)) for key, values in times.items()}
+        self.bytes_per_point = {key: float(np.max(values)) for key, values in memories.items()}
+        self.steps_fraction = {dim: float(np.median(values)) for dim, values in fractions.items()}
+
+    def time_per_step(self, res: Dict[str, Optional[int]]) -> float:
+        points, dim, ddi = get_features(res)
+        if (dim, ddi) in self.time_per_point:
+            coefficient = self.time_per_point[(dim, ddi)]
+        elif self.time_per_point:
+            # other kinds of runs are a better guess than the default
+            coefficient = float(np.median(list(self.time_per_point.values())))
+        else:
+            coefficient = time_per_point_default
+
+        return coefficient * points * np.log2(max(points, 2))
+
+    def predict(self, case: Dict[str, Any]) -> Tuple[float, int]:
+        """
+        :param case: Case of a sweep (see :mod:`supersolids.helper.sweep`)
+
+        :return: Predicted run time in seconds (single thread) and peak memory in bytes
+
+        """
+        points, dim, ddi = get_features(case["Res"])
+        steps = case["max_timesteps"] * self.steps_fraction.get(dim, 1.0)
+        bytes_per_point = self.bytes_per_point.get((dim, ddi), bytes_per_point_default)
+
+        return (float(self.time_per_step(case["Res"]) * steps),
+                int(memory_base + bytes_per_point * points))
@@ -11,10 +11,11 @@ Functions for Potential and initial wave function :math:`\psi_0`
 """
 
 import functools
+import json
 
 import numpy as np
 from scipy import stats
-from typing import Tuple, Callable, Optional, List
+from typing import Tuple, Callable, Optional, List, Dict
 
 from supersolids.helper import constants
 
@@ -42,6 +43,9 @@ class Resolution:
     def __str__(self) -> List[Optional[float]]:
         return str([self.x, self.y, self.z])
 
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        return {"x": self.x, "y": self.y, "z": self.z}
+
 
 class Box:
     """
@@ -74,6 +78,11 @@ class Box:
     def __str__(self) -> List[Optional[float]]:
         return str([self.x0, self.x1, self.y0, self.y1, self.z0, self.z1])
 
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        return {"x0": self.x0, "x1": self.x1,
+                "y0": self.y0, "y1": self.y1,
+                "z0": self.z0, "z1": self.z1}
+
     def lengths(self) -> List[float]:
         """
         Calculates the box lengths in the directions available in order [x, y, z]
@@ -664,6 +673,72 @@ def dt_adaptive(t, dt) -> float:
     return dt_adapted
 
 
+def callable_to_spec(func: Optional[Callable]) -> Optional[Dict]:
+    """
+    Describes func by name and keyword arguments,
+    so it can be saved as json and restored by :func:`spec_to_callable`.
+    Only functions of this module and functools.partial of them can be described.
+
+    :param func: Function of this module or functools.partial of it
+
+    :return: Dictionary with keys name and kwargs
+        or None if func is None or can not be described (e.g. lambda)
+
+    """
+    if func is None:
+        return None
+
+    kwargs = {}
+    if isinstance(func, functools.partial):
+        if func.args:
+            return None
+        kwargs = func.keywords
+        func = func.func
+
+    name = getattr(func, "__name__", None)
+    if (name is None) or (globals().get(name) is not func):
+        return None
+
+    kwargs_json = {}
+    for key, value in kwargs.items():
+        if isinstance(value, np.ndarray):
+            kwargs_json[key] = {"ndarray": value.tolist()}
+        elif isinstance(value, np.generic):
+            kwargs_json[key] = value.item()
+        else:
+            kwargs_json[key] = value
+
+    try:
+        json.dumps(kwargs_json)
+    except TypeError:
+        return None
+
+    return {"name": name, "kwargs": kwargs_json}
+
+
+def spec_to_callable(spec: Optional[Dict]) -> Optional[Callable]:
+    """
+    Restores a function described by :func:`callable_to_spec`.
+
+    :param spec: Dictionary with keys name and kwargs
+
+    :return: Function of this module with the keyword arguments set
+        or None if spec is None
+
+    """
+    if spec is None:
+        return None
+
+    kwargs = {key: np.array(value["ndarray"]) if isinstance(value, dict) else value
+              for key, value in spec["kwargs"].items()}
+    func = globals()[spec["name"]]
+
+    if kwargs:
+        return functools.partial(func, **kwargs)
+    else:
+        return func
+
+
 # Script runs, if script is run as main script (called by python *.py)
 if __name__ == '__main__':
     # due to fft of the points the res needs to be 2 **
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 from pathlib import Path
-from typing import Tuple
+from typing import List, Tuple
 
 
 def get_path(dir_path: Path,
@@ -44,3 +44,56 @@ def get_path(dir_path: Path,
 
     return input_path, last_index, dir_name, counting_format
 
+
+def new_path(dir_path: Path,
+             dir_name: str = "movie",
+             counting_format: str = "%03d",
+             retries: int = 100) -> Path:
+    """
+    Creates the next directory dir_name counted one up (see get_path).
+    The directory is created with mkdir, which fails if it already exists,
+    so processes running at the same time never get the same directory.
+
+    :param dir_path: Path where to look for old directories (movie data)
+    :param dir_name: General name of the directories without the counter
+    :param counting_format: Format of counter of the directories
+    :param retries: Number of tries, when other processes take the directory first
+
+    :return: Path of the created directory
+    """
+    for _ in range(retries):
+        _, last_index, dir_name, counting_format = get_path(dir_path, dir_name=dir_name,
+                                                            counting_format=counting_format)
+        input_path = Path(dir_path, dir_name + counting_format % (last_index + 1))
+        try:
+            input_path.mkdir(parents=True)
+            return input_path
+        except FileExistsError:
+            # another process was faster, look again
+            continue
+
+    raise FileExistsError(f"No new directory {dir_name} in {dir_path} after {retries} tries.")
+
+
+def get_step_frames(input_path: Path,
+                    filename_steps: str = "step_",
+                    file_pattern: str = ".npz") -> List[int]:
+    """
+    Looks up all saved steps in input_path.
+    As steps can be saved at irregular intervals, the frames are read from the filenames.
+
+    :param input_path: Path of the directory of the run (e.g. movie001)
+    :param filename_steps: Name of the files without the enumerator
+    :param file_pattern: File ending of the saved steps
+
+    :return: Sorted list of the frames of all saved steps
+    """
+    frames: List[int] = []
+    for step_path in input_path.glob(filename_steps + "*" + file_pattern):
+        try:
+            frames.append(int(step_path.name[len(filename_steps):-len(file_pattern)]))
+        except ValueError:
+            # e.g. temporary files, which are not steps
+            pass
+
+    return sorted(frames)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Isosurfaces of :math:`|\\psi|^2` as triangle meshes (marching cubes),
+saved compactly as npz next to the saved steps (e.g. mesh_000010.npz for step_000010.npz),
+so viewers only need to upload triangles instead of contouring the full grid.
+
+"""
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def marching_cubes_levels(density: np.ndarray,
+                          levels: Sequence[float],
+                          spacing: Sequence[float],
+                          origin: Sequence[float],
+                          ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extracts the isosurfaces of density at all levels and joins them to one mesh.
+    Levels outside of the range of density give no triangles.
+
+    :param density: 3D array of :math:`|\\psi|^2` (indices x, y, z)
+
+    :param levels: Absolute density values of the isosurfaces
+
+    :param spacing: Distance of the grid points in x, y, z
+
+    :param origin: Position of the grid point with index (0, 0, 0)
+
+    :return: verts (n, 3) in positions, faces (m, 3) as indices of verts,
+        vert_offsets and face_offsets (len(levels) + 1) marking the part of each level
+
+    """
+    # only needed to extract meshes, not to show them
+    from skimage.measure import marching_cubes
+
+    verts_all: List[np.ndarray] = []
+    faces_all: List[np.ndarray] = []
+    vert_offsets: List[int] = [0]
+    face_offsets: List[int] = [0]
+    for level in levels:
+        if density.min() < level < density.max():
+            verts, faces, _, _ = marching_cubes(density, level=level, spacing=tuple(spacing))
+            verts_all.append(verts + np.asarray(origin))
+            faces_all.append(faces + vert_offsets[-1])
+            vert_offsets.append(vert_offsets[-1] + len(verts))
+            face_offsets.append(face_offsets[-1] + len(faces))
+        else:
+            vert_offsets.append(vert_offsets[-1])
+            face_offsets.append(face_offsets[-1])
+
+    if verts_all:
+        verts = np.concatenate(verts_all)
+        faces = np.concatenate(faces_all)
+    else:
+        verts = np.empty((0, 3))
+        faces = np.empty((0, 3), dtype=int)
+
+    return verts, faces, np.array(vert_offsets), np.array(face_offsets)
+
+
+def extract_mesh(step_path: Path,
+                 mesh_path: Path,
+                 levels: Sequence[float],
+                 spacing: Sequence[float],
+                 origin: Sequence[float],
+                 relative: bool = True,
+                 ) -> Path:
+    """
+    Loads psi_val of a saved step and saves the isosurfaces of :math:`|\\psi|^2`.
+    Runs in the worker processes.
+
+    :param relative: If True, levels are fractions of the maximum density of the frame,
+        otherwise absolute densities
+
+    :return: mesh_path
+
+    """
+    with open(step_path, "rb") as f:
+        psi_val = np.load(file=f)["psi_val"]
+    density = np.abs(psi_val) ** 2
+
+    levels_abs = np.asarray(levels, dtype=float)
+    if relative:
+        levels_abs = levels_abs * density.max()
+
+    verts, faces, vert_offsets, face_offsets = marching_cubes_levels(density, levels_abs,
+                                                                     spacing, origin)
+    save_mesh(mesh_path, verts, faces, levels_abs, vert_offsets, face_offsets)
+
+    return mesh_path
+
+
+def save_mesh(mesh_path: Path,
+              verts: np.ndarray,
+              faces: np.ndarray,
+              levels: np.ndarray,
+              vert_offsets: np.ndarray,
+              face_offsets: np.ndarray) -> None:
+    # single precision positions and 32 bit indices are plenty for a viewer
+    with open(mesh_path, "wb") as f:
+        np.savez_compressed(f,
+                            verts=verts.astype(np.float32),
+                            faces=faces.astype(np.int32),
+                            levels=levels,
+                            vert_offsets=vert_offsets,
+                            face_offsets=face_offsets)
+
+
+def load_mesh(mesh_path: Path) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Loads a saved mesh.
+
+    :return: verts, faces and the level of each vertex (for coloring),
+        None if the mesh does not exist
+
+    """
+    if not Path(mesh_path).is_file():
+        return None
+
+    with np.load(mesh_path) as mesh:
+        verts = mesh["verts"]
+        faces = mesh["faces"]
+        vert_levels = np.repeat(mesh["levels"], np.diff(mesh["vert_offsets"]))
+
+    return verts, faces, vert_levels
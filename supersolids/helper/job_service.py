@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Local job service: simulations are submitted as json (cases as in
+:mod:`supersolids.helper.sweep`) over HTTP and run on a process pool.
+Jobs can be followed (status, metrics of the manifest, latest reduced density)
+and cancelled. Submitting a case, which already runs or converged, returns that job
+instead of starting a duplicate.
+
+Endpoints (json):
+
+* GET /jobs: all jobs
+* POST /jobs: submit the parameters, which differ from default_case, e.g. {"a_s": 90}
+* GET /jobs/<id>: status of a job
+* GET /jobs/<id>/metrics: t, mu, E and progress of the last saved frame
+* GET /jobs/<id>/density?stride=2: latest density, integrated over z for 3D
+* DELETE /jobs/<id>: cancels a job (queued jobs are dropped, running ones stopped)
+
+Only the standard library is used (http.server), the service binds to localhost.
+
+"""
+
+import json
+import threading
+import time
+from concurrent import futures
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from supersolids.helper import get_path
+from supersolids.helper.manifest import Manifest
+from supersolids.helper.result_cache import ResultCache
+from supersolids.helper.sweep import get_case_hash, parameter_grid, run_case
+
+# status of jobs, which may still produce results
+statuses_active: List[str] = ["queued", "running", "cancelling"]
+
+
+class JobService:
+    def __init__(self,
+                 dir_path: Path = Path.home().joinpath("supersolids", "results"),
+                 max_workers: Optional[int] = None,
+                 steps_per_npz: int = 10,
+                 use_cache: bool = True,
+                 filename_stop: str = "stop"):
+        """
+        :param dir_path: Path where the movieNNN directories and the registry lie
+
+        :param max_workers: Number of jobs running at the same time, None for all cores
+
+        :param steps_per_npz: Number of dt steps skipped between saved npz
+            (also the cadence of metrics and density)
+
+        :param use_cache: If True, a case with a converged run of the same parameters
+            in the registry is not run again (status cached)
+
+        :param filename_stop: Name of the file in the movieNNN directory,
+            which stops a running job
+
+        """
+        self.dir_path: Path = Path(dir_path)
+        self.dir_path.mkdir(parents=True, exist_ok=True)
+        self.steps_per_npz: int = steps_per_npz
+        self.use_cache: bool = use_cache
+        self.filename_stop: str = filename_stop
+        self.executor: futures.ProcessPoolExecutor = futures.ProcessPoolExecutor(
+            max_workers=max_workers)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.futures: Dict[str, futures.Future] = {}
+        # case_hash of cases being submitted, set when their job is in jobs
+        self.reserved: Dict[str, threading.Event] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            future = self.futures.get(job_id)
+            if (job["status"] == "queued") and (future is not None) and future.running():
+                job["status"] = "running"
+
+            return dict(job)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [self.get_job(job_id) for job_id in list(self.jobs)]
+
+    def submit(self, parameters: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        :param parameters: Parameters of the case, which differ from default_case
+
+        :return: The job and True, if it is new (False for a running or cached duplicate)
+
+        :raises ValueError: For parameters, which are no valid case
+            (see :func:`supersolids.helper.sweep.check_case`)
+
+        """
+        if not isinstance(parameters, dict):
+            raise ValueError("Parameters need to be a json object.")
+        case = parameter_grid({}, base=parameters)[0]
+        case_hash = get_case_hash(case)
+        while True:
+            with self.lock:
+                for job in self.jobs.values():
+                    if (job["case_hash"] == case_hash) and (job["status"] in statuses_active):
+                        return dict(job), False
+                # the case is reserved before the cache lookup and new_path,
+                # so identical requests at the same time can not start it twice
+                reserved = self.reserved.get(case_hash)
+                if reserved is None:
+                    reserved = self.reserved[case_hash] = threading.Event()
+                    break
+            # the same case is being submitted by another request, its job is returned
+            reserved.wait()
+
+        try:
+            job = {"case": case, "case_hash": case_hash,
+                   "submitted": datetime.now().isoformat(timespec="seconds")}
+            hit = ResultCache(self.dir_path).lookup(case_hash) if self.use_cache else None
+            if hit is not None:
+                job.update({"id": hit["dir_name"], "dir_name": hit["dir_name"],
+                            "status": "cached", "t": hit["t"], "mu": hit["mu"], "E": hit["E"]})
+                with self.lock:
+                    self.jobs[job["id"]] = job
+                return dict(job), False
+
+            # the directory is created now, so the job can be followed from the start
+            input_path = get_path.new_path(self.dir_path)
+            job.update({"id": input_path.name, "dir_name": input_path.name,
+                        "status": "queued"})
+            with self.lock:
+                self.jobs[job["id"]] = job
+                future = self.executor.submit(run_case, case, self.dir_path,
+                                              steps_per_npz=self.steps_per_npz,
+                                              input_path=input_path,
+                                              stop_path=Path(input_path, self.filename_stop))
+                self.futures[job["id"]] = future
+            future.add_done_callback(lambda future: self.done(job["id"], future))
+
+            return dict(job), True
+        finally:
+            with self.lock:
+                del self.reserved[case_hash]
+            reserved.set()
+
+    def done(self, job_id: str, future: futures.Future) -> None:
+        with self.lock:
+            job = self.jobs[job_id]
+            if future.cancelled():
+                job["status"] = "cancelled"
+                return
+            try:
+                job.update(future.result())
+            except Exception as e:
+                job["status"] = "failed"
+                job["reason"] = repr(e)
+            job["finished"] = datetime.now().isoformat(timespec="seconds")
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Drops a queued job, running jobs get a stop file and stop after their current step.
+
+        :return: The job, None if it is unknown
+
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+
+        if job["status"] in statuses_active:
+            if self.futures[job_id].cancel():
+                input_path = Path(self.dir_path, job["dir_name"])
+                if input_path.is_dir() and not any(input_path.iterdir()):
+                    input_path.rmdir()
+            else:
+                Path(self.dir_path, job["dir_name"], self.filename_stop).touch()
+                with self.lock:
+                    if self.jobs[job_id]["status"] in statuses_active:
+                        self.jobs[job_id]["status"] = "cancelling"
+
+        return self.get_job(job_id)
+
+    def metrics(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        :return: Entry of the last saved frame (frame, t, mu, E) with progress
+            and seconds since it was saved, None if the job is unknown
+
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+
+        manifest = Manifest(Path(self.dir_path, job["dir_name"]))
+        entries = manifest.entries()
+        metrics: Dict[str, Any] = {"id": job_id, "status": job["status"],
+                                   "frames_saved": len(entries)}
+        if entries:
+            entry = entries[-1]
+            metrics.update(entry)
+            if entry.get("frame_end"):
+                metrics["progress"] = (entry["frame"] + 1) / entry["frame_end"]
+            metrics["age"] = time.time() - manifest.path.stat().st_mtime
+
+        return metrics
+
+    def density(self, job_id: str, stride: int = 1) -> Optional[Dict[str, Any]]:
+        """
+        :param stride: Only every stride-th grid point in each direction is returned
+
+        :return: :math:`|\\psi|^2` of the last saved frame (integrated over z for 3D)
+            with its frame, None if the job is unknown or nothing is saved yet
+
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+
+        input_path = Path(self.dir_path, job["dir_name"])
+        entry = Manifest(input_path).last_valid()
+        if entry is None:
+            return None
+
+        with open(Path(input_path, entry["file"]), "rb") as f:
+            density = np.abs(np.load(file=f)["psi_val"]) ** 2.0
+        if density.ndim == 3:
+            density = density.sum(axis=2)
+        density = density[tuple(slice(None, None, stride) for _ in range(density.ndim))]
+
+        return {"id": job_id, "frame": entry["frame"], "t": entry.get("t"),
+                "shape": list(density.shape), "density": density.tolist()}
+
+    def shutdown(self) -> None:
+        with self.lock:
+            job_ids = list(self.futures)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self.executor.shutdown(wait=True)
+
+
+def make_handler(service: JobService) -> type:
+    """
+    :return: Request handler class of http.server answering with service
+        (see the endpoints of this module)
+
+    """
+    class JobHandler(BaseHTTPRequestHandler):
+        def send_json(self, content: Any, status: HTTPStatus = HTTPStatus.OK) -> None:
+            body = json.dumps(content).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_not_found(self) -> None:
+            self.send_json({"error": f"{self.path} not found"}, HTTPStatus.NOT_FOUND)
+
+        def get_parts(self) -> Tuple[List[str], Dict[str, List[str]]]:
+            url = urlparse(self.path)
+            return [part for part in url.path.split("/") if part], parse_qs(url.query)
+
+        def do_GET(self) -> None:
+            parts, query = self.get_parts()
+            if parts == ["jobs"]:
+                self.send_json(service.list_jobs())
+                return
+            if (len(parts) < 2) or (parts[0] != "jobs"):
+                self.send_not_found()
+                return
+
+            job_id = parts[1]
+            if len(parts) == 2:
+                content = service.get_job(job_id)
+            elif parts[2:] == ["metrics"]:
+                content = service.metrics(job_id)
+            elif parts[2:] == ["density"]:
+                try:
+                    stride = max(1, int(query.get("stride", ["1"])[0]))
+                except ValueError:
+                    self.send_json({"error": "stride needs to be an integer"},
+                                   HTTPStatus.BAD_REQUEST)
+                    return
+                content = service.density(job_id, stride=stride)
+            else:
+                content = None
+
+            if content is None:
+                self.send_not_found()
+            else:
+                self.send_json(content)
+
+        def do_POST(self) -> None:
+            parts, _ = self.get_parts()
+            if parts != ["jobs"]:
+                self.send_not_found()
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                parameters = json.loads(self.rfile.read(length) or b"{}")
+                job, new = service.submit(parameters)
+            except (ValueError, TypeError) as e:
+                self.send_json({"error": str(e)}, HTTPStatus.BAD_REQUEST)
+                return
+
+            self.send_json({"job": job, "new": new},
+                           HTTPStatus.CREATED if new else HTTPStatus.OK)
+
+        def do_DELETE(self) -> None:
+            parts, _ = self.get_parts()
+            job = service.cancel(parts[1]) if (len(parts) == 2 and parts[0] == "jobs") else None
+            if job is None:
+                self.send_not_found()
+            else:
+                self.send_json(job)
+
+    return JobHandler
+
+
+def serve(service: JobService, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """
+    Answers requests until interrupted (e.g. KeyboardInterrupt), then cancels all jobs.
+
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Job service on http://{host}:{port}/jobs")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.shutdown()
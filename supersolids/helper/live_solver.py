@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Runs the time steps of a Schroedinger System on a background thread
+and publishes the newest density, so a live view can show it
+without the solver ever waiting for the rendering (frames are dropped instead).
+
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class LatestFrame:
+    """
+    Slot holding only the newest published frame.
+    A published array is never changed afterwards (the solver publishes a new array
+    every time), so swapping the reference under the lock acts as double buffer:
+    the reader can draw its frame while the next one is computed.
+
+    """
+    def __init__(self):
+        self.lock: threading.Lock = threading.Lock()
+        self.density: Optional[np.ndarray] = None
+        self.info: Dict[str, Any] = {}
+        self.version: int = 0
+
+    def publish(self, density: np.ndarray, **info) -> None:
+        with self.lock:
+            self.density = density
+            self.info = info
+            self.version += 1
+
+    def latest(self, version_seen: int = 0) -> Optional[Tuple[int, np.ndarray, Dict[str, Any]]]:
+        """
+        :param version_seen: Version of the frame the reader has already shown
+
+        :return: Version, density and info of the newest frame,
+            None if there is no newer frame than version_seen
+
+        """
+        with self.lock:
+            if self.version == version_seen:
+                return None
+            return self.version, self.density, self.info
+
+
+class LiveSolver(threading.Thread):
+    """
+    Background thread doing the time steps of System until convergence,
+    divergence or max_timesteps. Convergence is checked after every step,
+    the density is published at most every publish_interval seconds.
+
+    """
+    def __init__(self,
+                 System,
+                 accuracy: float = 10 ** -6,
+                 publish_interval: float = 0.05,
+                 frame: Optional[LatestFrame] = None,
+                 ):
+        """
+        :param System: Schrödinger equations for the specified system
+
+        :param accuracy: Convergence is reached when relative error of mu is smaller
+            than accuracy, where :math:`\\mu = - \\\\log(\\psi_{normed}) / (2 dt)`
+
+        :param publish_interval: Minimum wall-clock seconds between published frames
+
+        :param frame: Slot to publish the frames to, a new one if None
+
+        """
+        super().__init__(daemon=True)
+        self.System = System
+        self.accuracy: float = accuracy
+        self.publish_interval: float = publish_interval
+        self.frame: LatestFrame = frame if frame is not None else LatestFrame()
+
+        self.status: str = "running"
+        self.steps: int = 0
+        self.mu_rel: float = np.nan
+        self.stop_event: threading.Event = threading.Event()
+
+    def publish(self) -> None:
+        self.frame.publish(self.System.get_density(p=2.0),
+                           step=self.steps,
+                           t=self.System.t,
+                           mu=np.real(self.System.mu),
+                           E=np.real(self.System.E),
+                           mu_rel=self.mu_rel)
+
+    def run(self) -> None:
+        self.publish()
+        last_publish = time.perf_counter()
+        try:
+            while self.steps < self.System.max_timesteps - 1:
+                if self.stop_event.is_set():
+                    self.status = "aborted"
+                    break
+
+                mu_old = self.System.mu
+                self.System.time_step()
+                self.steps += 1
+                self.mu_rel = np.abs((self.System.mu - mu_old) / self.System.mu)
+
+                if self.mu_rel < self.accuracy:
+                    self.status = "converged"
+                    break
+                elif np.isnan(self.mu_rel) and np.isnan(self.System.mu):
+                    self.status = "diverged"
+                    break
+
+                if time.perf_counter() - last_publish >= self.publish_interval:
+                    self.publish()
+                    last_publish = time.perf_counter()
+            else:
+                self.status = "max_timesteps"
+        except BaseException as e:
+            self.status = "failed"
+            print(f"Live solver failed: {e!r}")
+            raise
+        finally:
+            # the last state is always shown
+            self.publish()
+
+    def stop(self) -> None:
+        """
+        Asks the thread to stop after the current step.
+
+        """
+        self.stop_event.set()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Crash-safe saving of the steps of a run.
+Files are written to a temporary file first and then renamed,
+so an interrupted run never leaves a half-written npz behind.
+Every saved step is listed in the manifest of the run (one json per line),
+which is used to find the last valid frame to resume from.
+
+"""
+
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from supersolids.helper import get_path
+
+
+def replace_atomic(path: Path, write) -> None:
+    """
+    Calls write with an open temporary file next to path
+    and renames it to path afterwards (atomic on POSIX and Windows).
+
+    :param path: Path of the file to write
+
+    :param write: Function writing the content to the given binary file object
+
+    """
+    path = Path(path)
+    path_tmp = Path(path.parent, path.name + ".tmp")
+    try:
+        with open(path_tmp, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path_tmp, path)
+    finally:
+        if path_tmp.exists():
+            path_tmp.unlink()
+
+
+def save_npz_atomic(path: Path, **arrays) -> None:
+    """
+    Saves arrays compressed as npz to path (see :func:`replace_atomic`).
+
+    :param path: Path of the npz file
+
+    :param arrays: Arrays to save by their keywords
+
+    """
+    replace_atomic(path, lambda f: np.savez_compressed(f, **arrays))
+
+
+def is_valid_npz(path: Path, key: str = "psi_val") -> bool:
+    """
+    Checks if the npz at path can be read and contains key.
+
+    """
+    try:
+        with np.load(path) as npz:
+            npz[key]
+    except (FileNotFoundError, zipfile.BadZipFile, ValueError, KeyError, OSError):
+        return False
+
+    return True
+
+
+class Manifest:
+    """
+    Manifest of the saved steps of a run (manifest.jsonl in the movieNNN directory).
+
+    """
+    def __init__(self, input_path: Path, filename_manifest: str = "manifest.jsonl"):
+        """
+        :param input_path: Path of the movieNNN directory of the run
+
+        :param filename_manifest: Name of the manifest file
+
+        """
+        self.input_path: Path = Path(input_path)
+        self.path: Path = Path(self.input_path, filename_manifest)
+
+    def append(self, **entry) -> None:
+        """
+        Appends entry (e.g. frame, file, t, mu, E) as one line.
+        Only call it after the file of the entry is completely written.
+
+        """
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        Reads all entries. A torn last line (crash while appending) is skipped.
+
+        """
+        if not self.path.is_file():
+            return []
+
+        entries: List[Dict[str, Any]] = []
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+
+        return entries
+
+    def get_status(self) -> Optional[str]:
+        """
+        :return: Status of the run (e.g. converged, diverged) saved with its final frame,
+            None if the run did not end (yet) or has no manifest
+
+        """
+        entries = self.entries()
+
+        return entries[-1].get("status") if entries else None
+
+    def last_valid(self,
+                   filename_steps: str = "step_",
+                   steps_format: str = "%06d") -> Optional[Dict[str, Any]]:
+        """
+        Finds the last frame, whose npz can be read.
+        Runs without manifest (older runs) are scanned for their saved steps,
+        then only the frame and file are known.
+
+        :param filename_steps: Name of the npz files without the enumerator
+
+        :param steps_format: Formatting string to enumerate the files
+
+        :return: Entry of the last valid frame, None if there is none
+
+        """
+        entries = self.entries()
+        if not entries:
+            entries = [{"frame": frame,
+                        "file": filename_steps + steps_format % frame + ".npz"}
+                       for frame in get_path.get_step_frames(self.input_path,
+                                                             filename_steps=filename_steps)]
+
+        for entry in reversed(entries):
+            if entry.get("file") is None:
+                # frame not saved, as psi_val was not finite
+                continue
+            if is_valid_npz(Path(self.input_path, entry["file"])):
+                return entry
+            print(f"Frame {entry['frame']} can't be read. Maybe the simulation "
+                  "was stopped before the file was successfully created.")
+
+        return None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Schedulers deciding at which frames simulate_raw saves psi_val.
+The final frame is always saved by simulate_raw, regardless of the scheduler.
+
+"""
+
+import time
+from typing import List, Optional
+
+import numpy as np
+
+# policies, which can be chosen by name (see get_scheduler)
+policies: List[str] = ["steps", "wall_clock", "change"]
+
+
+class OutputScheduler:
+    """
+    Base class for output schedulers.
+    simulate_raw asks is_due after every step and calls saved after saving.
+
+    """
+    def is_due(self, System, frame: int) -> bool:
+        raise NotImplementedError
+
+    def saved(self, System, frame: int) -> None:
+        pass
+
+
+class StepScheduler(OutputScheduler):
+    def __init__(self, steps_per_npz: int = 10):
+        """
+        Saves every steps_per_npz steps (counted by frame).
+
+        :param steps_per_npz: Number of dt steps skipped between saved npz.
+
+        """
+        self.steps_per_npz: int = steps_per_npz
+
+    def is_due(self, System, frame: int) -> bool:
+        return (frame % self.steps_per_npz) == 0
+
+
+class WallClockScheduler(OutputScheduler):
+    def __init__(self, seconds: float = 60.0):
+        """
+        Saves, when at least seconds passed since the last save.
+        The first frame is saved.
+
+        :param seconds: Wall-clock interval between saved npz.
+
+        """
+        self.seconds: float = seconds
+        self.last_save: Optional[float] = None
+
+    def is_due(self, System, frame: int) -> bool:
+        return ((self.last_save is None)
+                or (time.perf_counter() - self.last_save >= self.seconds))
+
+    def saved(self, System, frame: int) -> None:
+        self.last_save = time.perf_counter()
+
+
+class ChangeScheduler(OutputScheduler):
+    def __init__(self,
+                 threshold: float = 10 ** -2,
+                 check_every: int = 1,
+                 steps_max: Optional[int] = None):
+        """
+        Saves, when the relative L2 change of the density :math:`|\\psi|^2`
+        since the last saved frame exceeds threshold.
+        The first frame is saved.
+
+        :param threshold: Relative change :math:`||n - n_{saved}|| / ||n_{saved}||`
+            needed to save the next frame.
+
+        :param check_every: Number of dt steps between checks,
+            as every check needs the density of the whole grid.
+
+        :param steps_max: If not None, a frame is saved at the latest
+            steps_max steps after the last saved one.
+
+        """
+        self.threshold: float = threshold
+        self.check_every: int = check_every
+        self.steps_max: Optional[int] = steps_max
+
+        self.density_saved: Optional[np.ndarray] = None
+        self.density_saved_norm: float = 0.0
+        self.frame_saved: Optional[int] = None
+
+    def get_change(self, System) -> float:
+        density = System.get_density(p=2.0)
+        if self.density_saved_norm == 0.0:
+            return np.inf
+        return np.linalg.norm(density - self.density_saved) / self.density_saved_norm
+
+    def is_due(self, System, frame: int) -> bool:
+        if self.density_saved is None:
+            return True
+        if (self.steps_max is not None) and (frame - self.frame_saved >= self.steps_max):
+            return True
+        if ((frame - self.frame_saved) % self.check_every) != 0:
+            return False
+
+        return self.get_change(System) > self.threshold
+
+    def saved(self, System, frame: int) -> None:
+        self.density_saved = System.get_density(p=2.0)
+        self.density_saved_norm = np.linalg.norm(self.density_saved)
+        self.frame_saved = frame
+
+
+def get_scheduler(policy: str = "steps",
+                  steps_per_npz: int = 10,
+                  seconds: float = 60.0,
+                  threshold: float = 10 ** -2,
+                  steps_max: Optional[int] = None) -> OutputScheduler:
+    """
+    Constructs an output scheduler by the name of its policy.
+
+    :param policy: One of "steps", "wall_clock", "change"
+
+    :param steps_per_npz: Number of dt steps skipped between saved npz (policy steps).
+
+    :param seconds: Wall-clock interval between saved npz (policy wall_clock).
+
+    :param threshold: Relative L2 change of the density
+        needed to save the next frame (policy change).
+
+    :param steps_max: If not None, maximum of dt steps between saved npz (policy change).
+
+    :return: OutputScheduler
+
+    """
+    if policy == "steps":
+        return StepScheduler(steps_per_npz=steps_per_npz)
+    elif policy == "wall_clock":
+        return WallClockScheduler(seconds=seconds)
+    elif policy == "change":
+        return ChangeScheduler(threshold=threshold, steps_max=steps_max)
+    else:
+        raise ValueError(f"Unknown policy {policy}, available are {policies}.")
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Adaptive phase diagrams on top of the sweep engine (see :mod:`supersolids.helper.sweep`).
+Every converged case is classified by a cheap order parameter of its ground state
+(modulation contrast and number of density peaks along x).
+Starting from a coarse grid, only cells whose corners are classified differently
+are split, until the case budget is used up, so the runs concentrate at the phase boundaries.
+
+"""
+
+import itertools
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from supersolids.helper import get_path
+from supersolids.helper.manifest import replace_atomic
+from supersolids.helper.products import get_axis_names
+from supersolids.helper.sweep import Sweep, check_case, default_case, is_number
+
+# phases told apart by classify
+phases: List[str] = ["unmodulated", "supersolid", "droplets"]
+
+# corner of a cell: one value for each axis
+Point = Tuple[float, ...]
+
+
+def get_profile(psi_val: np.ndarray) -> np.ndarray:
+    """
+    :return: Density :math:`|\\psi|^2` integrated over all directions besides x
+        (the long axis of the trap)
+
+    """
+    density = np.abs(psi_val) ** 2.0
+    # the array axis of x depends on dim (2D is (y, x))
+    axis_x = get_axis_names(density.ndim).index("x")
+
+    return density.sum(axis=tuple(axis for axis in range(density.ndim) if axis != axis_x))
+
+
+def get_order_parameters(psi_val: np.ndarray, peak_min: float = 0.1) -> Dict[str, float]:
+    """
+    Order parameters of a ground state along x.
+
+    :param psi_val: Ground state (1D, 2D or 3D)
+
+    :param peak_min: Local maxima of the profile lower than this fraction of its maximum
+        are not counted as peaks (noise in the tails)
+
+    :return: Number of peaks and contrast :math:`(n_{max} - n_{min}) / (n_{max} + n_{min})`
+        between neighbouring peaks (median of them, as the tails of the trap
+        lower the outer ones, 0 for a single peak)
+
+    """
+    profile = get_profile(psi_val)
+    inner = profile[1:-1]
+    maxima = np.flatnonzero((inner > profile[:-2]) & (inner >= profile[2:])
+                            & (inner > peak_min * profile.max())) + 1
+
+    contrasts = []
+    for left, right in zip(maxima[:-1], maxima[1:]):
+        n_max = min(profile[left], profile[right])
+        n_min = profile[left:right + 1].min()
+        contrasts.append((n_max - n_min) / (n_max + n_min))
+
+    return {"peaks": float(len(maxima)),
+            "contrast": float(np.median(contrasts)) if contrasts else 0.0}
+
+
+def classify(order_parameters: Dict[str, float],
+             contrast_min: float = 0.1,
+             contrast_droplets: float = 0.9) -> str:
+    """
+    :param order_parameters: See get_order_parameters
+
+    :param contrast_min: Minimal contrast of a modulated state
+
+    :param contrast_droplets: Contrast, above which the peaks are isolated droplets
+        (no superfluid overlap between them)
+
+    :return: One of phases
+
+    """
+    if (order_parameters["peaks"] < 2) or (order_parameters["contrast"] < contrast_min):
+        return "unmodulated"
+    elif order_parameters["contrast"] < contrast_droplets:
+        return "supersolid"
+    else:
+        return "droplets"
+
+
+def load_final(input_path: Path, filename_steps: str = "step_",
+               steps_format: str = "%06d") -> np.ndarray:
+    """
+    :return: psi_val of the last saved step of the run in input_path
+
+    """
+    frame = get_path.get_step_frames(input_path, filename_steps=filename_steps)[-1]
+    with open(Path(input_path, filename_steps + steps_format % frame + ".npz"), "rb") as f:
+        return np.load(file=f)["psi_val"]
+
+
+class PhaseMapper:
+    """
+    Refines cells of a grid over some parameters of the cases (axes),
+    where the phases of the corners differ.
+
+    """
+    def __init__(self,
+                 axes: Dict[str, Tuple[float, float]],
+                 base: Optional[Dict[str, Any]] = None,
+                 points: int = 3,
+                 budget: int = 50,
+                 max_depth: int = 4,
+                 log_axes: Optional[List[str]] = None,
+                 classified: Optional[List[str]] = None,
+                 dir_path: Path = Path.home().joinpath("supersolids", "results"),
+                 result_path: Optional[Path] = None,
+                 **sweep_kwargs):
+        """
+        :param axes: Lower and upper bound of each parameter to map, e.g. {"a_s": (80, 100)}
+
+        :param base: Parameters fixed for all cases, which differ from default_case
+
+        :param points: Number of values of each axis of the initial (coarse) grid
+
+        :param budget: Maximum number of cases (including the initial grid)
+
+        :param max_depth: Maximum number of times a cell of the initial grid is halved
+
+        :param log_axes: Axes split geometrically (e.g. N), instead of arithmetically
+
+        :param classified: Status of cases, which are classified.
+            None for converged and cached.
+
+        :param dir_path: Path where the runs, the registry and the result are saved
+
+        :param result_path: Json file with the classified points.
+            If None, a new phase_diagram_<date>.json in dir_path.
+
+        :param sweep_kwargs: Passed to Sweep (e.g. max_workers, continuation)
+
+        :raises ValueError: For unknown parameters, axes which are not numeric
+            or less than 2 points (see :func:`supersolids.helper.sweep.check_case`)
+
+        """
+        base = base or {}
+        check_case(base)
+        for key, bounds in axes.items():
+            if (key not in default_case) or not is_number(default_case[key]):
+                numeric = [name for name, value in default_case.items() if is_number(value)]
+                raise ValueError(f"Axis {key} needs to be a numeric parameter. "
+                                 f"Choose from {numeric}.")
+            if (len(bounds) != 2) or not all(is_number(bound) for bound in bounds):
+                raise ValueError(f"Axis {key} needs a lower and upper bound, but got {bounds!r}.")
+        if points < 2:
+            raise ValueError("An axis needs at least 2 points.")
+
+        self.axes: Dict[str, Tuple[float, float]] = axes
+        self.keys: List[str] = list(axes.keys())
+        self.base: Dict[str, Any] = base
+        self.points: int = points
+        self.budget: int = budget
+        self.max_depth: int = max_depth
+        self.log_axes: List[str] = log_axes or []
+        self.classified: List[str] = classified or ["converged", "cached"]
+        self.dir_path: Path = Path(dir_path)
+        if result_path is None:
+            result_path = Path(self.dir_path, "phase_diagram_"
+                               f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json")
+        self.result_path: Path = result_path
+        self.sweep_kwargs: Dict[str, Any] = sweep_kwargs
+
+        # result of every point run: phase (None if not classified), order parameters, ...
+        self.results: Dict[Point, Dict[str, Any]] = {}
+        # cells as lower and upper corner with their depth
+        self.cells: List[Tuple[Point, Point, int]] = []
+
+    def get_values(self, key: str, low: float, high: float, number: int) -> List[float]:
+        if key in self.log_axes:
+            values = np.geomspace(low, high, number)
+        else:
+            values = np.linspace(low, high, number)
+
+        return [float(value) for value in values]
+
+    def get_corners(self, low: Point, high: Point) -> List[Point]:
+        return list(itertools.product(*zip(low, high)))
+
+    def get_case(self, point: Point) -> Dict[str, Any]:
+        case = dict(default_case)
+        case.update(self.base)
+        for key, value in zip(self.keys, point):
+            # e.g. N stays an integer
+            case[key] = type(default_case[key])(value)
+
+        return case
+
+    def run_points(self, points: List[Point]) -> None:
+        """
+        Runs the cases of points as one sweep and classifies the converged ones.
+
+        """
+        states = Sweep([self.get_case(point) for point in points], dir_path=self.dir_path,
+                       **self.sweep_kwargs).run()
+        for point, state in zip(points, states):
+            result = {"point": dict(zip(self.keys, point)),
+                      "status": state["status"],
+                      "dir_name": state.get("dir_name"),
+                      "phase": None}
+            if state["status"] in self.classified:
+                psi_val = load_final(Path(self.dir_path, state["dir_name"]))
+                result.update(get_order_parameters(psi_val))
+                result["phase"] = classify(result)
+            self.results[point] = result
+        self.write_result()
+
+    def write_result(self) -> None:
+        self.result_path.parent.mkdir(parents=True, exist_ok=True)
+        results = list(self.results.values())
+        replace_atomic(self.result_path,
+                       lambda f: f.write(json.dumps(results, indent=1).encode("utf-8")))
+
+    def is_boundary(self, low: Point, high: Point) -> bool:
+        """
+        :return: True, if the classified corners of the cell have different phases
+            (corners not classified, e.g. diverged, are ignored)
+
+        """
+        corner_phases = {self.results[corner]["phase"]
+                         for corner in self.get_corners(low, high)}
+        corner_phases.discard(None)
+
+        return len(corner_phases) > 1
+
+    def split(self, low: Point, high: Point) -> List[Tuple[Point, Point]]:
+        """
+        :return: The :math:`2^d` halves of the cell
+
+        """
+        halves = []
+        for key, value_low, value_high in zip(self.keys, low, high):
+            value_mid = self.get_values(key, value_low, value_high, 3)[1]
+            halves.append([(value_low, value_mid), (value_mid, value_high)])
+
+        return [(tuple(bounds[0] for bounds in cell), tuple(bounds[1] for bounds in cell))
+                for cell in itertools.product(*halves)]
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Runs the initial grid, then splits boundary cells (biggest first),
+        while the new corners fit into the budget.
+
+        :return: Results of all points
+            (point, status, dir_name, phase and order parameters)
+
+        """
+        grids = [self.get_values(key, *self.axes[key], self.points) for key in self.keys]
+        self.run_points(list(itertools.product(*grids)))
+        self.cells = [(tuple(grid[i] for grid, i in zip(grids, index)),
+                       tuple(grid[i + 1] for grid, i in zip(grids, index)),
+                       0)
+                      for index in itertools.product(range(self.points - 1),
+                                                     repeat=len(self.keys))]
+
+        while True:
+            boundary = [cell for cell in self.cells
+                        if (cell[2] < self.max_depth) and self.is_boundary(cell[0], cell[1])]
+            # shallow (big) cells first, so the boundary is resolved evenly
+            boundary.sort(key=lambda cell: cell[2])
+
+            points_new: List[Point] = []
+            for cell in boundary:
+                halves = self.split(cell[0], cell[1])
+                corners = {corner for low, high in halves
+                           for corner in self.get_corners(low, high)}
+                corners_new = [corner for corner in sorted(corners)
+                               if (corner not in self.results) and (corner not in points_new)]
+                if len(self.results) + len(points_new) + len(corners_new) > self.budget:
+                    break
+                points_new += corners_new
+                self.cells.remove(cell)
+                self.cells += [(low, high, cell[2] + 1) for low, high in halves]
+
+            if not points_new:
+                break
+            print(f"phase diagram: {len(points_new)} new points, "
+                  f"{len(self.results) + len(points_new)}/{self.budget} of the budget")
+            self.run_points(points_new)
+
+        return list(self.results.values())
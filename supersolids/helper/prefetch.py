@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Read-ahead of saved frames for viewers.
+The next frames are loaded (decompressed) and reduced (e.g. to :math:`|\\psi|^2`)
+in a thread or process pool, while the current frame is shown.
+
+"""
+
+import collections
+from concurrent import futures
+from pathlib import Path
+from typing import Any, Callable, Deque, Iterator, List
+
+import numpy as np
+
+
+def load_density(psi_val_path: Path) -> np.ndarray:
+    """
+    Loads psi_val from the npz at psi_val_path and reduces it to :math:`|\\psi|^2`.
+
+    """
+    with open(psi_val_path, "rb") as f:
+        psi_val = np.load(file=f)["psi_val"]
+
+    return np.abs(psi_val) ** 2
+
+
+class FramePrefetcher:
+    """
+    Iterates over the results of reduce(path) for all paths in order,
+    while up to prefetch of the next frames are already processed in the background.
+    Exceptions of reduce (e.g. zipfile.BadZipFile for a half-written npz)
+    are raised, when the corresponding frame is reached.
+
+    """
+    def __init__(self,
+                 paths: List[Path],
+                 reduce: Callable[[Path], Any] = load_density,
+                 prefetch: int = 4,
+                 processes: bool = False):
+        """
+        :param paths: Paths of the frames in the order to show them
+
+        :param reduce: Function loading and reducing one frame.
+            Needs to be picklable (module level function), if processes is True.
+
+        :param prefetch: Number of frames processed ahead (bounds the memory used)
+
+        :param processes: If True, a process pool is used instead of a thread pool
+            (for reductions, which hold the GIL).
+
+        """
+        self.paths: List[Path] = list(paths)
+        self.reduce: Callable[[Path], Any] = reduce
+        self.prefetch: int = max(1, prefetch)
+
+        if processes:
+            self.executor: futures.Executor = futures.ProcessPoolExecutor(
+                max_workers=self.prefetch)
+        else:
+            self.executor = futures.ThreadPoolExecutor(max_workers=self.prefetch)
+
+    def __iter__(self) -> Iterator[Any]:
+        pending: Deque[futures.Future] = collections.deque()
+        paths = iter(self.paths)
+        try:
+            for path in self.paths[:self.prefetch]:
+                pending.append(self.executor.submit(self.reduce, next(paths)))
+
+            while pending:
+                result = pending.popleft().result()
+                # keep the queue filled before handing out the frame
+                path = next(paths, None)
+                if path is not None:
+                    pending.append(self.executor.submit(self.reduce, path))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    def __enter__(self) -> "FramePrefetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Reduced data products of :math:`|\\psi|^2` (central slices, 1D cuts and
+column densities), which are recorded during the simulation at a fine cadence,
+while full psi_val snapshots are only saved sparsely.
+
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from supersolids.helper.manifest import save_npz_atomic
+
+# kinds of reductions, which can be recorded
+kinds: List[str] = ["slices", "cuts", "column_densities"]
+
+
+def get_axis_names(dim: int) -> List[str]:
+    """
+    :return: Direction of each array axis of psi_val of the solver.
+        2D grids are built by np.meshgrid (y, x), 3D grids by np.mgrid (x, y, z).
+
+    """
+    if dim == 2:
+        return ["y", "x"]
+
+    return ["x", "y", "z"][:dim]
+
+
+def reduce_density(density: np.ndarray,
+                   spacing: List[float],
+                   products: List[str] = ["slices", "cuts"],
+                   slice_indices: Optional[List[int]] = None,
+                   ) -> Dict[str, np.ndarray]:
+    """
+    Computes the reductions of the density :math:`|\\psi|^2`.
+
+    :param density: Density on the grid (1D, 2D or 3D)
+
+    :param spacing: Grid spacing in the directions x, y, z
+
+    :param products: Kinds of reductions, any of "slices", "cuts", "column_densities".
+
+    :param slice_indices: Indices of grid points in the directions x, y, z
+        where the slices and cuts are taken. None for the centre of the grid.
+
+    :return: Dictionary with keys like cut_x (along x through the centre),
+        slice_x (plane at fixed x) and column_x (integrated along x).
+        The remaining axes keep the order of density (see :func:`get_axis_names`).
+
+    """
+    dim = density.ndim
+    names = get_axis_names(dim)
+    # spacing and slice_indices are given in the directions x, y, z
+    directions = ["x", "y", "z"].index
+    if slice_indices is None:
+        indices = [int(n / 2) for n in density.shape]
+    else:
+        indices = [slice_indices[directions(name)] for name in names]
+
+    reduced: Dict[str, np.ndarray] = {}
+    for axis, name in enumerate(names):
+        if "cuts" in products:
+            cut = tuple(slice(None) if i == axis else index
+                        for i, index in enumerate(indices))
+            reduced["cut_" + name] = density[cut]
+        if ("slices" in products) and (dim == 3):
+            plane = tuple(indices[axis] if i == axis else slice(None)
+                          for i in range(dim))
+            reduced["slice_" + name] = density[plane]
+        if ("column_densities" in products) and (dim > 1):
+            reduced["column_" + name] = (np.sum(density, axis=axis)
+                                         * spacing[directions(name)])
+
+    if ("slices" in products) and (dim < 3):
+        # for 1D and 2D the density itself is cheap enough
+        reduced["density"] = density
+
+    return reduced
+
+
+class Products:
+    """
+    Collects reductions of the density of a Schroedinger System every
+    steps_per_products steps and saves them in chunks of chunk_size records
+    as products_NNNNNN.npz (numbered by the first frame of the chunk)
+    into the directory of the run.
+
+    """
+    def __init__(self,
+                 steps_per_products: int = 1,
+                 products: List[str] = ["slices", "cuts"],
+                 slice_indices: Optional[List[int]] = None,
+                 chunk_size: int = 100,
+                 filename_products: str = "products_",
+                 steps_format: str = "%06d",
+                 ):
+        """
+        :param steps_per_products: Number of dt steps between recorded products.
+
+        :param products: Kinds of reductions to record,
+            any of "slices", "cuts", "column_densities".
+
+        :param slice_indices: Indices of grid points in the directions x, y, z
+            where the slices and cuts are taken. None for the centre of the grid.
+
+        :param chunk_size: Number of records saved together in one npz.
+
+        :param filename_products: Name of the npz files without the enumerator.
+
+        :param steps_format: Formatting string to enumerate the files.
+
+        """
+        unknown = [kind for kind in products if kind not in kinds]
+        assert not unknown, f"Unknown products {unknown}, available are {kinds}."
+
+        self.steps_per_products: int = steps_per_products
+        self.products: List[str] = products
+        self.slice_indices: Optional[List[int]] = slice_indices
+        self.chunk_size: int = chunk_size
+        self.filename_products: str = filename_products
+        self.steps_format: str = steps_format
+
+        self.records: Dict[str, List[np.ndarray]] = {}
+
+    def is_due(self, frame: int) -> bool:
+        return (frame % self.steps_per_products) == 0
+
+    def reduce(self, System) -> Dict[str, np.ndarray]:
+        """
+        Computes the reductions of :math:`|\\psi|^2` of System.
+
+        :param System: Schrödinger equations for the specified system
+
+        :return: Dictionary with keys like cut_x (along x through the centre),
+            slice_x (plane at fixed x) and column_x (integrated along x).
+
+        """
+        spacing = [System.dx, getattr(System, "dy", None),
+                   getattr(System, "dz", None)][:System.dim]
+
+        return reduce_density(System.get_density(p=2.0), spacing,
+                              products=self.products,
+                              slice_indices=self.slice_indices)
+
+    def record(self, System, frame: int) -> None:
+        """
+        Records the reductions of System for the given frame.
+
+        :param System: Schrödinger equations for the specified system
+
+        :param frame: Current frame (number of steps dt)
+
+        """
+        reduced = self.reduce(System)
+        reduced["frame"] = np.array(frame)
+        reduced["t"] = np.array(System.t)
+        reduced["mu"] = np.array(np.real(System.mu))
+        reduced["E"] = np.array(np.real(System.E))
+        for key, value in reduced.items():
+            self.records.setdefault(key, []).append(np.array(value, copy=True))
+
+    def is_full(self) -> bool:
+        return len(self.records.get("frame", [])) >= self.chunk_size
+
+    def flush(self, input_path: Path) -> Optional[Path]:
+        """
+        Saves the recorded products as one npz into input_path
+        and clears the records.
+
+        :param input_path: Path of the movieNNN directory of the run
+
+        :return: Path of the saved npz, None if nothing was recorded
+
+        """
+        if not self.records.get("frame", []):
+            return None
+
+        frame_first = int(self.records["frame"][0])
+        products_path = Path(input_path,
+                             self.filename_products
+                             + self.steps_format % frame_first + ".npz")
+        save_npz_atomic(products_path, **{key: np.stack(values)
+                                          for key, values in self.records.items()})
+        self.records = {}
+
+        return products_path
+
+
+def load_products(input_path: Path,
+                  filename_products: str = "products_") -> Dict[str, np.ndarray]:
+    """
+    Loads all products of a run and concatenates them along the time axis.
+
+    :param input_path: Path of the movieNNN directory of the run
+
+    :param filename_products: Name of the npz files without the enumerator.
+
+    :return: Dictionary with the keys of :meth:`Products.reduce` and frame, t, mu, E.
+        The first axis of each array is the record index.
+
+    """
+    chunks: Dict[str, List[np.ndarray]] = {}
+    for products_path in sorted(Path(input_path).glob(filename_products + "*.npz")):
+        with np.load(products_path) as products:
+            for key in products.files:
+                chunks.setdefault(key, []).append(products[key])
+
+    return {key: np.concatenate(values) for key, values in chunks.items()}
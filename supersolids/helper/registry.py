@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+SQLite registry of all simulations (movieNNN directories) inside dir_path.
+Every run is saved with its parameters, status and final observables,
+so runs can be found without loading the saved Schroedinger objects.
+
+"""
+
+import contextlib
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Columns of the table runs with their SQL types.
+# New columns can be appended here, existing databases are migrated on open.
+columns: List[Tuple[str, str]] = [
+    ("dir_name", "TEXT UNIQUE NOT NULL"),
+    ("status", "TEXT"),
+    ("reason", "TEXT"),
+    ("created", "TEXT"),
+    ("updated", "TEXT"),
+    ("dim", "INTEGER"),
+    ("N", "REAL"),
+    ("Box", "TEXT"),
+    ("Res", "TEXT"),
+    ("res_x", "INTEGER"),
+    ("res_y", "INTEGER"),
+    ("res_z", "INTEGER"),
+    ("dt", "REAL"),
+    ("g", "REAL"),
+    ("g_qf", "REAL"),
+    ("e_dd", "REAL"),
+    ("a_s", "REAL"),
+    ("w_x", "REAL"),
+    ("w_y", "REAL"),
+    ("w_z", "REAL"),
+    ("imag_time", "INTEGER"),
+    ("max_timesteps", "INTEGER"),
+    ("ddi", "INTEGER"),
+    ("accuracy", "REAL"),
+    ("t", "REAL"),
+    ("mu", "REAL"),
+    ("E", "REAL"),
+    ("mu_rel", "REAL"),
+    ("steps", "INTEGER"),
+    ("frame_last", "INTEGER"),
+    ("run_time", "REAL"),
+    ("case_hash", "TEXT"),
+    ("last_used", "TEXT"),
+    ("memory_peak", "INTEGER"),
+]
+column_names: List[str] = [name for name, _ in columns]
+
+# status of a run, as saved in the column status
+statuses: List[str] = ["running", "converged", "diverged", "max_timesteps",
+                       "finished", "aborted", "failed", "evicted", "cancelled"]
+# runs with these status can not be continued (resumed)
+statuses_ended: List[str] = ["converged", "diverged"]
+
+
+def get_parameters(System) -> Dict[str, Any]:
+    """
+    Gets the parameters of a Schroedinger System as saved in the registry.
+
+    :param System: Schrödinger equations for the specified system
+
+    :return: Dictionary with column names as keys
+
+    """
+    return {"dim": System.dim,
+            "N": float(System.N),
+            "Box": json.dumps([System.Box.x0, System.Box.x1,
+                               System.Box.y0, System.Box.y1,
+                               System.Box.z0, System.Box.z1]),
+            "Res": json.dumps([System.Res.x, System.Res.y, System.Res.z]),
+            "res_x": System.Res.x,
+            "res_y": System.Res.y,
+            "res_z": System.Res.z,
+            "dt": float(System.dt),
+            "g": float(System.g),
+            "g_qf": float(System.g_qf),
+            "e_dd": float(System.e_dd),
+            "a_s": float(System.a_s),
+            "w_x": float(System.w_x),
+            "w_y": float(System.w_y),
+            "w_z": float(System.w_z),
+            "imag_time": int(bool(System.imag_time)),
+            "max_timesteps": int(System.max_timesteps),
+            "ddi": int(not np.all(np.asarray(System.V_k_val) == 1.0)),
+            }
+
+
+def get_observables(System) -> Dict[str, Any]:
+    """
+    Gets the observables of a Schroedinger System as saved in the registry.
+
+    :param System: Schrödinger equations for the specified system
+
+    :return: Dictionary with column names as keys
+
+    """
+    return {"t": float(System.t),
+            "mu": float(np.real(System.mu)),
+            "E": float(np.real(System.E)),
+            }
+
+
+class Registry:
+    """
+    Registry of simulations saved as SQLite database in dir_path.
+    Each row of the table runs is one movieNNN directory.
+
+    """
+    def __init__(self,
+                 dir_path: Path = Path.home().joinpath("supersolids", "results"),
+                 filename: str = "registry.db",
+                 timeout: float = 60.0):
+        """
+        Opens (and creates if needed) the registry in dir_path.
+
+        :param dir_path: Path where the movieNNN directories lie
+
+        :param filename: Name of the database file inside of dir_path
+
+        :param timeout: Seconds to wait for a lock held by another process
+            (e.g. parallel simulations writing to the same registry)
+
+        """
+        self.dir_path: Path = Path(dir_path)
+        if not self.dir_path.is_dir():
+            self.dir_path.mkdir(parents=True)
+
+        self.path: Path = Path(self.dir_path, filename)
+        self.timeout: float = timeout
+
+        with self.connect() as con:
+            self.create_table(con)
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        # commits on success, rolls back on exceptions and always closes
+        con = sqlite3.connect(str(self.path), timeout=self.timeout)
+        con.row_factory = sqlite3.Row
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def create_table(self, con: sqlite3.Connection) -> None:
+        columns_sql = ", ".join(f"{name} {sql_type}"
+                                for name, sql_type in columns)
+        con.execute("CREATE TABLE IF NOT EXISTS runs "
+                    f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {columns_sql})")
+
+        # migrate databases created with fewer columns
+        existing = [row["name"] for row in con.execute("PRAGMA table_info(runs)")]
+        for name, sql_type in columns:
+            if name not in existing:
+                con.execute(f"ALTER TABLE runs ADD COLUMN {name} {sql_type}")
+
+        # cached results are looked up by case_hash (see result_cache)
+        con.execute("CREATE INDEX IF NOT EXISTS runs_case_hash ON runs (case_hash)")
+
+    def register(self, System, input_path: Path, status: str = "running",
+                 **fields) -> None:
+        """
+        Adds the run in input_path with the parameters of System to the registry.
+        If the run is already registered, its row is replaced.
+
+        :param System: Schrödinger equations for the specified system
+
+        :param input_path: Path of the movieNNN directory of the run
+
+        :param status: Status of the run
+
+        :param fields: Further columns to set, e.g. accuracy
+
+        """
+        self.insert(Path(input_path).name, status=status,
+                    **get_parameters(System), **get_observables(System), **fields)
+
+    def insert(self, dir_name: str, status: str, **fields) -> None:
+        """
+        Adds the run dir_name with the columns given by fields (e.g. a row built
+        by another process, see :func:`supersolids.helper.sweep.run_case`).
+        If the run is already registered, its row is replaced.
+
+        :param dir_name: Name of the movieNNN directory of the run
+
+        :param status: Status of the run
+
+        :param fields: Further columns to set
+
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        row = {"dir_name": dir_name,
+               "status": status,
+               "created": now,
+               "updated": now,
+               **fields}
+        check_columns(row.keys())
+
+        with self.connect() as con:
+            con.execute(f"INSERT OR REPLACE INTO runs ({', '.join(row.keys())}) "
+                        f"VALUES ({', '.join('?' * len(row))})",
+                        list(row.values()))
+
+    def update(self, dir_name: str, **fields) -> None:
+        """
+        Updates the columns given by fields of the run dir_name.
+
+        :param dir_name: Name of the movieNNN directory of the run
+
+        :param fields: Columns to set, e.g. status="converged"
+
+        """
+        fields["updated"] = datetime.now().isoformat(timespec="seconds")
+        check_columns(fields.keys())
+
+        with self.connect() as con:
+            con.execute(f"UPDATE runs SET {', '.join(f'{key}=?' for key in fields)} "
+                        "WHERE dir_name=?",
+                        [*fields.values(), dir_name])
+
+    def finish(self, System, dir_name: str, status: str, **fields) -> None:
+        """
+        Sets status and the final observables of the run dir_name.
+
+        :param System: Schrödinger equations at the end of the run
+
+        :param dir_name: Name of the movieNNN directory of the run
+
+        :param status: Status of the run
+
+        """
+        self.update(dir_name, status=status, **get_observables(System), **fields)
+
+    def get(self, dir_name: str) -> Optional[Dict[str, Any]]:
+        with self.connect() as con:
+            row = con.execute("SELECT * FROM runs WHERE dir_name=?",
+                              (dir_name,)).fetchone()
+
+        return None if row is None else dict(row)
+
+    def query(self,
+              status: Optional[str] = None,
+              order_by: str = "dir_name",
+              **ranges) -> List[Dict[str, Any]]:
+        """
+        Finds all runs matching the given conditions.
+        For example all converged runs with :math:`a_s` between 80 and 90 :math:`a_0`:
+        query(status="converged", a_s=(80 * a_0, 90 * a_0))
+
+        :param status: Status of the runs, None for all.
+
+        :param order_by: Column to sort the runs by
+
+        :param ranges: Column names as keys. Tuples (min, max) as values select
+            by range (None for an open side), other values select by equality.
+
+        :return: List of dictionaries with column names as keys
+
+        """
+        conditions: List[str] = []
+        values: List[Any] = []
+        if status is not None:
+            conditions.append("status=?")
+            values.append(status)
+
+        check_columns(ranges.keys())
+        for key, value in ranges.items():
+            if isinstance(value, (tuple, list)):
+                value_min, value_max = value
+                if value_min is not None:
+                    conditions.append(f"{key}>=?")
+                    values.append(value_min)
+                if value_max is not None:
+                    conditions.append(f"{key}<=?")
+                    values.append(value_max)
+            else:
+                conditions.append(f"{key}=?")
+                values.append(value)
+
+        check_columns([order_by])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.connect() as con:
+            rows = con.execute(f"SELECT * FROM runs{where} ORDER BY {order_by}",
+                               values).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def scan(self,
+             dir_name: str = "movie",
+             filename_schroedinger: str = "schroedinger.json") -> List[str]:
+        """
+        Registers all runs in dir_path, which are not in the registry yet
+        (e.g. runs created before the registry existed).
+        Their status is unknown, so it is set to finished.
+
+        :param dir_name: General name of the directories without the counter
+
+        :param filename_schroedinger: Name of file, where the Schroedinger metadata
+            is saved (older runs with schroedinger.pkl are found too)
+
+        :return: List of the newly registered directory names
+
+        """
+        # imported here, as Schroedinger uses the registry itself
+        from supersolids.Schroedinger import Schroedinger
+
+        registered: List[str] = []
+        for input_path in sorted(self.dir_path.glob(dir_name + "*")):
+            if (not input_path.is_dir()) or self.get(input_path.name):
+                continue
+            schroedinger_path = Path(input_path, filename_schroedinger)
+            try:
+                System = Schroedinger.load(schroedinger_path)
+            except Exception as e:
+                print(f"{schroedinger_path} could not be loaded: {e}")
+                continue
+            self.register(System, input_path, status="finished")
+            registered.append(input_path.name)
+
+        return registered
+
+
+def check_columns(keys) -> None:
+    # column names are inserted into the SQL statements, so only known ones are allowed
+    unknown = [key for key in keys if key not in column_names]
+    if unknown:
+        # not an assert, as it has to hold with python -O too
+        raise ValueError(f"Unknown columns {unknown}. "
+                         f"Columns of the registry are {column_names}.")
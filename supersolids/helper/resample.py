@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Maps a saved psi_val onto a new grid (other Res and/or Box),
+e.g. to refine a converged coarse state instead of relaxing from a gauss.
+
+The grid is treated like in the kinetic term of Schroedinger:
+periodic in the Box with spacing (x1 - x0) / Res.x starting at x0 (same for y, z).
+The array axes of psi_val are (y, x) for 2D and (x, y, z) for 3D
+(see :func:`supersolids.helper.products.get_axis_names`).
+
+"""
+
+from typing import List
+
+import numpy as np
+
+from supersolids.helper import functions
+from supersolids.helper.products import get_axis_names
+
+
+def get_box_axes(Box: functions.Box, Res: functions.Resolution) -> List[np.ndarray]:
+    """
+    Grid points of each array axis of psi_val in the convention of the kinetic term.
+
+    """
+    box = Box.to_dict()
+    res = Res.to_dict()
+    return [box[name + "0"] + np.arange(res[name]) * (box[name + "1"] - box[name + "0"]) / res[name]
+            for name in get_axis_names(Res.dim)]
+
+
+def fourier_axis(psi_k: np.ndarray, n_new: int, axis: int) -> np.ndarray:
+    """
+    Zero-pads or truncates the Fourier coefficients psi_k along axis to n_new modes.
+    The Nyquist mode of an even number of modes is split (padding)
+    or combined (truncation), so real functions stay real.
+
+    """
+    n_old = psi_k.shape[axis]
+    if n_new == n_old:
+        return psi_k
+
+    psi_k = np.moveaxis(psi_k, axis, 0)
+    modes = np.round(np.fft.fftfreq(n_old) * n_old).astype(int)
+    values = psi_k * (n_new / n_old)
+
+    if n_new > n_old and (n_old % 2 == 0):
+        # old Nyquist mode (-n_old / 2) is shared by -n_old / 2 and +n_old / 2
+        nyquist = int(n_old / 2)
+        values = np.concatenate([values, values[nyquist:nyquist + 1] / 2.0])
+        values[nyquist] = values[nyquist] / 2.0
+        modes = np.concatenate([modes, [n_old / 2]]).astype(int)
+
+    keep = (modes >= -int(n_new / 2)) & (modes <= int(n_new / 2))
+    if n_new % 2 == 1:
+        keep = keep & (np.abs(modes) <= (n_new - 1) / 2)
+
+    psi_k_new = np.zeros((n_new,) + psi_k.shape[1:], dtype=complex)
+    np.add.at(psi_k_new, modes[keep] % n_new, values[keep])
+
+    return np.moveaxis(psi_k_new, 0, axis)
+
+
+def resample_fourier(psi_val: np.ndarray, Res_new: functions.Resolution) -> np.ndarray:
+    """
+    Resamples psi_val onto Res_new on the same Box by zero-padding
+    (finer grid) or truncation (coarser grid) in Fourier space.
+
+    :param psi_val: Wave function on the old grid
+
+    :param Res_new: New resolution
+
+    :return: psi_val on the new grid
+
+    """
+    res = Res_new.to_dict()
+    res_new = [res[name] for name in get_axis_names(psi_val.ndim)]
+    psi_k = np.fft.fftn(psi_val)
+    for axis, n_new in enumerate(res_new):
+        psi_k = fourier_axis(psi_k, n_new, axis)
+
+    return np.fft.ifftn(psi_k)
+
+
+def resample_band_limited(psi_val: np.ndarray,
+                          Box_old: functions.Box,
+                          Res_old: functions.Resolution,
+                          Box_new: functions.Box,
+                          Res_new: functions.Resolution) -> np.ndarray:
+    """
+    Resamples psi_val onto another Box (and Res) by evaluating its
+    band-limited Fourier interpolant at the new grid points.
+    Points outside of the old Box are set to 0.
+
+    :param psi_val: Wave function on the old grid
+
+    :return: psi_val on the new grid
+
+    """
+    axes_old = get_box_axes(Box_old, Res_old)
+    axes_new = get_box_axes(Box_new, Res_new)
+
+    psi_new = np.fft.fftn(psi_val)
+    for axis, (x_old, x_new) in enumerate(zip(axes_old, axes_new)):
+        n_old = len(x_old)
+        length = n_old * (x_old[1] - x_old[0])
+        k = 2.0 * np.pi * np.fft.fftfreq(n_old, d=length / n_old)
+        distance = x_new - x_old[0]
+        interpolation = np.exp(1j * np.outer(distance, k)) / n_old
+        if n_old % 2 == 0:
+            # Nyquist mode as mean of +k and -k, so real functions stay real
+            nyquist = int(n_old / 2)
+            interpolation[:, nyquist] = np.cos(distance * k[nyquist]) / n_old
+
+        outside = (distance < 0.0) | (distance >= length)
+        interpolation[outside, :] = 0.0
+
+        psi_new = np.moveaxis(np.tensordot(interpolation, psi_new, axes=([1], [axis])),
+                              0, axis)
+
+    return psi_new
+
+
+def resample(psi_val: np.ndarray,
+             Box_old: functions.Box,
+             Res_old: functions.Resolution,
+             Box_new: functions.Box,
+             Res_new: functions.Resolution) -> np.ndarray:
+    """
+    Maps psi_val from the old grid onto the new grid.
+    Changing only Res uses Fourier zero-padding or truncation,
+    changing the Box uses band-limited interpolation.
+
+    :param psi_val: Wave function on the old grid
+
+    :param Box_old: Box of psi_val
+
+    :param Res_old: Resolution of psi_val
+
+    :param Box_new: Box of the new grid
+
+    :param Res_new: Resolution of the new grid
+
+    :return: psi_val on the new grid (not normalized)
+
+    """
+    assert Res_old.dim == Res_new.dim == Box_old.dim == Box_new.dim, (
+        "Resampling needs Box and Res of the same dimension.")
+
+    if Box_old.to_dict() == Box_new.to_dict():
+        if Res_old.to_dict() == Res_new.to_dict():
+            return psi_val
+        return resample_fourier(psi_val, Res_new)
+
+    return resample_band_limited(psi_val, Box_old, Res_old, Box_new, Res_new)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Content-addressed cache of converged runs on top of the registry.
+Every run gets the hash of its parameters (column case_hash),
+so before running a case, a converged run with the same hash can be used instead.
+Cached runs are evicted by age or by a disk budget (least recently used first).
+
+"""
+
+import hashlib
+import json
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from supersolids.helper.registry import Registry
+
+# changes of the solver, which change the results, need a new version
+cache_version: int = 1
+
+
+def canonical(value: Any) -> Any:
+    """
+    Brings value into a form, where equal parameters give equal json
+    (e.g. 80 and 80.0, numpy scalars, tuples and lists).
+
+    """
+    if isinstance(value, dict):
+        return {str(key): canonical(value[key]) for key in sorted(value)}
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        return [canonical(item) for item in value]
+    elif isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    elif (value is None) or isinstance(value, str):
+        return value
+    else:
+        return float(value)
+
+
+def get_hash(parameters: Dict[str, Any]) -> str:
+    """
+    :param parameters: Physically relevant parameters and numerical settings of a case
+
+    :return: Hex digest identifying the parameters
+
+    """
+    text = json.dumps({"cache_version": cache_version, **canonical(parameters)},
+                      sort_keys=True)
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def get_dir_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file())
+
+
+class ResultCache:
+    """
+    Looks up converged runs by case_hash in the registry of dir_path.
+
+    """
+    def __init__(self,
+                 dir_path: Path = Path.home().joinpath("supersolids", "results"),
+                 filename_steps: str = "step_",
+                 steps_format: str = "%06d"):
+        """
+        :param dir_path: Path where the movieNNN directories and the registry lie
+
+        :param filename_steps: Name of the files, where the steps are saved, without enumerator
+
+        :param steps_format: Formating string to enumerate the files
+
+        """
+        self.dir_path: Path = Path(dir_path)
+        self.registry: Registry = Registry(self.dir_path)
+        self.filename_steps: str = filename_steps
+        self.steps_format: str = steps_format
+
+    def get_step_path(self, row: Dict[str, Any]) -> Path:
+        return Path(self.dir_path, row["dir_name"],
+                    self.filename_steps + self.steps_format % row["frame_last"] + ".npz")
+
+    def lookup(self, case_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Finds the newest converged run with case_hash, whose final step still exists.
+        A hit is marked as used (for the eviction).
+
+        :return: Row of the registry (with observables mu, E, t), None if not cached
+
+        """
+        rows = self.registry.query(status="converged", case_hash=case_hash,
+                                   order_by="updated")
+        for row in reversed(rows):
+            if (row["frame_last"] is not None) and self.get_step_path(row).is_file():
+                self.registry.update(row["dir_name"],
+                                     last_used=datetime.now().isoformat(timespec="seconds"))
+                return row
+
+        return None
+
+    def load_psi_val(self, row: Dict[str, Any]) -> np.ndarray:
+        """
+        :param row: Hit of lookup
+
+        :return: Ground state psi_val of the cached run
+
+        """
+        with open(self.get_step_path(row), "rb") as f:
+            return np.load(file=f)["psi_val"]
+
+    def evict(self,
+              max_age: Optional[timedelta] = None,
+              max_bytes: Optional[int] = None,
+              dry_run: bool = False) -> List[str]:
+        """
+        Deletes the directories of cached runs (runs with case_hash)
+        not used for longer than max_age, then the least recently used ones,
+        until all cached runs together need at most max_bytes.
+        Their rows stay in the registry with status evicted.
+
+        :param max_age: Maximum time since the run was finished or last used, None for no limit
+
+        :param max_bytes: Disk budget of all cached runs, None for no limit
+
+        :param dry_run: If True, nothing is deleted, only the runs to evict are returned
+
+        :return: Names of the evicted directories
+
+        """
+        rows = [row for row in self.registry.query()
+                if (row["case_hash"] is not None) and (row["status"] != "running")
+                and Path(self.dir_path, row["dir_name"]).is_dir()]
+        # least recently used first
+        rows.sort(key=lambda row: row["last_used"] or row["updated"] or "")
+
+        evicted: List[str] = []
+        if max_age is not None:
+            cutoff = (datetime.now() - max_age).isoformat(timespec="seconds")
+            evicted += [row["dir_name"] for row in rows
+                        if (row["last_used"] or row["updated"] or "") < cutoff]
+
+        if max_bytes is not None:
+            sizes = {row["dir_name"]: get_dir_size(Path(self.dir_path, row["dir_name"]))
+                     for row in rows if row["dir_name"] not in evicted}
+            total = sum(sizes.values())
+            for dir_name, size in sizes.items():
+                if total <= max_bytes:
+                    break
+                evicted.append(dir_name)
+                total -= size
+
+        if not dry_run:
+            for dir_name in evicted:
+                shutil.rmtree(Path(self.dir_path, dir_name))
+                self.registry.update(dir_name, status="evicted",
+                                     reason="evicted from the result cache")
+
+        return evicted
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Encodes long sequences of pictures in segments on multiple processes
+and joins the segments losslessly with the concat demuxer of ffmpeg.
+
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from concurrent import futures
+from pathlib import Path
+from typing import List, Optional
+
+from ffmpeg import input
+from matplotlib import animation
+
+from supersolids.helper.video_sink import pad_even
+
+
+def write_concat_list(list_path: Path, paths: List[Path], duration: Optional[float] = None) -> None:
+    """
+    Writes a list for the concat demuxer of ffmpeg.
+
+    :param duration: If not None, duration of each entry (needed for pictures)
+
+    """
+    with open(list_path, "w") as f:
+        for path in paths:
+            path_escaped = str(Path(path).resolve()).replace("'", "'\\''")
+            f.write(f"file '{path_escaped}'\n")
+            if duration is not None:
+                f.write(f"duration {duration}\n")
+        if (duration is not None) and paths:
+            # the demuxer may ignore the duration of the last entry, so it is repeated
+            f.write(f"file '{path_escaped}'\n")
+
+
+def encode_segment(pictures: List[Path],
+                   segment_path: Path,
+                   framerate: int = 25,
+                   vcodec: str = "libx264",
+                   crf: Optional[int] = None,
+                   pix_fmt: str = "yuv420p",
+                   threads: Optional[int] = None,
+                   ) -> Path:
+    """
+    Encodes pictures (in order) to the movie segment_path. Runs in the worker processes.
+
+    :param threads: Number of threads ffmpeg uses, None for its default
+
+    :return: segment_path
+
+    """
+    list_path = Path(segment_path.parent, segment_path.stem + ".txt")
+    write_concat_list(list_path, pictures, duration=1.0 / framerate)
+
+    # the last picture is listed twice (see write_concat_list), exactly one frame each
+    output_kwargs = {"vcodec": vcodec, "pix_fmt": pix_fmt, "r": framerate, "vf": pad_even,
+                     "frames:v": len(pictures)}
+    if crf is not None:
+        output_kwargs["crf"] = crf
+    if threads is not None:
+        output_kwargs["threads"] = threads
+
+    try:
+        (input(str(list_path), format="concat", safe=0)
+         .output(str(segment_path), **output_kwargs)
+         .overwrite_output()
+         .global_args("-loglevel", "error")
+         .run())
+    finally:
+        list_path.unlink()
+
+    return segment_path
+
+
+def concat_segments(segments: List[Path], output_path: Path) -> Path:
+    """
+    Joins movie segments with the same encoding without re-encoding.
+
+    :return: output_path
+
+    """
+    list_path = Path(output_path.parent, output_path.stem + "_segments.txt")
+    write_concat_list(list_path, segments)
+    try:
+        (input(str(list_path), format="concat", safe=0)
+         .output(str(output_path), c="copy")
+         .overwrite_output()
+         .global_args("-loglevel", "error")
+         .run())
+    finally:
+        list_path.unlink()
+
+    return output_path
+
+
+class SegmentEncoder:
+    """
+    Collects pictures and encodes every frames_per_segment of them as one segment
+    in a process pool, while further pictures are added.
+    Closing joins the segments to the movie.
+
+    """
+    def __init__(self,
+                 output_path: Path,
+                 framerate: int = 25,
+                 vcodec: str = "libx264",
+                 crf: Optional[int] = None,
+                 frames_per_segment: int = 500,
+                 max_workers: Optional[int] = None,
+                 ):
+        """
+        :param output_path: Path of the movie to create
+
+        :param framerate: Frames per second of the movie
+
+        :param vcodec: Video codec used by ffmpeg
+
+        :param crf: Constant rate factor (quality, lower is better),
+            None for the default of the codec
+
+        :param frames_per_segment: Number of pictures encoded together by one process
+
+        :param max_workers: Number of processes, None for all cores
+
+        """
+        self.output_path: Path = Path(output_path)
+        self.framerate: int = framerate
+        self.vcodec: str = vcodec
+        self.crf: Optional[int] = crf
+        self.frames_per_segment: int = frames_per_segment
+        self.max_workers: int = max_workers or os.cpu_count()
+        # the cores are shared between the encoding processes
+        self.threads: int = max(1, math.floor(os.cpu_count() / self.max_workers))
+
+        self.segments_path: Path = Path(self.output_path.parent,
+                                        self.output_path.stem + "_segments")
+        self.segments_path.mkdir(parents=True, exist_ok=True)
+        self.executor: futures.ProcessPoolExecutor = futures.ProcessPoolExecutor(
+            max_workers=self.max_workers)
+        self.submitted: List[futures.Future] = []
+        self.pictures: List[Path] = []
+
+    def add(self, picture: Path) -> None:
+        self.pictures.append(Path(picture))
+        if len(self.pictures) >= self.frames_per_segment:
+            self.submit()
+
+    def submit(self) -> None:
+        if not self.pictures:
+            return
+        segment_path = Path(self.segments_path,
+                            f"segment_{len(self.submitted):06d}{self.output_path.suffix}")
+        self.submitted.append(
+            self.executor.submit(encode_segment, self.pictures, segment_path,
+                                 framerate=self.framerate,
+                                 vcodec=self.vcodec,
+                                 crf=self.crf,
+                                 threads=self.threads))
+        self.pictures = []
+
+    def close(self) -> Path:
+        """
+        Encodes the remaining pictures and joins all segments to the movie.
+
+        :return: Path of the movie
+
+        """
+        self.submit()
+        try:
+            segments = [future.result() for future in self.submitted]
+        finally:
+            self.executor.shutdown()
+
+        if len(segments) == 1:
+            shutil.move(str(segments[0]), str(self.output_path))
+        else:
+            concat_segments(segments, self.output_path)
+        shutil.rmtree(self.segments_path)
+
+        return self.output_path
+
+
+def encode_parallel(pictures: List[Path],
+                    output_path: Path,
+                    framerate: int = 25,
+                    vcodec: str = "libx264",
+                    crf: Optional[int] = None,
+                    frames_per_segment: int = 500,
+                    max_workers: Optional[int] = None,
+                    ) -> Path:
+    """
+    Encodes pictures (in order) to a movie in segments on multiple processes
+    (see :class:`SegmentEncoder`).
+
+    :return: Path of the movie
+
+    """
+    encoder = SegmentEncoder(output_path, framerate=framerate, vcodec=vcodec, crf=crf,
+                             frames_per_segment=frames_per_segment,
+                             max_workers=max_workers)
+    for picture in pictures:
+        encoder.add(picture)
+
+    return encoder.close()
+
+
+class SegmentWriter(animation.AbstractMovieWriter):
+    """
+    Adapter to use a SegmentEncoder as writer for matplotlib.animation.Animation.save.
+    Frames are saved as pictures into a temporary directory
+    and encoded in segments while the animation goes on.
+
+    """
+    def __init__(self,
+                 fps: int = 25,
+                 vcodec: str = "libx264",
+                 crf: Optional[int] = None,
+                 frames_per_segment: int = 500,
+                 max_workers: Optional[int] = None):
+        super().__init__(fps=fps)
+        self.vcodec: str = vcodec
+        self.crf: Optional[int] = crf
+        self.frames_per_segment: int = frames_per_segment
+        self.max_workers: Optional[int] = max_workers
+        self.encoder: Optional[SegmentEncoder] = None
+        self.frame_dir: Optional[Path] = None
+        self.frame_counter: int = 0
+
+    def setup(self, fig, outfile, dpi=None) -> None:
+        super().setup(fig, outfile, dpi=dpi)
+        self.encoder = SegmentEncoder(outfile, framerate=self.fps, vcodec=self.vcodec,
+                                      crf=self.crf,
+                                      frames_per_segment=self.frames_per_segment,
+                                      max_workers=self.max_workers)
+        self.frame_dir = Path(tempfile.mkdtemp(dir=self.encoder.segments_path))
+        self.frame_counter = 0
+
+    def grab_frame(self, **savefig_kwargs) -> None:
+        picture = Path(self.frame_dir, f"frame_{self.frame_counter:06d}.png")
+        self.fig.savefig(picture, dpi=self.dpi, **savefig_kwargs)
+        self.encoder.add(picture)
+        self.frame_counter += 1
+
+    def finish(self) -> None:
+        self.encoder.close()
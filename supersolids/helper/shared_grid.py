@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Grid-invariant arrays of Schroedinger (meshes, k_squared, H_kin, V_k_val)
+published once in shared memory, so the workers of a sweep attach to them
+instead of building own copies for every case.
+
+The arrays only depend on Box, Res, dt and imag_time (see get_grid_key).
+Attached arrays are read-only, as all processes see the same memory.
+
+"""
+
+import json
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# attributes of Schroedinger, which are equal for all cases with the same grid key
+grid_arrays: List[str] = ["x_mesh", "y_mesh", "z_mesh", "pos", "k_squared", "H_kin", "V_k_val"]
+
+# name of the shared memory block, shape and dtype of each array
+Descriptors = Dict[str, Tuple[str, Tuple[int, ...], str]]
+
+# blocks attached by this process, kept open, as the arrays use their buffers
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def get_grid_key(case: Dict[str, Any]) -> str:
+    """
+    :param case: Case of a sweep (see :mod:`supersolids.helper.sweep`)
+
+    :return: Key equal for all cases, which can share the grid-invariant arrays
+
+    """
+    return json.dumps({key: case[key] for key in ["Box", "Res", "dt", "real_time"]},
+                      sort_keys=True)
+
+
+class SharedGrid:
+    """
+    Copies the grid-invariant arrays of a Schroedinger into shared memory.
+    The creating process has to close it, when the workers are done.
+
+    """
+    def __init__(self, System: Any):
+        """
+        :param System: Schroedinger, which built the arrays
+            (the template of all cases with its grid key)
+
+        """
+        self.blocks: List[shared_memory.SharedMemory] = []
+        self.descriptors: Descriptors = {}
+        for key in grid_arrays:
+            array = getattr(System, key, None)
+            if not isinstance(array, np.ndarray):
+                continue
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.descriptors[key] = (block.name, array.shape, array.dtype.str)
+
+    def nbytes(self) -> int:
+        return sum(block.size for block in self.blocks)
+
+    def close(self) -> None:
+        """
+        Frees the shared memory. Processes still attached keep their mapping.
+
+        """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def open_block(name: str) -> shared_memory.SharedMemory:
+    try:
+        # only the creating process may unlink the block
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 has no track, the block is registered at the resource tracker
+        # (shared with the creating process for forked workers)
+        return shared_memory.SharedMemory(name=name)
+
+
+def attach(descriptors: Descriptors) -> Dict[str, np.ndarray]:
+    """
+    Maps the arrays described by descriptors (see SharedGrid) into this process.
+    Blocks are attached once per process and reused by later cases.
+
+    :return: Read-only arrays by attribute name, to pass as shared to Schroedinger
+
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    for key, (name, shape, dtype) in descriptors.items():
+        if name not in _attached:
+            block = open_block(name)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.setflags(write=False)
+            _attached[name] = (block, array)
+        arrays[key] = _attached[name][1]
+
+    return arrays
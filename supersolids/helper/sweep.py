@@ -0,0 +1,764 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Parameter sweeps: a declarative grid of cases, each simulated offscreen
+(Schroedinger is constructed inside the worker process),
+with the status of every case written to a json file in dir_path.
+
+Cases are plain dictionaries (see default_case), so they can be pickled and saved.
+To keep grids readable, a_s and a_dd are given in units of the Bohr radius,
+m in atomic mass units and w_x, w_y, w_z as trap frequencies in Hz (:math:`\\omega / 2 \\pi`).
+
+"""
+
+import functools
+import itertools
+import json
+import time
+import traceback
+from concurrent import futures
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from supersolids.Schroedinger import Schroedinger
+from supersolids.helper import constants, functions, get_path, resample
+from supersolids.helper.cost_model import CostModel, MemoryPeak, get_memory_available
+from supersolids.helper.manifest import Manifest, replace_atomic
+from supersolids.helper.registry import Registry, get_observables, get_parameters
+from supersolids.helper.result_cache import ResultCache, get_hash
+from supersolids.helper.shared_grid import Descriptors, SharedGrid, attach, get_grid_key
+from supersolids.helper.threads import get_cores, get_grid_points, limit_threads, plan_threads
+from supersolids.helper.watchdog import Watchdog
+from supersolids.helper.work_queue import QueueExecutor
+
+default_case: Dict[str, Any] = {
+    "N": 6 * 10 ** 4,
+    "m": 164.0,
+    "a_s": 85.0,
+    "a_dd": 130.0,
+    "w_x": 33.0,
+    "w_y": 80.0,
+    "w_z": 167.0,
+    "dt": 2 * 10 ** -3,
+    "max_timesteps": 80001,
+    "accuracy": 10 ** -12,
+    "Res": {"x": 256, "y": 128, "z": 32},
+    "Box": {"x0": -10, "x1": 10, "y0": -5, "y1": 5, "z0": -4, "z1": 4},
+    "a": {"a_x": 3.5, "a_y": 1.5, "a_z": 1.2},
+    "noise": None,
+    "real_time": False,
+}
+
+# parameters not hashed, as a converged result does not depend on them
+unhashed: List[str] = ["max_timesteps"]
+
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def check_case(case: Dict[str, Any]) -> None:
+    """
+    Checks the parameters of case against the ones of default_case and their types
+    (numbers, integers, dictionaries with the same keys, noise as [min, max] or None).
+
+    :raises ValueError: For unknown parameters or values of the wrong type
+
+    """
+    for key, value in case.items():
+        if key not in default_case:
+            raise ValueError(f"Unknown parameter {key}. "
+                             f"Choose from {list(default_case.keys())}.")
+        default = default_case[key]
+        if isinstance(default, bool):
+            valid = isinstance(value, bool)
+        elif isinstance(default, int):
+            valid = is_number(value) and float(value).is_integer()
+        elif isinstance(default, float):
+            valid = is_number(value)
+        elif isinstance(default, dict):
+            valid = isinstance(value, dict) and all(
+                (key_axis in default) and (value_axis is None or is_number(value_axis))
+                for key_axis, value_axis in value.items())
+        else:
+            # noise
+            valid = (value is None) or (isinstance(value, (list, tuple)) and (len(value) == 2)
+                                        and all(is_number(bound) for bound in value))
+        if not valid:
+            raise ValueError(f"Invalid value {value!r} of parameter {key} "
+                             f"(default: {default!r}).")
+
+
+def parameter_grid(grid: Dict[str, List[Any]],
+                   base: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    All combinations of the values in grid as cases.
+
+    :param grid: Values to sweep for each parameter, e.g. {"a_s": [80, 85], "dt": [0.001]}
+
+    :param base: Parameters fixed for all cases, which differ from default_case
+
+    :return: List of complete cases
+
+    :raises ValueError: For unknown parameters or values of the wrong type
+        (see :func:`check_case`)
+
+    """
+    base = base or {}
+    keys = list(grid.keys())
+    cases: List[Dict[str, Any]] = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        case = dict(default_case)
+        case.update(base)
+        case.update(zip(keys, values))
+        check_case(case)
+        cases.append(case)
+
+    return cases
+
+
+def get_case_hash(case: Dict[str, Any]) -> str:
+    """
+    :return: Hash of the case to look it up in the result cache
+        (see :mod:`supersolids.helper.result_cache`)
+
+    """
+    return get_hash({key: value for key, value in case.items() if key not in unhashed})
+
+
+def build_system(case: Dict[str, Any],
+                 shared: Optional[Dict[str, np.ndarray]] = None) -> Schroedinger:
+    """
+    Constructs the Schroedinger System of a case as done by supersolids.__main__
+    (harmonic trap, gauss packet, dipol-dipol interaction in 3D).
+
+    :param shared: Grid-invariant arrays to use instead of building them
+        (see :mod:`supersolids.helper.shared_grid`)
+
+    """
+    functions.BoxResAssert(case["Res"], case["Box"])
+    functions.aResAssert(case["Res"], case["a"])
+    Res = functions.Resolution(**case["Res"])
+    Box = functions.Box(**case["Box"])
+
+    w_x = 2.0 * np.pi * case["w_x"]
+    w_y = 2.0 * np.pi * case["w_y"]
+    w_z = 2.0 * np.pi * case["w_z"]
+    a_s = case["a_s"] * constants.a_0
+    alpha_y, alpha_z = functions.get_alphas(w_x=w_x, w_y=w_y, w_z=w_z)
+    g, g_qf, e_dd, _ = functions.get_parameters(N=case["N"],
+                                                m=case["m"] * constants.u_in_kg,
+                                                a_s=a_s,
+                                                a_dd=case["a_dd"] * constants.a_0,
+                                                w_x=w_x)
+
+    a = case["a"]
+    V_interaction = None
+    if Res.dim == 1:
+        V = functions.v_harmonic_1d
+        psi_0 = functools.partial(functions.psi_gauss_1d, a=a["a_x"], x_0=2.0, k_0=0.0)
+    elif Res.dim == 2:
+        V = functools.partial(functions.v_harmonic_2d, alpha_y=alpha_y)
+        psi_0 = functools.partial(functions.psi_gauss_2d_pdf,
+                                  mu=[0.0, 0.0],
+                                  var=np.array([[a["a_x"], 0.0], [0.0, a["a_y"]]]))
+    else:
+        V = functools.partial(functions.v_harmonic_3d, alpha_y=alpha_y, alpha_z=alpha_z)
+        psi_0 = functools.partial(functions.psi_gauss_3d,
+                                  a_x=a["a_x"], a_y=a["a_y"], a_z=a["a_z"],
+                                  x_0=0.0, y_0=0.0, z_0=0.0, k_0=0.0)
+        V_interaction = functools.partial(functions.dipol_dipol_interaction,
+                                          r_cut=1.0 * Box.min_length() / 2.0)
+
+    psi_0_noise = None
+    if case["noise"] is not None:
+        psi_0_noise = functions.noise_mesh(min=case["noise"][0], max=case["noise"][1],
+                                           shape=(Res.x, Res.y, Res.z))
+
+    return Schroedinger(case["N"],
+                        Box,
+                        Res,
+                        max_timesteps=case["max_timesteps"],
+                        dt=case["dt"],
+                        g=g,
+                        g_qf=g_qf,
+                        w_x=w_x,
+                        w_y=w_y,
+                        w_z=w_z,
+                        e_dd=e_dd,
+                        a_s=a_s,
+                        imag_time=(not case["real_time"]),
+                        mu=1.1,
+                        E=1.0,
+                        psi_0=psi_0,
+                        V=V,
+                        V_interaction=V_interaction,
+                        psi_sol=None,
+                        mu_sol=functions.mu_3d,
+                        psi_0_noise=psi_0_noise,
+                        shared=shared,
+                        )
+
+
+def load_start(start_path: Path,
+               start_case: Dict[str, Any],
+               System: Schroedinger,
+               noise: Optional[Tuple[float, float]] = None,
+               filename_steps: str = "step_",
+               steps_format: str = "%06d") -> np.ndarray:
+    """
+    Loads the last saved psi_val of the run in start_path as initial state for System,
+    resampled, if the grid of start_case differs.
+
+    :param start_path: Path of the movieNNN directory of the converged neighbour
+
+    :param start_case: Case of the neighbour (for its Box and Res)
+
+    :param noise: If not None, psi_val is multiplied with uniform noise in (min, max)
+        (e.g. to break a symmetry of the neighbour)
+
+    :return: psi_val on the grid of System
+
+    :raises ValueError: If the resampled psi_val does not have the shape of System.psi_val
+
+    """
+    frame = get_path.get_step_frames(start_path, filename_steps=filename_steps)[-1]
+    with open(Path(start_path, filename_steps + steps_format % frame + ".npz"), "rb") as f:
+        psi_val = np.load(file=f)["psi_val"]
+
+    psi_val_start = resample.resample(psi_val,
+                                      functions.Box(**start_case["Box"]),
+                                      functions.Resolution(**start_case["Res"]),
+                                      System.Box,
+                                      System.Res)
+    if psi_val_start.shape != System.psi_val.shape:
+        raise ValueError(f"The start state of {start_path} has the shape {psi_val_start.shape}, "
+                         f"but the case needs {System.psi_val.shape}.")
+    if psi_val_start is not psi_val:
+        psi_val_start = psi_val_start / np.sqrt(
+            System.get_norm_trapez(np.abs(psi_val_start) ** 2.0))
+
+    if noise is not None:
+        psi_val_start = functions.noise_mesh(min=noise[0], max=noise[1],
+                                             shape=psi_val_start.shape) * psi_val_start
+
+    return psi_val_start
+
+
+def run_case(case: Dict[str, Any],
+             dir_path: Path,
+             steps_per_npz: int = 10,
+             use_registry: bool = True,
+             start_path: Optional[Path] = None,
+             start_case: Optional[Dict[str, Any]] = None,
+             start_noise: Optional[Tuple[float, float]] = None,
+             threads: int = 1,
+             shared_grid: Optional[Descriptors] = None,
+             watchdog: Optional[Watchdog] = None,
+             input_path: Optional[Path] = None,
+             stop_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Simulates one case offscreen. Runs in the worker processes.
+
+    :param start_path: If not None, the run starts from the last saved psi_val
+        of this movieNNN directory (with case start_case) instead of the gauss packet
+        (see :func:`load_start`)
+
+    :param threads: Number of threads the case may use (FFTs and BLAS)
+
+    :param shared_grid: Descriptors of the grid-invariant arrays in shared memory
+        (see :class:`supersolids.helper.shared_grid.SharedGrid`), None to build them
+
+    :param watchdog: Stops the case early as diverged with a reason
+        (see :mod:`supersolids.helper.watchdog`), None to run until mu is NaN
+
+    :param input_path: movieNNN directory to run in (e.g. created beforehand, to follow
+        the run), None for a new one in dir_path
+
+    :param stop_path: If this file exists, the case stops with status cancelled
+
+    :return: Result of the case (dir_name, status and final observables).
+        Without use_registry, also the row of the run for a registry (key row),
+        so the submitting process can register it (e.g. for workers of a queue,
+        as SQLite is unreliable on shared network directories like NFS).
+
+    """
+    run_start = time.perf_counter()
+    # the peak RSS calibrates the cost model
+    with MemoryPeak() as memory:
+        with limit_threads(threads):
+            shared = None if shared_grid is None else attach(shared_grid)
+            System = build_system(case, shared=shared)
+            if start_path is not None:
+                System.psi_val = load_start(start_path, start_case, System, noise=start_noise)
+            input_path = System.simulate_raw(accuracy=case["accuracy"],
+                                             dir_path=dir_path,
+                                             steps_per_npz=steps_per_npz,
+                                             use_registry=use_registry,
+                                             watchdog=watchdog,
+                                             input_path=input_path,
+                                             stop_path=stop_path)
+    memory_peak = memory.peak
+
+    case_hash = get_case_hash(case)
+    if use_registry:
+        Registry(dir_path).update(input_path.name, case_hash=case_hash,
+                                  memory_peak=memory_peak)
+
+    result = {"dir_name": input_path.name,
+              "case_hash": case_hash,
+              "status": System.status,
+              "reason": System.reason,
+              "t": float(System.t),
+              "mu": float(np.real(System.mu)),
+              "E": float(np.real(System.E)),
+              "run_time": time.perf_counter() - run_start,
+              "memory_peak": memory_peak,
+              }
+    if not use_registry:
+        manifest = Manifest(input_path)
+        entries = manifest.entries()
+        last_valid = manifest.last_valid()
+        result["row"] = {**get_parameters(System), **get_observables(System),
+                         "status": System.status,
+                         "reason": System.reason,
+                         "accuracy": case["accuracy"],
+                         "steps": (entries[-1]["frame"] + 1) if entries else 0,
+                         "frame_last": None if last_valid is None else last_valid["frame"],
+                         "run_time": result["run_time"],
+                         "case_hash": case_hash,
+                         "memory_peak": memory_peak,
+                         }
+
+    return result
+
+
+class Sweep:
+    """
+    Runs cases on a process pool, collects results and exceptions
+    and keeps the json file status_path up to date with the state of every case.
+
+    """
+    def __init__(self,
+                 cases: List[Dict[str, Any]],
+                 dir_path: Path = Path.home().joinpath("supersolids", "results"),
+                 max_workers: Optional[int] = None,
+                 cores: Optional[int] = None,
+                 threads_per_case: Optional[int] = None,
+                 memory: Optional[int] = None,
+                 cost_model: Optional[CostModel] = None,
+                 steps_per_npz: int = 10,
+                 use_registry: bool = True,
+                 use_cache: bool = True,
+                 continuation: Optional[List[str]] = None,
+                 start_noise: Optional[Tuple[float, float]] = None,
+                 share_grids: bool = True,
+                 watchdog: Optional[Watchdog] = None,
+                 retries: int = 0,
+                 dt_factor: float = 0.5,
+                 queue_path: Optional[Path] = None,
+                 status_path: Optional[Path] = None,
+                 ):
+        """
+        :param cases: Complete cases (see parameter_grid)
+
+        :param dir_path: Path where the movieNNN directories of the cases are created
+
+        :param max_workers: Maximum number of cases running at the same time, None for cores
+            (for queue_path, None for no limit)
+
+        :param cores: Number of cores to use. Cases are only started, while the threads
+            of all running cases fit into them. None for all cores of this process.
+
+        :param threads_per_case: Threads of every case, None to plan them by the grid size
+            (see :func:`supersolids.helper.threads.plan_threads`)
+
+        :param memory: Bytes of RAM for all running cases. Cases are only started, while
+            their predicted peak memory fits. None for the RAM available now.
+
+        :param cost_model: Predicts run time and memory of the cases.
+            None to calibrate one with the registry of dir_path.
+
+        :param steps_per_npz: Number of dt steps skipped between saved npz
+
+        :param use_registry: Condition if the runs are recorded in the registry of dir_path
+
+        :param use_cache: If True, cases with a converged run of the same parameters
+            in the registry are not run again (status cached), needs use_registry
+
+        :param continuation: Numeric parameters (e.g. ["a_s"]) to continue along.
+            Cases differing only in these form a chain, which is run in order of them,
+            each case starting from the nearest converged case (see :func:`load_start`).
+            Chains run in parallel. None to start every case from the gauss packet.
+
+        :param start_noise: For continuation, the started from psi_val is multiplied with
+            uniform noise in (min, max), None for no noise
+
+        :param share_grids: If True, the grid-invariant arrays of cases with equal
+            Box, Res, dt and real_time are built once and shared with the workers
+            (see :mod:`supersolids.helper.shared_grid`)
+
+        :param watchdog: Stops hopeless cases early as diverged
+            (see :mod:`supersolids.helper.watchdog`), None to run until mu is NaN
+
+        :param retries: Number of times a diverged case is run again with a smaller dt
+
+        :param dt_factor: Factor for dt of every retry. max_timesteps is divided by it,
+            so the retry can reach the same time.
+
+        :param queue_path: Shared directory of a work queue, to run the cases on workers
+            of any hosts (python -m supersolids.worker) instead of local processes
+            (see :mod:`supersolids.helper.work_queue`). Every ready case is enqueued,
+            the workers (one case at a time) limit themselves, so cores only plan the
+            threads of the cases and memory is not used. Grids are not shared.
+            Only this process writes the registry (from the results of the workers),
+            as SQLite is unreliable on shared network directories like NFS.
+            None for local processes.
+
+        :param status_path: Json file with the state of every case.
+            If None, a new sweep_<date>.json in dir_path.
+
+        """
+        self.cases: List[Dict[str, Any]] = cases
+        self.dir_path: Path = Path(dir_path)
+        self.cores: int = cores or get_cores()
+        if max_workers is None:
+            max_workers = self.cores if queue_path is None else max(1, len(cases))
+        self.max_workers: int = max_workers
+        self.steps_per_npz: int = steps_per_npz
+        self.use_registry: bool = use_registry
+        self.use_cache: bool = use_cache and use_registry
+        self.continuation: List[str] = continuation or []
+        self.start_noise: Optional[Tuple[float, float]] = start_noise
+        self.queue_path: Optional[Path] = queue_path
+        # shared memory does not reach other hosts
+        self.share_grids: bool = share_grids and (queue_path is None)
+        self.watchdog: Optional[Watchdog] = watchdog
+        self.retries: int = retries
+        self.dt_factor: float = dt_factor
+        self.shared_grids: Dict[str, SharedGrid] = {}
+        # distances along the continuation parameters are relative to their range
+        self.scales: Dict[str, float] = {}
+        for key in self.continuation:
+            values = [case[key] for case in cases]
+            self.scales[key] = (max(values) - min(values)) or 1.0
+        if status_path is None:
+            status_path = Path(self.dir_path,
+                               f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json")
+        self.status_path: Path = status_path
+
+        if threads_per_case is None:
+            threads = plan_threads([get_grid_points(case["Res"]) for case in cases], self.cores)
+        else:
+            threads = [min(threads_per_case, self.cores)] * len(cases)
+
+        self.states: List[Dict[str, Any]] = [{"index": i, "case": case, "status": "pending",
+                                              "threads": threads[i]}
+                                             for i, case in enumerate(cases)]
+        # cores not used by the threads of running cases
+        self.cores_free: int = self.cores
+
+        if cost_model is None:
+            cost_model = CostModel.from_registry(dir_path) if use_registry else CostModel()
+        for state in self.states:
+            state["cost"], state["memory"] = cost_model.predict(state["case"])
+        self.memory: int = memory or get_memory_available()
+        # memory not used by running cases (as predicted)
+        self.memory_free: int = self.memory
+        self.run_start: float = time.perf_counter()
+
+    def write_status(self) -> None:
+        self.status_path.parent.mkdir(parents=True, exist_ok=True)
+        replace_atomic(self.status_path,
+                       lambda f: f.write(json.dumps(self.states, indent=1).encode("utf-8")))
+
+    def progress(self) -> str:
+        """
+        :return: Aggregated progress, e.g. "3/10 done (converged: 2, failed: 1), ..."
+
+        """
+        done = [state for state in self.states
+                if state["status"] not in ["pending", "queued"]]
+        counts: Dict[str, int] = {}
+        for state in done:
+            counts[state["status"]] = counts.get(state["status"], 0) + 1
+        counts_str = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+
+        elapsed = time.perf_counter() - self.run_start
+        eta = ""
+        if done:
+            eta = f", eta {elapsed / len(done) * (len(self.states) - len(done)):.0f}s"
+
+        return (f"{len(done)}/{len(self.states)} done ({counts_str}), "
+                f"elapsed {elapsed:.0f}s{eta}")
+
+    def get_chain_key(self, case: Dict[str, Any]) -> str:
+        return json.dumps({key: value for key, value in case.items()
+                           if key not in self.continuation}, sort_keys=True)
+
+    def get_chains(self) -> List[List[int]]:
+        """
+        :return: Indices of the cases to run, grouped to chains, which run one case after another
+
+        """
+        indices = [state["index"] for state in self.states if state["status"] != "cached"]
+        if not self.continuation:
+            return [[index] for index in indices]
+
+        chains: Dict[str, List[int]] = {}
+        for index in indices:
+            chains.setdefault(self.get_chain_key(self.states[index]["case"]), []).append(index)
+
+        return [sorted(chain, key=lambda index: [self.states[index]["case"][key]
+                                                 for key in self.continuation])
+                for chain in chains.values()]
+
+    def get_neighbour(self, index: int) -> Optional[Dict[str, Any]]:
+        """
+        :return: State of the nearest converged case, which differs from the case index
+            only in the continuation parameters, None if there is none
+
+        """
+        case = self.states[index]["case"]
+        chain_key = self.get_chain_key(case)
+        neighbours = [state for state in self.states
+                      if state["status"] in ["converged", "cached"]
+                      and self.get_chain_key(state["case"]) == chain_key]
+        if not neighbours:
+            return None
+
+        return min(neighbours,
+                   key=lambda state: sum(abs(state["case"][key] - case[key]) / self.scales[key]
+                                         for key in self.continuation))
+
+    def submit(self,
+               executor: futures.Executor,
+               running: Dict[futures.Future, Tuple[int, List[int]]],
+               chain: List[int]) -> None:
+        """
+        Submits the first case of chain, the rest is submitted, when it is done.
+
+        """
+        state = self.states[chain[0]]
+        start_path, start_case = None, None
+        if self.continuation:
+            neighbour = self.get_neighbour(chain[0])
+            if neighbour is not None:
+                state["warm_start"] = neighbour["dir_name"]
+                start_path = Path(self.dir_path, neighbour["dir_name"])
+                start_case = neighbour["case"]
+
+        case = self.get_attempt_case(state)
+        future = executor.submit(run_case, case, self.dir_path,
+                                 steps_per_npz=self.steps_per_npz,
+                                 # workers of a queue do not open the registry
+                                 use_registry=self.use_registry and (self.queue_path is None),
+                                 start_path=start_path,
+                                 start_case=start_case,
+                                 start_noise=self.start_noise,
+                                 threads=state["threads"],
+                                 shared_grid=self.get_shared_grid(case),
+                                 watchdog=self.watchdog)
+        running[future] = (chain[0], chain[1:])
+        state["status"] = "queued"
+        self.cores_free -= state["threads"]
+        self.memory_free -= state["memory"]
+
+    def get_attempt_case(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        :return: Case of state with dt and max_timesteps of its current retry
+            (the case itself, if it was not retried)
+
+        """
+        retry = len(state.get("attempts", []))
+        if not retry:
+            return state["case"]
+
+        factor = self.dt_factor ** retry
+        return dict(state["case"],
+                    dt=state["case"]["dt"] * factor,
+                    max_timesteps=int(np.ceil(state["case"]["max_timesteps"] / factor)))
+
+    def retry(self, state: Dict[str, Any]) -> bool:
+        """
+        Records the diverged attempt of state and prepares a retry with a smaller dt,
+        if retries are left.
+
+        :return: True, if the case has to be submitted again
+
+        """
+        attempts = state.setdefault("attempts", [])
+        if (state["status"] != "diverged") or (len(attempts) >= self.retries):
+            return False
+
+        attempt = {key: state.get(key) for key in ["dir_name", "reason", "run_time"]}
+        attempt["dt"] = self.get_attempt_case(state)["dt"]
+        attempts.append(attempt)
+        state["status"] = "pending"
+        state["cost"] = state["cost"] / self.dt_factor
+        print(f"sweep: case {state['index']} diverged ({state.get('reason')}), "
+              f"retry {len(attempts)} with dt={self.get_attempt_case(state)['dt']}")
+
+        return True
+
+    def share(self) -> int:
+        """
+        Publishes the grid-invariant arrays of every grid key used by at least two
+        cases to run, built by a template System of the first of them.
+
+        :return: Bytes of shared memory used
+
+        """
+        cases: Dict[str, List[Dict[str, Any]]] = {}
+        for state in self.states:
+            if state["status"] != "cached":
+                cases.setdefault(get_grid_key(state["case"]), []).append(state["case"])
+
+        for grid_key, cases_grid in cases.items():
+            if len(cases_grid) >= 2:
+                self.shared_grids[grid_key] = SharedGrid(build_system(cases_grid[0]))
+
+        return sum(shared_grid.nbytes() for shared_grid in self.shared_grids.values())
+
+    def get_shared_grid(self, case: Dict[str, Any]) -> Optional[Descriptors]:
+        shared_grid = self.shared_grids.get(get_grid_key(case))
+
+        return None if shared_grid is None else shared_grid.descriptors
+
+    def unshare(self) -> None:
+        for shared_grid in self.shared_grids.values():
+            shared_grid.close()
+        self.shared_grids = {}
+
+    def get_chain_cost(self, chain: List[int]) -> float:
+        """
+        :return: Predicted seconds to run all cases of chain (with the threads of the next case)
+
+        """
+        return (sum(self.states[index]["cost"] for index in chain)
+                / self.states[chain[0]]["threads"])
+
+    def admit(self,
+              executor: futures.Executor,
+              running: Dict[futures.Future, Tuple[int, List[int]]],
+              waiting: List[List[int]]) -> None:
+        """
+        Submits waiting chains (longest first), while the threads and the predicted memory
+        of their next case fit into the free cores and memory.
+        Smaller cases fill what the longer ones leave.
+        Cases too big for the memory run alone, when nothing else runs.
+        With a queue, all waiting chains are submitted (up to max_workers).
+
+        """
+        waiting.sort(key=lambda chain: -self.get_chain_cost(chain))
+        for chain in list(waiting):
+            if len(running) >= self.max_workers:
+                break
+            state = self.states[chain[0]]
+            fits = ((self.queue_path is not None)
+                    or ((state["threads"] <= self.cores_free)
+                        and (state["memory"] <= self.memory_free)))
+            if fits or (not running):
+                if (self.queue_path is None) and (state["memory"] > self.memory_free):
+                    print(f"sweep: case {state['index']} needs about {state['memory']} bytes, "
+                          f"more than the {self.memory_free} bytes available.")
+                waiting.remove(chain)
+                self.submit(executor, running, chain)
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Runs all cases. Exceptions of a case are recorded as status "failed",
+        the other cases go on.
+
+        :return: States of all cases (in order of cases)
+
+        """
+        self.run_start = time.perf_counter()
+        if self.use_cache:
+            cache = ResultCache(self.dir_path)
+            for state in self.states:
+                state["case_hash"] = get_case_hash(state["case"])
+                hit = cache.lookup(state["case_hash"])
+                if hit is not None:
+                    state.update({"dir_name": hit["dir_name"], "status": "cached",
+                                  "t": hit["t"], "mu": hit["mu"], "E": hit["E"],
+                                  "run_time": 0.0})
+        self.write_status()
+
+        # shared arrays are in the memory only once, not in every worker
+        shared_bytes = self.share() if self.share_grids else 0
+        try:
+            self.run_pool(shared_bytes)
+        finally:
+            self.unshare()
+
+        return self.states
+
+    def run_pool(self, shared_bytes: int = 0) -> None:
+        """
+        Runs the chains of cases not cached on the process pool.
+
+        :param shared_bytes: Memory already used by the shared arrays
+
+        """
+        if self.queue_path is None:
+            executor: futures.Executor = futures.ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            executor = QueueExecutor(self.queue_path)
+
+        with executor:
+            # future of the running case of each chain and the rest of the chain
+            running: Dict[futures.Future, Tuple[int, List[int]]] = {}
+            waiting: List[List[int]] = self.get_chains()
+            self.cores_free = self.cores
+            self.memory_free = self.memory - shared_bytes
+            self.admit(executor, running, waiting)
+            self.write_status()
+
+            try:
+                while running:
+                    done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        index, chain_rest = running.pop(future)
+                        state = self.states[index]
+                        self.cores_free += state["threads"]
+                        self.memory_free += state["memory"]
+                        try:
+                            result = future.result()
+                            row = result.pop("row", None)
+                            if self.use_registry and (row is not None):
+                                Registry(self.dir_path).insert(result["dir_name"], **row)
+                            state.update(result)
+                        except Exception as e:
+                            state["status"] = "failed"
+                            state["reason"] = repr(e)
+                            state["traceback"] = "".join(traceback.format_exception(
+                                type(e), e, e.__traceback__))
+                        if self.retry(state):
+                            # the chain goes on from the retried case
+                            chain_rest = [index] + chain_rest
+                        if chain_rest:
+                            waiting.insert(0, chain_rest)
+                        self.admit(executor, running, waiting)
+                        self.write_status()
+                        print(f"sweep: case {index} {state['status']}, {self.progress()}")
+            except BaseException:
+                # e.g. KeyboardInterrupt: cases not started are cancelled
+                for future, (index, chain_rest) in running.items():
+                    if future.cancel():
+                        self.states[index]["status"] = "cancelled"
+                    for index_rest in chain_rest:
+                        self.states[index_rest]["status"] = "cancelled"
+                for chain in waiting:
+                    for index_rest in chain:
+                        self.states[index_rest]["status"] = "cancelled"
+                self.write_status()
+                raise
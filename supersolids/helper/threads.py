@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Plans and pins the threads of simulations running side by side,
+so processes times threads per process do not oversubscribe the cores.
+
+"""
+
+import contextlib
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from scipy import fft
+
+# grid points per thread, below which more FFT threads do not pay off
+points_per_thread: int = 32 ** 3
+
+
+def get_cores() -> int:
+    """
+    :return: Number of cores this process may run on (respects taskset/cgroups affinity)
+
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # e.g. macOS, Windows
+        return os.cpu_count() or 1
+
+
+def get_grid_points(res: Dict[str, Optional[int]]) -> int:
+    return int(np.prod([value for value in res.values() if value is not None]))
+
+
+def plan_threads(grid_points: List[int],
+                 cores: int,
+                 threads_max: Optional[int] = None) -> List[int]:
+    """
+    Threads for each case, growing with its grid, so the biggest grids get the most threads.
+    Small grids get 1 thread, as the FFTs of them do not scale.
+
+    :param grid_points: Number of grid points of each case
+
+    :param cores: Number of cores to share
+
+    :param threads_max: Maximum threads of one case, None for a quarter of the cores
+        (so even the biggest grids leave room for other cases)
+
+    :return: Threads for each case
+
+    """
+    if threads_max is None:
+        threads_max = max(1, cores // 4)
+    threads_max = min(threads_max, cores)
+
+    return [int(min(threads_max, max(1, points // points_per_thread)))
+            for points in grid_points]
+
+
+@contextlib.contextmanager
+def limit_threads(threads: int) -> Iterator[None]:
+    """
+    Limits the threads used by the FFTs of the solver (scipy.fft)
+    and, if threadpoolctl is installed, by BLAS/OpenMP thread pools of this process.
+
+    :param threads: Number of threads
+
+    """
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(fft.set_workers(threads))
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            # without threadpoolctl, BLAS pools keep their size (set OMP_NUM_THREADS instead)
+            pass
+        else:
+            stack.enter_context(threadpool_limits(limits=threads))
+        yield
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Video sink, which pipes raw RGB frames directly into one ffmpeg process,
+so no pictures need to be written, globbed and deleted to create a movie.
+
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from ffmpeg import input
+from matplotlib import animation
+
+# yuv420p needs an even width and height
+pad_even: str = "pad=ceil(iw/2)*2:ceil(ih/2)*2"
+
+
+def figure_to_rgb(fig) -> np.ndarray:
+    """
+    Draws a matplotlib figure and returns its pixels as RGB array.
+
+    :param fig: matplotlib figure
+
+    :return: Array of shape (height, width, 3) with dtype uint8
+
+    """
+    fig.canvas.draw()
+
+    return np.asarray(fig.canvas.buffer_rgba())[:, :, :3]
+
+
+def fit_frame(frame: np.ndarray, shape: tuple) -> np.ndarray:
+    """
+    Crops or pads (black) a frame at the right and bottom to shape.
+
+    :param frame: RGB array of shape (height, width, 3)
+
+    :param shape: Shape of the result (height, width, 3)
+
+    :return: frame itself, if it already has the shape, otherwise the fitted copy
+
+    """
+    if frame.shape == shape:
+        return frame
+
+    fitted = np.zeros(shape, dtype=frame.dtype)
+    height = min(shape[0], frame.shape[0])
+    width = min(shape[1], frame.shape[1])
+    fitted[:height, :width] = frame[:height, :width]
+
+    return fitted
+
+
+class VideoSink:
+    """
+    Encodes frames given as RGB arrays with ffmpeg while they are produced.
+    The ffmpeg process is started with the size of the first frame,
+    following frames of another size (e.g. a resized window) are cropped or padded to it.
+
+    """
+    def __init__(self,
+                 output_path: Path,
+                 framerate: int = 25,
+                 vcodec: str = "libx264",
+                 pix_fmt: str = "yuv420p",
+                 crf: Optional[int] = None,
+                 ):
+        """
+        :param output_path: Path of the movie to create
+
+        :param framerate: Frames per second of the movie
+
+        :param vcodec: Video codec used by ffmpeg
+
+        :param pix_fmt: Pixel format of the movie
+
+        :param crf: Constant rate factor (quality, lower is better),
+            None for the default of the codec
+
+        """
+        self.output_path: Path = Path(output_path)
+        self.framerate: int = framerate
+        self.vcodec: str = vcodec
+        self.pix_fmt: str = pix_fmt
+        self.crf: Optional[int] = crf
+
+        self.process = None
+        self.shape: Optional[tuple] = None
+        self.frames: int = 0
+
+    def open(self, width: int, height: int) -> None:
+        output_kwargs = {"vcodec": self.vcodec, "pix_fmt": self.pix_fmt, "vf": pad_even}
+        if self.crf is not None:
+            output_kwargs["crf"] = self.crf
+
+        self.process = (input("pipe:", format="rawvideo", pix_fmt="rgb24",
+                              s=f"{width}x{height}", framerate=self.framerate)
+                        .output(str(self.output_path), **output_kwargs)
+                        .overwrite_output()
+                        .global_args("-loglevel", "error")
+                        .run_async(pipe_stdin=True)
+                        )
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Pipes one frame to ffmpeg.
+
+        :param frame: RGB (or RGBA) array of shape (height, width, 3 or 4),
+            either uint8 or floats in [0, 1]
+
+        """
+        frame = np.asarray(frame)[:, :, :3]
+        if frame.dtype != np.uint8:
+            frame = (np.clip(frame, 0.0, 1.0) * 255).astype(np.uint8)
+
+        if self.process is None:
+            self.shape = frame.shape
+            self.open(width=frame.shape[1], height=frame.shape[0])
+
+        frame = fit_frame(frame, self.shape)
+
+        self.process.stdin.write(np.ascontiguousarray(frame).tobytes())
+        self.frames += 1
+
+    def write_figure(self, fig) -> None:
+        self.write(figure_to_rgb(fig))
+
+    def close(self) -> Optional[Path]:
+        """
+        Finishes the movie.
+
+        :return: Path of the movie, None if no frame was written
+
+        """
+        if self.process is None:
+            return None
+
+        self.process.stdin.close()
+        returncode = self.process.wait()
+        self.process = None
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to create {self.output_path} "
+                               f"(exit code {returncode}).")
+
+        return self.output_path
+
+    def __enter__(self) -> "VideoSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SinkWriter(animation.AbstractMovieWriter):
+    """
+    Adapter to use a VideoSink as writer for matplotlib.animation.Animation.save.
+
+    """
+    def __init__(self, fps: int = 25, vcodec: str = "libx264", crf: Optional[int] = None):
+        super().__init__(fps=fps)
+        self.vcodec: str = vcodec
+        self.crf: Optional[int] = crf
+        self.sink: Optional[VideoSink] = None
+
+    def setup(self, fig, outfile, dpi=None) -> None:
+        super().setup(fig, outfile, dpi=dpi)
+        self.sink = VideoSink(outfile, framerate=self.fps, vcodec=self.vcodec, crf=self.crf)
+
+    def grab_frame(self, **savefig_kwargs) -> None:
+        self.fig.set_dpi(self.dpi)
+        self.sink.write_figure(self.fig)
+
+    def finish(self) -> None:
+        self.sink.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Divergence watchdog for simulate_raw.
+Every check_every steps the norm, the maximum of :math:`|\\psi|^2` and the trend
+of the energy are checked, so hopeless runs stop early with a reason,
+instead of running until max_timesteps or until mu is NaN.
+
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class Watchdog:
+    def __init__(self,
+                 check_every: int = 100,
+                 norm_tol: float = 10 ** -3,
+                 density_growth: float = 10 ** 3,
+                 energy_rise: float = 10 ** -2,
+                 energy_drift: Optional[float] = None,
+                 patience: int = 5):
+        """
+        :param check_every: Number of steps between checks (the checks need a few
+            passes over psi_val, so not every step)
+
+        :param norm_tol: Maximum deviation of the norm of psi_val from 1
+            (psi_val is normalized every step, so a deviation means NaN, inf or overflow)
+
+        :param density_growth: Maximum factor, by which max :math:`|\\psi|^2`
+            may grow compared to the first check (a collapsing or exploding field)
+
+        :param energy_rise: For imaginary time, E has to decrease. Relative rise of E
+            between checks, which is counted as rising (plateaus fluctuate slightly).
+
+        :param energy_drift: For real time, maximum relative drift of E compared
+            to the first check. None to not check it (E of the solver is only
+            an estimate for real time, dynamics may change it legitimately).
+
+        :param patience: Number of checks in a row with rising E (imaginary time),
+            before the run is aborted (single checks may rise by noise)
+
+        """
+        self.check_every: int = check_every
+        self.norm_tol: float = norm_tol
+        self.density_growth: float = density_growth
+        self.energy_rise: float = energy_rise
+        self.energy_drift: Optional[float] = energy_drift
+        self.patience: int = patience
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets the values of the last run, called by simulate_raw at the start.
+
+        """
+        self.density_max_start: Optional[float] = None
+        self.E_start: Optional[float] = None
+        self.E_last: Optional[float] = None
+        self.rising: int = 0
+        # reason of the abort, None while the run looks healthy
+        self.reason: Optional[str] = None
+
+    def is_due(self, frame: int) -> bool:
+        return (frame % self.check_every) == 0
+
+    def check(self, System, frame: int) -> Optional[str]:
+        """
+        :param System: Schroedinger after the time_step of frame
+
+        :return: Reason to abort the run (also kept as reason), None if it looks healthy
+
+        """
+        self.reason = self.get_reason(System, frame)
+
+        return self.reason
+
+    def get_reason(self, System, frame: int) -> Optional[str]:
+        density = np.abs(System.psi_val) ** 2.0
+        density_max = float(np.max(density))
+        norm = float(System.get_norm_trapez(density))
+        E = float(np.real(System.E))
+
+        if not (np.isfinite(density_max) and np.isfinite(norm) and np.isfinite(E)):
+            return f"frame {frame}: psi_val or E is not finite"
+
+        if abs(norm - 1.0) > self.norm_tol:
+            return f"frame {frame}: norm {norm:.6e} deviates from 1 by more than {self.norm_tol}"
+
+        if self.density_max_start is None:
+            self.density_max_start = density_max
+        elif density_max > self.density_growth * self.density_max_start:
+            return (f"frame {frame}: max density {density_max:.3e} grew by more than "
+                    f"{self.density_growth} since the first check")
+
+        if self.E_start is None:
+            self.E_start = E
+        elif System.imag_time:
+            if E > self.E_last + self.energy_rise * abs(self.E_last):
+                self.rising += 1
+            else:
+                self.rising = 0
+            if self.rising >= self.patience:
+                return (f"frame {frame}: E rose in {self.rising} checks in a row "
+                        f"(imaginary time), E={E:.6e}")
+        elif ((self.energy_drift is not None)
+              and (abs(E - self.E_start) > self.energy_drift * abs(self.E_start))):
+            return (f"frame {frame}: E={E:.6e} drifted by more than {self.energy_drift} "
+                    f"from E={self.E_start:.6e} (real time)")
+        self.E_last = E
+
+        return None
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Work queue on a shared directory, so workers on several hosts
+(python -m supersolids.worker) drain one sweep without a scheduler service.
+
+Every state of a task is a directory of queue_path, tasks move between them
+by renames, which are atomic (also on NFS), so only one worker gets a task:
+
+* pending: tasks waiting for a worker
+* leases: tasks claimed by a worker, the mtime of the file is its heartbeat.
+  The name contains a token of the claim, so a worker only finishes its own lease.
+* done: results (or exceptions) of the tasks, read (and removed) by the submitting
+  QueueExecutor
+
+Leases without heartbeat for longer than lease_seconds (crashed or killed workers)
+are requeued to pending by any worker or executor polling the queue.
+The clocks of the hosts need to be in sync (e.g. NTP).
+Tasks are pickled, so all hosts need the same version of supersolids,
+and the queue directory has to be trusted (unpickling runs code).
+
+"""
+
+import os
+import pickle
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent import futures
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from supersolids.helper.manifest import replace_atomic
+
+# directories of the task states
+states: List[str] = ["pending", "leases", "requeue", "done"]
+
+
+class RemoteTraceback(Exception):
+    """
+    Traceback of an exception raised by a worker, set as __cause__ of the exception.
+
+    """
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+def get_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self,
+                 queue_path: Path,
+                 lease_seconds: float = 300.0,
+                 max_requeues: int = 3):
+        """
+        :param queue_path: Shared directory of the queue (created, if needed)
+
+        :param lease_seconds: Time without heartbeat, after which a lease is stale
+
+        :param max_requeues: Number of times a stale task is requeued, before it fails
+            (e.g. a case, which kills every worker by running out of memory)
+
+        """
+        self.queue_path: Path = Path(queue_path)
+        self.lease_seconds: float = lease_seconds
+        self.max_requeues: int = max_requeues
+        for state in states:
+            Path(self.queue_path, state).mkdir(parents=True, exist_ok=True)
+
+    def get_path(self, state: str, task_id: str) -> Path:
+        return Path(self.queue_path, state, task_id + ".pkl")
+
+    def get_lease_path(self, task_id: str, claim: str) -> Path:
+        return Path(self.queue_path, "leases", f"{task_id}.{claim}.pkl")
+
+    def write(self, path: Path, content: Dict[str, Any]) -> None:
+        replace_atomic(path, lambda f: pickle.dump(content, f))
+
+    def read(self, path: Path) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def put(self, fn: Callable, *args, **kwargs) -> str:
+        """
+        :return: Id of the new task, which calls fn(*args, **kwargs) on a worker.
+            Ids sort in the order of submission, workers take the oldest first.
+
+        """
+        task_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+        self.write(self.get_path("pending", task_id),
+                   {"id": task_id, "fn": fn, "args": args, "kwargs": kwargs, "requeues": 0})
+
+        return task_id
+
+    def remove_pending(self, task_id: str) -> bool:
+        """
+        :return: True, if the task was still pending and is removed (cancelled)
+
+        """
+        try:
+            self.get_path("pending", task_id).unlink()
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def claim(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Moves the oldest pending task to leases (the rename fails for all but one worker).
+
+        :return: Id and content of the claimed task (with the token of the claim as key
+            claim, see :meth:`heartbeat` and :meth:`finish`), None if nothing is pending
+
+        """
+        for path in sorted(Path(self.queue_path, "pending").glob("*.pkl")):
+            task_id = path.stem
+            claim = uuid.uuid4().hex[:8]
+            lease_path = self.get_lease_path(task_id, claim)
+            try:
+                # the heartbeat is set before the rename publishes the lease,
+                # so requeue_stale never sees the old mtime of the pending task
+                os.utime(path)
+                os.rename(path, lease_path)
+            except FileNotFoundError:
+                # claimed by another worker
+                continue
+
+            task = self.read(lease_path)
+            task["claim"] = claim
+
+            return task_id, task
+
+        return None
+
+    def heartbeat(self, task_id: str, claim: str) -> bool:
+        """
+        :return: False, if the lease was lost (requeued, because it was stale)
+
+        """
+        try:
+            os.utime(self.get_lease_path(task_id, claim))
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def finish(self, task_id: str, result: Dict[str, Any],
+               claim: Optional[str] = None) -> bool:
+        """
+        Saves the result (or exception) of a task and releases its lease,
+        if the task is still owned: its lease was not requeued,
+        or the requeued copy is still pending (then it is removed).
+        Otherwise another worker runs the task again, so only its result is saved.
+
+        :param claim: Token of the claim (see :meth:`claim`),
+            None if the caller already took the task (e.g. requeue_stale)
+
+        :return: True, if the result is saved
+
+        """
+        finishing_path = None
+        if claim is not None:
+            # requeue_stale only looks at leases, so the task can not be requeued anymore
+            finishing_path = Path(self.queue_path, "requeue", f"{task_id}.{claim}.finish")
+            try:
+                os.rename(self.get_lease_path(task_id, claim), finishing_path)
+            except FileNotFoundError:
+                finishing_path = None
+                if not self.remove_pending(task_id):
+                    return False
+
+        self.write(self.get_path("done", task_id), result)
+        if finishing_path is not None:
+            finishing_path.unlink()
+
+        return True
+
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        path = self.get_path("done", task_id)
+        if not path.is_file():
+            return None
+
+        return self.read(path)
+
+    def remove_result(self, task_id: str) -> None:
+        try:
+            self.get_path("done", task_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def requeue_stale(self) -> List[str]:
+        """
+        Moves leases without heartbeat for longer than lease_seconds back to pending.
+        Tasks requeued more than max_requeues times are finished with an exception.
+
+        :return: Ids of the requeued tasks
+
+        """
+        requeued: List[str] = []
+        now = time.time()
+        for lease_path in sorted(Path(self.queue_path, "leases").glob("*.pkl")):
+            try:
+                if now - lease_path.stat().st_mtime < self.lease_seconds:
+                    continue
+                # only one process wins the rename and requeues the task
+                requeue_path = Path(self.queue_path, "requeue",
+                                    f"{lease_path.name.split('.')[0]}.{uuid.uuid4().hex[:8]}")
+                os.rename(lease_path, requeue_path)
+            except FileNotFoundError:
+                continue
+
+            task = self.read(requeue_path)
+            task["requeues"] += 1
+            if task["requeues"] > self.max_requeues:
+                self.finish(task["id"], {"exception": RuntimeError(
+                    f"Lease of task {task['id']} expired {task['requeues']} times "
+                    "(worker killed or lost)."), "traceback": ""})
+            else:
+                self.write(self.get_path("pending", task["id"]), task)
+                requeued.append(task["id"])
+            requeue_path.unlink()
+
+        return requeued
+
+    def count(self) -> Dict[str, int]:
+        return {state: len(list(Path(self.queue_path, state).glob("*.pkl")))
+                for state in ["pending", "leases", "done"]}
+
+
+def run_task(queue: WorkQueue, task_id: str, task: Dict[str, Any],
+             heartbeat_seconds: float = 30.0) -> Dict[str, Any]:
+    """
+    Runs a claimed task, while a thread keeps its lease alive, and finishes it.
+
+    :return: Result saved for the task (key result or exception and traceback)
+
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(heartbeat_seconds):
+            if not queue.heartbeat(task_id, task["claim"]):
+                print(f"worker: lease of task {task_id} lost, finishing it anyway.")
+                return
+
+    heart = threading.Thread(target=beat, daemon=True)
+    heart.start()
+    try:
+        result = {"result": task["fn"](*task["args"], **task["kwargs"]),
+                  "worker": get_worker_name()}
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(repr(e))
+        result = {"exception": e, "worker": get_worker_name(),
+                  "traceback": "".join(traceback.format_exception(type(e), e,
+                                                                  e.__traceback__))}
+    finally:
+        stop.set()
+        heart.join()
+
+    if not queue.finish(task_id, result, claim=task["claim"]):
+        print(f"worker: task {task_id} was claimed again by another worker, "
+              "its result is dropped.")
+
+    return result
+
+
+class QueueFuture(futures.Future):
+    def __init__(self, queue: WorkQueue, task_id: str):
+        super().__init__()
+        self.queue: WorkQueue = queue
+        self.task_id: str = task_id
+
+    def cancel(self) -> bool:
+        # only tasks not claimed by a worker can be cancelled
+        if not self.queue.remove_pending(self.task_id):
+            return False
+
+        return super().cancel()
+
+
+class QueueExecutor(futures.Executor):
+    """
+    Executor submitting to a WorkQueue instead of local processes
+    (e.g. for Sweep with queue_path). A thread polls the results.
+
+    """
+    def __init__(self,
+                 queue_path: Path,
+                 poll_seconds: float = 2.0,
+                 **queue_kwargs):
+        """
+        :param queue_path: Shared directory of the queue
+
+        :param poll_seconds: Interval of looking for results and stale leases
+
+        :param queue_kwargs: Passed to WorkQueue (lease_seconds, max_requeues)
+
+        """
+        self.queue: WorkQueue = WorkQueue(queue_path, **queue_kwargs)
+        self.poll_seconds: float = poll_seconds
+        self.futures: Dict[str, QueueFuture] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.stop: threading.Event = threading.Event()
+        self.poller: threading.Thread = threading.Thread(target=self.poll, daemon=True)
+        self.poller.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> QueueFuture:
+        future = QueueFuture(self.queue, self.queue.put(fn, *args, **kwargs))
+        with self.lock:
+            self.futures[future.task_id] = future
+
+        return future
+
+    def poll(self) -> None:
+        while not self.stop.wait(self.poll_seconds):
+            self.collect()
+
+    def collect(self) -> None:
+        """
+        Completes the futures of finished tasks and requeues stale leases.
+
+        """
+        self.queue.requeue_stale()
+        with self.lock:
+            pending = list(self.futures.items())
+        for task_id, future in pending:
+            if future.cancelled():
+                with self.lock:
+                    self.futures.pop(task_id, None)
+                continue
+            result = self.queue.get_result(task_id)
+            if (result is None) or future.done():
+                continue
+            # the result is kept by the future, the file is not needed anymore
+            self.queue.remove_result(task_id)
+            with self.lock:
+                self.futures.pop(task_id, None)
+            if "exception" in result:
+                exception = result["exception"]
+                exception.__cause__ = RemoteTraceback(result.get("traceback", ""))
+                future.set_exception(exception)
+            else:
+                future.set_result(result["result"])
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        if cancel_futures:
+            with self.lock:
+                pending = list(self.futures.values())
+            for future in pending:
+                future.cancel()
+        if wait:
+            while True:
+                with self.lock:
+                    if not self.futures:
+                        break
+                time.sleep(self.poll_seconds)
+        self.stop.set()
@@ -6,142 +6,112 @@
 # Please feel free to use and modify this, but keep the above information.
 
 """
-Animation for the numerical solver for the non-linear
-time-dependent Schrodinger equation for 1D and 2D in multi-core.
+Parameter sweep for the numerical solver for the non-linear
+time-dependent Schrodinger equation for 1D, 2D and 3D in multi-core
+(see :mod:`supersolids.helper.sweep`).
 
 """
 
-import itertools
-import functools
-from concurrent import futures
-import psutil
+import argparse
+import json
+from pathlib import Path
 
-import numpy as np
+import psutil
 
-from supersolids.helper import constants
-from supersolids.helper import functions
-from supersolids.helper import simulate_case
+from supersolids.helper.sweep import Sweep, default_case, parameter_grid
+from supersolids.helper.watchdog import Watchdog
 
 # Script runs, if script is run as main script (called by python *.py)
 if __name__ == "__main__":
-    # for parallelization (use all cores)
-    max_workers = psutil.cpu_count(logical=False)
-
-    # constants needed for the Schroedinger equation
-
-    # due to fft of the points the res
-    # needs to be 2 ** resolution_exponent
-    Res = functions.Resolution(x=2 ** 6, y=2 ** 6, z=None)
-
-    Box = functions.Box(x0=-15, x1=15,
-                        y0=-15, y1=15,
-                        z0=None, z1=None)
-
-    dt: float = 2 * 10 ** -2 # 0.001
-    N: int = 3.8 * 10 ** 4 # 38000
-    m: float = 164.0 * constants.u_in_kg
-    a_dd: float = 130.0 * constants.a_0
-    a_s: float = 85.0 * constants.a_0
-
-    w_x: float = 2.0 * np.pi * 30.0
-    w_y: float = 2.0 * np.pi * 60.0
-    w_z: float = 2.0 * np.pi * 160.0
-
-    alpha_y, alpha_z = functions.get_alphas(w_x=w_x, w_y=w_y, w_z=w_z)
-    g, g_qf, e_dd, a_s_l_ho_ratio = functions.get_parameters(
-        N=N, m=m, a_s=a_s, a_dd=a_dd, w_x=w_x)
-    print(f"g, g_qf, epsilon_dd, alpha_y, alpha_z: "
-          f"{g, g_qf, e_dd, alpha_y, alpha_z}")
-
-    # psi_sol_3d = functions.thomas_fermi_3d
-    kappa = functions.get_kappa(alpha_z=alpha_z, e_dd=e_dd,
-                                x_min=0.1, x_max=5.0, res=1000)
-    R_r, R_z = functions.get_R_rz(kappa=kappa, e_dd=e_dd, N=N,
-                                  a_s_l_ho_ratio=a_s_l_ho_ratio)
-    psi_sol_3d = functools.partial(functions.density_in_trap,
-                                   R_r=R_r, R_z=R_z)
-    print(f"kappa: {kappa}, R_r: {R_r}, R_z: {R_z}")
-
-    # functions needed for the Schroedinger equation (e.g. potential: V,
-    # initial wave function: psi_0)
-    V_1d = functions.v_harmonic_1d
-    V_2d = functools.partial(functions.v_harmonic_2d, alpha_y=alpha_y)
-
-    # functools.partial sets all arguments except x, y, z,
-    # as multiple arguments for Schroedinger aren't implement yet
-    # psi_0_1d = functools.partial(
-    #     functions.psi_0_rect, x_min=-0.25, x_max=-0.25, a=2.0)
-    psi_0_1d = functools.partial(
-        functions.psi_gauss_1d, a=3.0, x_0=0.0, k_0=0.0)
-    psi_0_2d = functools.partial(functions.psi_gauss_2d_pdf,
-                                 mu=[0.0, 0.0],
-                                 var=np.array([[1.0, 0.0], [0.0, 1.0]])
-                                 )
-
-    # Used to remember that 2D need the special pos function (g is set inside
-    # of Schroedinger for convenience)
-    psi_sol_1d = functions.thomas_fermi_1d
-    psi_sol_2d = functions.thomas_fermi_2d_pos
-
-    # TODO: As g is proportional to N * a_s/w_x,
-    # changing g, V, g_qf are different (maybe other variables too)
-    # Multi-core: multiple cases (Schroedinger with different parameters)
-    # box length in 1D: [-L,L], in 2D: [-L,L, -L,L], in 3D: [-L,L, -L,L, -L,L]
-    # generators for L, g, dt to compute for different parameters
-    g_step = 10
-    L_generator = (4,)
-    g_generator = (i for i in np.arange(g, g + g_step, g_step))
-    factors = np.linspace(0.2, 0.3, max_workers)
-    dt_generator = (i * dt for i in factors)
-    cases = itertools.product(L_generator, g_generator, dt_generator)
-
-    # TODO: get mayavi concurrent to work (problem with mlab.figure())
-    i: int = 0
-    with futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
-        for L, g, dt in cases:
-            i = i + 1
-            print(f"i={i}, L={L}, g={g}, dt={dt}")
-            file_name = f"split_{i:03}.mp4"
-            executor.submit(simulate_case,
-                            Box,
-                            Res,
-                            max_timesteps=2001,
-                            dt=dt,
-                            g=g,
-                            g_qf=g_qf,
-                            e_dd=e_dd,
-                            imag_time=True,
-                            mu=1.1,
-                            E=1.0,
-                            psi_0=psi_0_2d,
-                            V=V_2d,
-                            V_interaction=None,
-                            psi_sol=None,
-                            mu_sol=None,
-                            plot_psi_sol=False,
-                            plot_V=False,
-                            psi_0_noise=None,
-                            alpha_psi=0.8,
-                            alpha_psi_sol=0.5,
-                            alpha_V=0.3,
-                            accuracy=10 ** -8,
-                            filename="anim.mp4",
-                            x_lim=(-2.0, 2.0),
-                            y_lim=(-2.0, 2.0),
-                            z_lim=(0, 0.5),
-                            interactive=True,
-                            camera_r_func=functools.partial(
-                                functions.camera_func_r,
-                                r_0=40.0, phi_0=45.0, z_0=50.0,
-                                r_per_frame=0.0),
-                            camera_phi_func=functools.partial(
-                                functions.camera_func_phi,
-                                r_0=40.0, phi_0=45.0, z_0=50.0,
-                                phi_per_frame=5.0),
-                            camera_z_func=functools.partial(
-                                functions.camera_func_z,
-                                r_0=40.0, phi_0=45.0, z_0=50.0,
-                                z_per_frame=0.0),
-                            )
-    print("Multi core done")
-
+    parser = argparse.ArgumentParser(
+        description="Simulate all combinations of a parameter grid offscreen in parallel.")
+    parser.add_argument("-grid", metavar="grid", type=json.loads,
+                        default={"a_s": [80.0, 85.0, 90.0]},
+                        help="Dictionary with the values to sweep for each parameter. "
+                             f"Parameters: {list(default_case.keys())}. "
+                             "a_s and a_dd in units of a_0, m in u, w_x, w_y, w_z in Hz.")
+    parser.add_argument("-case", metavar="case", type=json.loads, default={},
+                        help="Dictionary with parameters fixed for all cases, "
+                             "which differ from the defaults. "
+                             """For example: '{"Res": {"x": 64, "y": 64}, """
+                             """"Box": {"x0": -15, "x1": 15, "y0": -15, "y1": 15}, """
+                             """"a": {"a_x": 1.0, "a_y": 1.0}}'""")
+    parser.add_argument("-dir_path", metavar="dir_path", type=str, default="~/supersolids/results",
+                        help="Absolute path to save data to")
+    parser.add_argument("-steps_per_npz", metavar="steps_per_npz", type=int, default=10,
+                        help="Number of dt steps skipped between saved npz.")
+    parser.add_argument("-cores", metavar="cores", type=int,
+                        default=psutil.cpu_count(logical=False),
+                        help="Number of cores shared by the cases. Cases are started, "
+                             "while their threads fit into the cores. "
+                             "Default: number of physical cores.")
+    parser.add_argument("-threads_per_case", metavar="threads_per_case", type=int, default=None,
+                        help="Threads (FFTs, BLAS) of every case. "
+                             "Default: planned by the grid size (more for bigger grids).")
+    parser.add_argument("-memory_gb", metavar="memory_gb", type=float, default=None,
+                        help="RAM for all running cases. Cases are started, while their "
+                             "predicted peak memory fits. Default: RAM available at the start.")
+    parser.add_argument("-max_workers", metavar="max_workers", type=int, default=None,
+                        help="Maximum number of cases simulated at the same time. "
+                             "Default: cores.")
+    parser.add_argument("--no_registry", default=False, action="store_true",
+                        help="If flag is used, the runs are not recorded in the registry.")
+    parser.add_argument("--no_cache", default=False, action="store_true",
+                        help="If flag is used, cases are run again, "
+                             "even if a converged run with the same parameters exists.")
+    parser.add_argument("--no_shared_grids", default=False, action="store_true",
+                        help="If flag is used, every case builds its own meshes and "
+                             "kernels, instead of sharing them with cases on the same grid.")
+    parser.add_argument("-watchdog_every", metavar="watchdog_every", type=int, default=None,
+                        help="Check norm, max density and energy trend every this many "
+                             "steps and stop hopeless cases early. Default: no checks.")
+    parser.add_argument("-retries", metavar="retries", type=int, default=0,
+                        help="Number of times a diverged case is run again with smaller dt.")
+    parser.add_argument("-dt_factor", metavar="dt_factor", type=float, default=0.5,
+                        help="Factor for dt of every retry.")
+    parser.add_argument("-queue_path", metavar="queue_path", type=str, default=None,
+                        help="Shared directory of a work queue. If given, the cases are "
+                             "run by workers on any hosts (python -m supersolids.worker "
+                             "-queue_path=...) instead of local processes. All cases are "
+                             "enqueued (-memory_gb is not used), each worker runs one at a time.")
+    parser.add_argument("-continuation", metavar="continuation", type=str, nargs="+",
+                        default=None,
+                        help="Numeric parameters of the grid (e.g. a_s) to continue along: "
+                             "each case starts from the nearest converged case, "
+                             "which differs only in these parameters.")
+    parser.add_argument("-start_noise", metavar="start_noise", type=float, nargs=2,
+                        default=None,
+                        help="Min and max of uniform noise multiplied to the state "
+                             "started from (continuation), e.g. to break symmetries.")
+    args = parser.parse_args()
+    print(f"args: {args}")
+
+    cases = parameter_grid(args.grid, base=args.case)
+    print(f"{len(cases)} cases")
+
+    sweep = Sweep(cases,
+                  dir_path=Path(args.dir_path).expanduser(),
+                  max_workers=args.max_workers,
+                  cores=args.cores,
+                  threads_per_case=args.threads_per_case,
+                  memory=None if args.memory_gb is None else int(args.memory_gb * 1024 ** 3),
+                  steps_per_npz=args.steps_per_npz,
+                  use_registry=not args.no_registry,
+                  use_cache=not args.no_cache,
+                  continuation=args.continuation,
+                  start_noise=args.start_noise,
+                  share_grids=not args.no_shared_grids,
+                  watchdog=(None if args.watchdog_every is None
+                            else Watchdog(check_every=args.watchdog_every)),
+                  retries=args.retries,
+                  dt_factor=args.dt_factor,
+                  queue_path=(None if args.queue_path is None
+                              else Path(args.queue_path).expanduser()),
+                  )
+    print(f"Status of the cases: {sweep.status_path}")
+    states = sweep.run()
+
+    for state in states:
+        print(f"case {state['index']}: {state['status']}, {state.get('dir_name', '')}, "
+              f"{ {key: state['case'][key] for key in args.grid} }")
+    print(f"Multi core done: {sweep.progress()}")
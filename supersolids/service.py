@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Local job service to submit, follow and cancel simulations over HTTP
+(see :mod:`supersolids.helper.job_service` for the endpoints), for example:
+python -m supersolids.service -port=8765
+curl -X POST -d '{"a_s": 90}' http://127.0.0.1:8765/jobs
+
+"""
+
+import argparse
+from pathlib import Path
+
+from supersolids.helper.job_service import JobService, serve
+
+# Script runs, if script is run as main script (called by python *.py)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local job service for simulations.")
+    parser.add_argument("-host", metavar="host", type=str, default="127.0.0.1",
+                        help="Address to bind to. Keep localhost, as there is no authentication.")
+    parser.add_argument("-port", metavar="port", type=int, default=8765,
+                        help="Port to listen on.")
+    parser.add_argument("-dir_path", metavar="dir_path", type=str, default="~/supersolids/results",
+                        help="Absolute path to save data to")
+    parser.add_argument("-max_workers", metavar="max_workers", type=int, default=None,
+                        help="Number of simulations running at the same time. Default: cores.")
+    parser.add_argument("-steps_per_npz", metavar="steps_per_npz", type=int, default=10,
+                        help="Number of dt steps skipped between saved npz.")
+    parser.add_argument("--no_cache", default=False, action="store_true",
+                        help="If flag is used, cases are run again, "
+                             "even if a converged run with the same parameters exists.")
+    args = parser.parse_args()
+    print(f"args: {args}")
+
+    service = JobService(dir_path=Path(args.dir_path).expanduser(),
+                         max_workers=args.max_workers,
+                         steps_per_npz=args.steps_per_npz,
+                         use_cache=not args.no_cache)
+    serve(service, host=args.host, port=args.port)
@@ -1,7 +1,12 @@
 #!/usr/bin/env python
 __all__ = ["cut_1d",
            "density_in_trap",
+           "evict_cache",
+           "extract_isosurfaces",
            "load_npz",
+           "map_phases",
+           "query_registry",
+           "render_npz",
            "run_time",
            "simulate_case",
            "simulate_npz",
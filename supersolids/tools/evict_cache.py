@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Deletes cached runs of sweeps by age or to stay inside a disk budget
+(see :mod:`supersolids.helper.result_cache`).
+
+"""
+
+import argparse
+from datetime import timedelta
+from pathlib import Path
+
+from supersolids.helper.result_cache import ResultCache
+
+# Script runs, if script is run as main script (called by python *.py)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evict cached runs from the result cache.")
+    parser.add_argument("-dir_path", metavar="dir_path", type=str, default="~/supersolids/results",
+                        help="Absolute path, where the registry and the runs lie")
+    parser.add_argument("-max_age_days", metavar="max_age_days", type=float, default=None,
+                        help="Evict runs not finished or used for longer than this.")
+    parser.add_argument("-max_gb", metavar="max_gb", type=float, default=None,
+                        help="Evict least recently used runs, until all cached runs "
+                             "need at most this disk space.")
+    parser.add_argument("--dry_run", default=False, action="store_true",
+                        help="If flag is used, only print the runs to evict.")
+    args = parser.parse_args()
+    print(f"args: {args}")
+
+    max_age = None if args.max_age_days is None else timedelta(days=args.max_age_days)
+    max_bytes = None if args.max_gb is None else int(args.max_gb * 1024 ** 3)
+
+    cache = ResultCache(Path(args.dir_path).expanduser())
+    evicted = cache.evict(max_age=max_age, max_bytes=max_bytes, dry_run=args.dry_run)
+    print(f"{'To evict' if args.dry_run else 'Evicted'}: {evicted}")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Extracts isosurfaces of :math:`|\\psi|^2` for all saved steps of a 3D run
+with marching cubes (needs scikit-image) on a process pool.
+The meshes are saved next to the steps (e.g. mesh_000010.npz for step_000010.npz)
+and are used by load_npz (-filename_mesh) and render_npz (-filename_mesh).
+
+"""
+
+import argparse
+import os
+from concurrent import futures
+from pathlib import Path
+from typing import List, Optional
+
+from supersolids.helper import get_path
+from supersolids.helper.isosurface import extract_mesh
+from supersolids.tools.render_npz import axis_names, load_grid
+
+
+def extract_isosurfaces(input_path: Path,
+                        filename_schroedinger: str = "schroedinger.json",
+                        filename_steps: str = "step_",
+                        steps_format: str = "%06d",
+                        filename_mesh: str = "mesh_",
+                        frame_start: int = 0,
+                        levels: List[float] = [0.1, 0.5, 0.9],
+                        relative: bool = True,
+                        overwrite: bool = False,
+                        max_workers: Optional[int] = None,
+                        ) -> List[Path]:
+    """
+    Extracts the isosurfaces of all saved steps of the run in input_path in a process pool.
+
+    :param input_path: Path of the movieNNN directory of the run
+
+    :param filename_mesh: Name of the mesh files without enumerator
+
+    :param frame_start: First frame to extract
+
+    :param levels: Densities of the isosurfaces
+
+    :param relative: If True, levels are fractions of the maximum density of each frame,
+        otherwise absolute densities
+
+    :param overwrite: If False, frames with an existing mesh are skipped
+
+    :param max_workers: Number of processes, None for all cores
+
+    :return: Paths of the written meshes
+
+    """
+    box, res, _ = load_grid(input_path, filename_schroedinger)
+    assert res["z"] is not None, "Isosurfaces need a 3D run."
+    # the grid points of the solver include x1 (np.linspace with endpoint)
+    spacing = [(box[name + "1"] - box[name + "0"]) / (res[name] - 1) for name in axis_names]
+    origin = [box[name + "0"] for name in axis_names]
+
+    jobs = []
+    for frame in get_path.get_step_frames(input_path, filename_steps=filename_steps):
+        mesh_path = Path(input_path, filename_mesh + steps_format % frame + ".npz")
+        if (frame < frame_start) or (mesh_path.is_file() and not overwrite):
+            continue
+        jobs.append((Path(input_path, filename_steps + steps_format % frame + ".npz"),
+                     mesh_path))
+
+    meshes: List[Path] = []
+    with futures.ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        submitted = [executor.submit(extract_mesh, step_path, mesh_path, levels,
+                                     spacing, origin, relative=relative)
+                     for step_path, mesh_path in jobs]
+        for future in futures.as_completed(submitted):
+            meshes.append(future.result())
+            print(f"extracted {len(meshes)}/{len(jobs)}")
+
+    return sorted(meshes)
+
+
+# Script runs, if script is run as main script (called by python *.py)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Extract isosurfaces of the saved steps of a 3D run in parallel.")
+    parser.add_argument("-dir_path", metavar="dir_path", type=str, default="~/supersolids/results",
+                        help="Absolute path to load data from")
+    parser.add_argument("-dir_name", metavar="dir_name", type=str, default="movie" + "%03d" % 1,
+                        help="Name of directory where the files to load lie. "
+                             "For example the standard naming convention is movie001")
+    parser.add_argument("-filename_schroedinger", metavar="filename_schroedinger", type=str,
+                        default="schroedinger.json",
+                        help="Name of file, where the metadata of the run is saved.")
+    parser.add_argument("-filename_steps", metavar="filename_steps", type=str, default="step_",
+                        help="Name of the files, where the steps are saved, without enumerator.")
+    parser.add_argument("-steps_format", metavar="steps_format", type=str, default="%06d",
+                        help="Formating string to enumerate the files.")
+    parser.add_argument("-filename_mesh", metavar="filename_mesh", type=str, default="mesh_",
+                        help="Name of the files, where the meshes are saved, without enumerator.")
+    parser.add_argument("-frame_start", metavar="frame_start", type=int, default=0,
+                        help="First frame to extract.")
+    parser.add_argument("-levels", metavar="levels", type=float, nargs="+",
+                        default=[0.1, 0.5, 0.9],
+                        help="Densities of the isosurfaces, "
+                             "as fractions of the maximum density of each frame.")
+    parser.add_argument("--absolute", default=False, action="store_true",
+                        help="If flag is used, levels are absolute densities.")
+    parser.add_argument("--overwrite", default=False, action="store_true",
+                        help="If flag is used, existing meshes are extracted again.")
+    parser.add_argument("-max_workers", metavar="max_workers", type=int, default=None,
+                        help="Number of processes used. Default: all cores.")
+    args = parser.parse_args()
+    print(f"args: {args}")
+
+    meshes = extract_isosurfaces(Path(Path(args.dir_path).expanduser(), args.dir_name),
+                                 filename_schroedinger=args.filename_schroedinger,
+                                 filename_steps=args.filename_steps,
+                                 steps_format=args.steps_format,
+                                 filename_mesh=args.filename_mesh,
+                                 frame_start=args.frame_start,
+                                 levels=args.levels,
+                                 relative=not args.absolute,
+                                 overwrite=args.overwrite,
+                                 max_workers=args.max_workers,
+                                 )
+    print(f"{len(meshes)} meshes extracted")
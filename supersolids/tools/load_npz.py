@@ -31,8 +31,9 @@ if __name__ == "__main__":
                         help="Name of directory where the files to load lie. "
                              "For example the standard naming convention is movie001")
     parser.add_argument("-filename_schroedinger", metavar="filename_schroedinger", type=str,
-                        default="schroedinger.pkl",
-                        help="Name of file, where the Schroedinger object is saved")
+                        default="schroedinger.json",
+                        help="Name of file, where the Schroedinger metadata is saved "
+                             "(schroedinger.pkl for older runs)")
     parser.add_argument("-filename_steps", metavar="filename_steps",
                         type=str, default="step_",
                         help="Name of file, without enumarator for the files. "
@@ -45,13 +46,27 @@ if __name__ == "__main__":
                              "the string needed is percent 06d")
     parser.add_argument("-steps_per_npz", metavar="steps_per_npz",
                         type=int, default=10,
-                        help="Number of dt steps skipped between saved npz.")
+                        help="Minimum number of dt steps between shown npz. "
+                             "Use 1 to show all saved npz.")
     parser.add_argument("-frame_start", metavar="frame_start",
                         type=int, default=0,
                         help="Counter of first saved npz.")
+    parser.add_argument("-prefetch", metavar="prefetch",
+                        type=int, default=4,
+                        help="Number of npz loaded ahead in the background while playing.")
+    parser.add_argument("-filename_mesh", metavar="filename_mesh", type=str, default=None,
+                        help="If set (e.g. mesh_), isosurfaces precomputed by "
+                             "extract_isosurfaces are shown instead of contouring each frame.")
     parser.add_argument("--delete_input", default=False, action="store_true",
                         help="If flag is not used, the pictures after "
                              "animation is created and saved.")
+    parser.add_argument("--video_sink", default=False, action="store_true",
+                        help="Pipe the frames directly into ffmpeg "
+                             "instead of saving pictures first.")
+    parser.add_argument("-frames_per_segment", metavar="frames_per_segment",
+                        type=int, default=None,
+                        help="If set, the movie is encoded in segments of this many frames "
+                             "on all cores and joined afterwards.")
     args = parser.parse_args()
     print(f"args: {args}")
 
@@ -71,6 +86,7 @@ if __name__ == "__main__":
     # mayavi for 3D
     MayAnim = MayaviAnimation.MayaviAnimation(Anim,
                                               dir_path=dir_path,
+                                              video_sink=args.video_sink,
                                               )
 
     MayAnimator = MayAnim.animate_npz(dir_path=dir_path,
@@ -79,10 +95,13 @@ if __name__ == "__main__":
                                       filename_steps=args.filename_steps,
                                       steps_format=args.steps_format,
                                       steps_per_npz=args.steps_per_npz,
-                                      frame_start=args.frame_start
+                                      frame_start=args.frame_start,
+                                      prefetch=args.prefetch,
+                                      filename_mesh=args.filename_mesh,
                                       )
     mlab.show()
 
     result_path = MayAnim.create_movie(dir_path=MayAnim.dir_path,
                                        input_data_file_pattern="*.png",
-                                       delete_input=args.delete_input)
+                                       delete_input=args.delete_input,
+                                       frames_per_segment=args.frames_per_segment)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Maps the phases (unmodulated, supersolid, droplets) over some parameters,
+refining only near the phase boundaries (see :mod:`supersolids.helper.phase_diagram`),
+for example over a_s and N:
+python -m supersolids.tools.map_phases -axes='{"a_s": [80, 100], "N": [20000, 80000]}' -log N
+
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from supersolids.helper.phase_diagram import PhaseMapper
+from supersolids.helper.sweep import default_case
+
+# Script runs, if script is run as main script (called by python *.py)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adaptive phase diagram of sweep cases.")
+    parser.add_argument("-axes", metavar="axes", type=json.loads,
+                        default={"a_s": [80.0, 100.0], "N": [2 * 10 ** 4, 8 * 10 ** 4]},
+                        help="Dictionary with lower and upper bound of each parameter "
+                             f"to map. Parameters: {list(default_case.keys())}. "
+                             "a_s and a_dd in units of a_0, m in u, w_x, w_y, w_z in Hz.")
+    parser.add_argument("-case", metavar="case", type=json.loads, default={},
+                        help="Dictionary with parameters fixed for all cases, "
+                             "which differ from the defaults.")
+    parser.add_argument("-points", metavar="points", type=int, default=3,
+                        help="Number of values of each axis of the initial grid.")
+    parser.add_argument("-budget", metavar="budget", type=int, default=50,
+                        help="Maximum number of cases.")
+    parser.add_argument("-max_depth", metavar="max_depth", type=int, default=4,
+                        help="Maximum number of times a cell of the initial grid is halved.")
+    parser.add_argument("-log", metavar="log", type=str, nargs="+", default=[],
+                        help="Axes split geometrically (e.g. N).")
+    parser.add_argument("-dir_path", metavar="dir_path", type=str, default="~/supersolids/results",
+                        help="Absolute path to save data to")
+    parser.add_argument("-max_workers", metavar="max_workers", type=int, default=None,
+                        help="Maximum number of cases simulated at the same time.")
+    parser.add_argument("-queue_path", metavar="queue_path", type=str, default=None,
+                        help="Shared directory of a work queue. If given, the cases are "
+                             "run by workers on any hosts (python -m supersolids.worker).")
+    parser.add_argument("--unconverged", default=False, action="store_true",
+                        help="If flag is used, cases stopped by max_timesteps are "
+                             "classified too.")
+    args = parser.parse_args()
+    print(f"args: {args}")
+
+    classified = ["converged", "cached"]
+    if args.unconverged:
+        classified.append("max_timesteps")
+
+    mapper = PhaseMapper({key: tuple(bounds) for key, bounds in args.axes.items()},
+                         base=args.case,
+                         points=args.points,
+                         budget=args.budget,
+                         max_depth=args.max_depth,
+                         log_axes=args.log,
+                         classified=classified,
+                         dir_path=Path(args.dir_path).expanduser(),
+                         max_workers=args.max_workers,
+                         queue_path=(None if args.queue_path is None
+                                     else Path(args.queue_path).expanduser()),
+                         )
+    print(f"Phase diagram: {mapper.result_path}")
+    results = mapper.run()
+
+    for result in sorted(results, key=lambda result: list(result["point"].values())):
+        print(f"{result['point']}: {result['phase']} ({result['status']}, "
+              f"{result.get('dir_name')})")
+    print(f"{len(results)} cases")
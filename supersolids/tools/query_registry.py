@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Query the registry of simulations saved in dir_path,
+for example all converged runs with a_s between 80 and 90 a_0:
+python -m supersolids.tools.query_registry -status=converged -a_s 80 90
+
+"""
+
+import argparse
+from pathlib import Path
+
+from supersolids.helper import constants
+from supersolids.helper.registry import Registry, column_names, statuses
+
+# Script runs, if script is run as main script (called by python *.py)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the registry of simulations.")
+    parser.add_argument("-dir_path", metavar="dir_path", type=str, default="~/supersolids/results",
+                        help="Absolute path, where the registry lies")
+    parser.add_argument("-status", metavar="status", type=str, default=None,
+                        choices=statuses,
+                        help=f"Only show runs with this status. One of {statuses}")
+    parser.add_argument("-a_s", metavar="a_s", type=float, default=None, nargs=2,
+                        help="Minimum and maximum of a_s in units of a_0")
+    parser.add_argument("-where", metavar=("column", "min", "max"), type=str, default=[],
+                        nargs=3, action="append",
+                        help="Minimum and maximum of any column in SI units. "
+                             "Use None for an open side. Can be given multiple times.")
+    parser.add_argument("-columns", metavar="columns", type=str, nargs="+",
+                        default=["dir_name", "status", "N", "Res", "dt", "a_s",
+                                 "e_dd", "mu", "E", "steps"],
+                        help=f"Columns to print. Available are {column_names}")
+    parser.add_argument("-order_by", metavar="order_by", type=str, default="dir_name",
+                        help="Column to sort the runs by")
+    parser.add_argument("--scan", default=False, action="store_true",
+                        help="Registers runs of dir_path, which are not in the registry yet "
+                             "(loads their Schroedinger once).")
+    args = parser.parse_args()
+
+    try:
+        dir_path = Path(args.dir_path).expanduser()
+    except Exception:
+        dir_path = args.dir_path
+
+    registry = Registry(dir_path)
+
+    if args.scan:
+        registered = registry.scan()
+        print(f"Registered {len(registered)} runs: {registered}")
+
+    ranges = {}
+    if args.a_s is not None:
+        ranges["a_s"] = (args.a_s[0] * constants.a_0, args.a_s[1] * constants.a_0)
+    for column, value_min, value_max in args.where:
+        ranges[column] = tuple(None if value == "None" else float(value)
+                               for value in (value_min, value_max))
+
+    runs = registry.query(status=args.status, order_by=args.order_by, **ranges)
+    for run in runs:
+        if "a_s" in run and run["a_s"] is not None:
+            # a_s is more readable in units of a_0
+            run["a_s"] = f"{run['a_s'] / constants.a_0:.2f} a_0"
+        print(", ".join(f"{column}={run[column]}" for column in args.columns))
+
+    print(f"{len(runs)} runs found.")
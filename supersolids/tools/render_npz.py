@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Renders the saved steps (or the recorded products) of a run offscreen
+with matplotlib (Agg, no display needed). The frames are distributed over
+a process pool, each worker writes numbered pictures, which are encoded
+to a movie at the end.
+
+"""
+
+import argparse
+import collections
+import json
+import math
+import os
+from concurrent import futures
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib import pyplot as plt
+import numpy as np
+from ffmpeg import input
+
+from supersolids.Schroedinger import Schroedinger
+from supersolids.helper import get_path
+from supersolids.helper.products import get_axis_names, kinds, load_products, reduce_density
+from supersolids.helper.segment_encoder import encode_parallel
+from supersolids.helper.video_sink import VideoSink, figure_to_rgb, pad_even
+
+axis_names: List[str] = ["x", "y", "z"]
+
+
+def load_grid(input_path: Path,
+              filename_schroedinger: str = "schroedinger.json",
+              ) -> Tuple[Dict[str, Optional[float]], Dict[str, Optional[int]], float]:
+    """
+    Reads Box, Res and dt of a run without constructing the System
+    (older runs with a pickled Schroedinger are loaded).
+
+    :return: Box and Res as dictionaries (see functions.Box.to_dict) and dt
+
+    """
+    schroedinger_path = Path(input_path, filename_schroedinger)
+    if schroedinger_path.suffix == ".json" and schroedinger_path.is_file():
+        with open(schroedinger_path, "r") as f:
+            metadata = json.load(f)
+        return metadata["Box"], metadata["Res"], metadata["dt"]
+
+    System = Schroedinger.load(schroedinger_path)
+
+    return System.Box.to_dict(), System.Res.to_dict(), System.dt
+
+
+def get_axes(box: Dict[str, Optional[float]],
+             res: Dict[str, Optional[int]]) -> List[np.ndarray]:
+    """
+    Grid points of each available axis (as used by the solver, including x1).
+
+    """
+    return [np.linspace(box[name + "0"], box[name + "1"], res[name])
+            for name in axis_names if res[name] is not None]
+
+
+def load_reduced(step_path: Path,
+                 spacing: List[float],
+                 products: List[str],
+                 slice_indices: Optional[List[int]] = None) -> Dict[str, np.ndarray]:
+    """
+    Loads psi_val of a saved step and reduces :math:`|\\psi|^2`
+    (see :func:`supersolids.helper.products.reduce_density`).
+
+    """
+    with open(step_path, "rb") as f:
+        psi_val = np.load(file=f)["psi_val"]
+
+    return reduce_density(np.abs(psi_val) ** 2, spacing,
+                          products=products, slice_indices=slice_indices)
+
+
+def plot_isosurface(ax, mesh_path: Path) -> None:
+    """
+    Plots a precomputed isosurface (npz with verts and faces) on a 3D axis.
+
+    """
+    with np.load(mesh_path) as mesh:
+        verts = mesh["verts"]
+        faces = mesh["faces"]
+
+    if len(faces) > 0:
+        ax.plot_trisurf(verts[:, 0], verts[:, 1], faces, verts[:, 2],
+                        color="tab:blue", alpha=0.8, linewidth=0.0)
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    ax.set_zlabel("z")
+
+
+def get_image(key: str, values: np.ndarray, dim: int) -> Tuple[np.ndarray, List[int]]:
+    """
+    Orients a 2D reduction (slice, column or the 2D density) for imshow.
+
+    :param key: Key of the reduction (see :func:`supersolids.helper.products.reduce_density`)
+
+    :param values: The reduction, its axes in the order of psi_val
+        (2D is (y, x), see :func:`supersolids.helper.products.get_axis_names`)
+
+    :param dim: Dimension of the run
+
+    :return: values with the vertical direction as first axis and the indices
+        (in axis_names) of the horizontal and vertical direction
+
+    """
+    # the direction of the key is fixed (slice) or integrated (column)
+    key_names = [name for name in get_axis_names(dim) if (key == "density") or (name != key[-1])]
+    shown = sorted(axis_names.index(name) for name in key_names)
+    # imshow puts the first array axis vertical
+    if key_names[0] == axis_names[shown[1]]:
+        return values, shown
+
+    return values.T, shown
+
+
+def render_frame(picture_path: Optional[Path],
+                 source: Union[Path, Dict[str, np.ndarray]],
+                 axes: List[np.ndarray],
+                 products: List[str],
+                 slice_indices: Optional[List[int]] = None,
+                 title: str = "",
+                 mesh_path: Optional[Path] = None,
+                 dpi: int = 100) -> Union[Path, np.ndarray]:
+    """
+    Renders one frame into picture_path. Runs in the worker processes.
+
+    :param picture_path: Path of the picture to write.
+        If None, the pixels are returned (RGB) instead.
+
+    :param source: Path of a saved step or reductions from recorded products
+
+    :param axes: Grid points of each axis (see :func:`get_axes`)
+
+    :param products: Kinds of reductions to plot
+
+    :param slice_indices: Indices of grid points where slices and cuts are taken
+
+    :param title: Title of the frame
+
+    :param mesh_path: If not None, npz of a precomputed isosurface to plot.
+        The panel is left empty, if the file does not exist (yet),
+        so all frames of a run have the same layout.
+
+    :param dpi: Resolution of the picture
+
+    :return: picture_path or the pixels of the frame as RGB array
+
+    """
+    if isinstance(source, dict):
+        reduced = source
+    else:
+        # integration weights of the solver (box length / Res)
+        spacing = [(x[-1] - x[0]) / len(x) for x in axes]
+        reduced = load_reduced(source, spacing, products, slice_indices)
+
+    images = [key for key in ["slice_x", "slice_y", "slice_z",
+                              "column_x", "column_y", "column_z", "density"]
+              if (key in reduced) and (reduced[key].ndim == 2)]
+    lines = [key for key in ["cut_x", "cut_y", "cut_z", "column_x", "column_y", "density"]
+             if (key in reduced) and (reduced[key].ndim == 1)]
+    names = get_axis_names(len(axes))
+    panels = len(images) + int(bool(lines)) + int(mesh_path is not None)
+    columns = min(3, max(1, panels))
+    rows = max(1, math.ceil(panels / columns))
+    fig = plt.figure(figsize=(4.0 * columns, 3.5 * rows))
+
+    panel = 0
+    for key in images:
+        panel += 1
+        ax = fig.add_subplot(rows, columns, panel)
+        values, shown = get_image(key, reduced[key], len(axes))
+        extent = [axes[shown[0]][0], axes[shown[0]][-1],
+                  axes[shown[1]][0], axes[shown[1]][-1]]
+        image = ax.imshow(values, origin="lower", extent=extent,
+                          aspect="auto", cmap="viridis")
+        fig.colorbar(image, ax=ax)
+        ax.set_title(key)
+        ax.set_xlabel(axis_names[shown[0]])
+        ax.set_ylabel(axis_names[shown[1]])
+
+    if lines:
+        panel += 1
+        ax = fig.add_subplot(rows, columns, panel)
+        for key in lines:
+            if key == "density":
+                axis = 0
+            elif key.startswith("column_"):
+                # 2D column densities are along the direction not integrated
+                axis = axis_names.index([name for name in names if name != key[-1]][0])
+            else:
+                axis = axis_names.index(key[-1])
+            ax.plot(axes[axis], reduced[key], "x-", label=key)
+        ax.set_ylabel(r"$|\psi|^2$")
+        ax.legend()
+        ax.grid()
+
+    if mesh_path is not None:
+        panel += 1
+        ax = fig.add_subplot(rows, columns, panel, projection="3d")
+        if Path(mesh_path).is_file():
+            plot_isosurface(ax, mesh_path)
+        else:
+            ax.set_title("no isosurface")
+
+    fig.suptitle(title)
+    fig.tight_layout()
+    if picture_path is None:
+        fig.set_dpi(dpi)
+        rgb = figure_to_rgb(fig).copy()
+        plt.close(fig)
+        return rgb
+
+    fig.savefig(picture_path, dpi=dpi)
+    plt.close(fig)
+
+    return picture_path
+
+
+def encode_frames(input_path: Path,
+                  filename_frames: str = "render_",
+                  steps_format: str = "%06d",
+                  filename: str = "anim.mp4",
+                  framerate: int = 25,
+                  vcodec: str = "libx264",
+                  crf: Optional[int] = None) -> Path:
+    """
+    Encodes the numbered pictures in input_path to a movie.
+
+    :return: Path of the movie
+
+    """
+    output_path = Path(input_path, filename)
+    output_kwargs = {"vcodec": vcodec, "pix_fmt": "yuv420p", "vf": pad_even}
+    if crf is not None:
+        output_kwargs["crf"] = crf
+    input(str(Path(input_path, filename_frames + steps_format + ".png")),
+          framerate=framerate).output(str(output_path),
+                                      **output_kwargs).overwrite_output().run()
+
+    return output_path
+
+
+def render_npz(input_path: Path,
+               filename_schroedinger: str = "schroedinger.json",
+               filename_steps: str = "step_",
+               steps_format: str = "%06d",
+               steps_per_npz: int = 1,
+               frame_start: int = 0,
+               products: List[str] = ["slices", "cuts"],
+               from_products: bool = False,
+               slice_indices: Optional[List[int]] = None,
+               filename_mesh: Optional[str] = None,
+               filename_frames: str = "render_",
+               max_workers: Optional[int] = None,
+               dpi: int = 100,
+               sink: Optional[VideoSink] = None,
+               ) -> List[Path]:
+    """
+    Renders all frames of the run in input_path in a process pool.
+    The pictures are numbered consecutively (filename_frames + steps_format),
+    so they can be encoded directly.
+    If a sink is given, no pictures are written, but the rendered frames
+    are piped in order into the sink.
+
+    :param input_path: Path of the movieNNN directory of the run
+
+    :param steps_per_npz: Minimum number of dt steps between rendered frames
+
+    :param frame_start: First frame to render
+
+    :param products: Kinds of reductions to plot
+
+    :param from_products: If True, the recorded products are rendered
+        (fine cadence) instead of the saved steps
+
+    :param slice_indices: Indices of grid points where slices and cuts are taken.
+        None for the centre of the grid.
+
+    :param filename_mesh: If not None, name of precomputed isosurfaces
+        (e.g. mesh_ for mesh_000010.npz) to plot for each frame.
+        Frames without mesh get an empty panel, if no frame has one, there is no panel.
+
+    :param max_workers: Number of processes, None for all cores
+
+    :param sink: If not None, the frames are written into this video sink
+
+    :return: Paths of the rendered pictures in order (empty, if sink is used)
+
+    """
+    box, res, dt = load_grid(input_path, filename_schroedinger)
+    axes = get_axes(box, res)
+
+    jobs: List[Tuple[int, Any, str]] = []
+    if from_products:
+        recorded = load_products(input_path)
+        for i, frame in enumerate(recorded.get("frame", [])):
+            if (frame < frame_start) or (jobs and (frame - jobs[-1][0] < steps_per_npz)):
+                continue
+            reduced = {key: values[i] for key, values in recorded.items()
+                       if key not in ["frame", "t", "mu", "E"]}
+            jobs.append((int(frame), reduced,
+                         f"frame={frame}, t={recorded['t'][i]:07.05f}, "
+                         f"mu={recorded['mu'][i]:.5f}"))
+    else:
+        frames = get_path.get_step_frames(input_path, filename_steps=filename_steps)
+        for frame in frames:
+            if (frame < frame_start) or (jobs and (frame - jobs[-1][0] < steps_per_npz)
+                                         and (frame != frames[-1])):
+                continue
+            jobs.append((frame,
+                         Path(input_path, filename_steps + steps_format % frame + ".npz"),
+                         f"frame={frame}, t={dt * frame:07.05f}"))
+
+    # the layout is decided once, so all frames have the same size (needed by the encoders)
+    mesh_paths: List[Optional[Path]] = [None for _ in jobs]
+    if filename_mesh is not None:
+        mesh_paths = [Path(input_path, filename_mesh + steps_format % frame + ".npz")
+                      for frame, _, _ in jobs]
+        if not any(mesh_path.is_file() for mesh_path in mesh_paths):
+            mesh_paths = [None for _ in jobs]
+
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    pictures: List[Path] = []
+
+    def collect(future: futures.Future) -> None:
+        if sink is None:
+            pictures.append(future.result())
+            rendered = len(pictures)
+        else:
+            sink.write(future.result())
+            rendered = sink.frames
+        print(f"rendered {rendered}/{len(jobs)}")
+
+    with futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # frames are collected in order, the window bounds the frames held in memory
+        pending: collections.deque = collections.deque()
+        for i, ((frame, source, title), mesh_path) in enumerate(zip(jobs, mesh_paths)):
+            picture_path = None
+            if sink is None:
+                picture_path = Path(input_path, filename_frames + steps_format % i + ".png")
+            pending.append(
+                executor.submit(render_frame, picture_path, source, axes, products,
+                                slice_indices=slice_indices,
+                                title=title,
+                                mesh_path=mesh_path,
+                                dpi=dpi))
+            if len(pending) >= 2 * max_workers:
+                collect(pending.popleft())
+
+        while pending:
+            collect(pending.popleft())
+
+    return pictures
+
+
+# Script runs, if script is run as main script (called by python *.py)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render the saved steps of a run offscreen in parallel and encode a movie.")
+    parser.add_argument("-dir_path", metavar="dir_path", type=str, default="~/supersolids/results",
+                        help="Absolute path to load data from")
+    parser.add_argument("-dir_name", metavar="dir_name", type=str, default="movie" + "%03d" % 1,
+                        help="Name of directory where the files to load lie. "
+                             "For example the standard naming convention is movie001")
+    parser.add_argument("-filename_schroedinger", metavar="filename_schroedinger", type=str,
+                        default="schroedinger.json",
+                        help="Name of file, where the metadata of the run is saved.")
+    parser.add_argument("-filename_steps", metavar="filename_steps", type=str, default="step_",
+                        help="Name of the files, where the steps are saved, without enumerator.")
+    parser.add_argument("-steps_format", metavar="steps_format", type=str, default="%06d",
+                        help="Formating string to enumerate the files.")
+    parser.add_argument("-steps_per_npz", metavar="steps_per_npz", type=int, default=1,
+                        help="Minimum number of dt steps between rendered frames.")
+    parser.add_argument("-frame_start", metavar="frame_start", type=int, default=0,
+                        help="First frame to render.")
+    parser.add_argument("-products", metavar="products", type=str, nargs="+",
+                        default=["slices", "cuts"], choices=kinds,
+                        help="Reductions of the density to plot.")
+    parser.add_argument("--from_products", default=False, action="store_true",
+                        help="Render the recorded products instead of the saved steps.")
+    parser.add_argument("-filename_mesh", metavar="filename_mesh", type=str, default=None,
+                        help="If set (e.g. mesh_), precomputed isosurfaces are plotted.")
+    parser.add_argument("-max_workers", metavar="max_workers", type=int, default=None,
+                        help="Number of processes used for rendering. Default: all cores.")
+    parser.add_argument("-dpi", metavar="dpi", type=int, default=100,
+                        help="Resolution of the rendered frames.")
+    parser.add_argument("-framerate", metavar="framerate", type=int, default=25,
+                        help="Frames per second of the movie.")
+    parser.add_argument("-vcodec", metavar="vcodec", type=str, default="libx264",
+                        help="Video codec used by ffmpeg.")
+    parser.add_argument("-crf", metavar="crf", type=int, default=None,
+                        help="Constant rate factor (quality, lower is better).")
+    parser.add_argument("-frames_per_segment", metavar="frames_per_segment",
+                        type=int, default=None,
+                        help="If set, the movie is encoded in segments of this many frames "
+                             "on all cores and joined afterwards.")
+    parser.add_argument("-filename", metavar="filename", type=str, default="anim.mp4",
+                        help="Name of the movie.")
+    parser.add_argument("--delete_input", default=False, action="store_true",
+                        help="If flag is used, the rendered pictures are deleted "
+                             "after the movie is created.")
+    parser.add_argument("--video_sink", default=False, action="store_true",
+                        help="Pipe the rendered frames directly into ffmpeg "
+                             "instead of saving pictures first.")
+    args = parser.parse_args()
+    print(f"args: {args}")
+
+    input_path = Path(Path(args.dir_path).expanduser(), args.dir_name)
+    sink = None
+    if args.video_sink:
+        sink = VideoSink(Path(input_path, args.filename), framerate=args.framerate,
+                         vcodec=args.vcodec, crf=args.crf)
+
+    pictures = render_npz(input_path,
+                          filename_schroedinger=args.filename_schroedinger,
+                          filename_steps=args.filename_steps,
+                          steps_format=args.steps_format,
+                          steps_per_npz=args.steps_per_npz,
+                          frame_start=args.frame_start,
+                          products=args.products,
+                          from_products=args.from_products,
+                          filename_mesh=args.filename_mesh,
+                          max_workers=args.max_workers,
+                          dpi=args.dpi,
+                          sink=sink,
+                          )
+
+    if sink is not None:
+        output_path = sink.close()
+    elif args.frames_per_segment is not None:
+        output_path = encode_parallel(pictures, Path(input_path, args.filename),
+                                      framerate=args.framerate,
+                                      vcodec=args.vcodec,
+                                      crf=args.crf,
+                                      frames_per_segment=args.frames_per_segment,
+                                      max_workers=args.max_workers)
+    else:
+        output_path = encode_frames(input_path, steps_format=args.steps_format,
+                                    filename=args.filename, framerate=args.framerate,
+                                    vcodec=args.vcodec, crf=args.crf)
+    print(f"movie: {output_path}")
+
+    if args.delete_input:
+        for picture in pictures:
+            picture.unlink()
@@ -15,11 +15,15 @@ from pathlib import Path
 
 import numpy as np
 from mayavi import mlab
-from typing import Tuple
+from typing import Optional, Tuple
 
 from supersolids.Animation import Animation, MayaviAnimation, \
     MatplotlibAnimation
 from supersolids.Schroedinger import Schroedinger
+from supersolids.helper import get_path
+from supersolids.helper.output_scheduler import OutputScheduler
+from supersolids.helper.products import Products
+from supersolids.helper.registry import Registry
 from supersolids.tools import run_time
 from supersolids.tools.cut_1d import cut_1d
 
@@ -37,6 +41,15 @@ def simulate_case(System: Schroedinger,
                   z_lim: Tuple[float, float] = (-1.0, 1.0),
                   steps_per_npz: int = 10,
                   frame_start: int = 0,
+                  use_registry: bool = True,
+                  products: Optional[Products] = None,
+                  output_scheduler: Optional[OutputScheduler] = None,
+                  input_path: Optional[Path] = None,
+                  video_sink: bool = False,
+                  frames_per_segment: Optional[int] = None,
+                  record_first: bool = False,
+                  live_thread: bool = False,
+                  render_2d: str = "surface",
                   ) -> Schroedinger:
     """
     Wrapper for Animation and Schroedinger to get a working Animation
@@ -70,18 +83,48 @@ def simulate_case(System: Schroedinger,
 
     :param z_lim: Limits of plot in z direction
 
+    :param use_registry: Condition if the run is recorded in the
+        registry of dir_path (see :class:`supersolids.helper.registry.Registry`)
+
+    :param products: Reduced data products to record during offscreen simulations.
+
+    :param output_scheduler: Decides at which frames psi_val is saved
+        during offscreen simulations. If None, every steps_per_npz steps are saved.
+
+    :param input_path: Path of an existing movieNNN directory to append to
+        during offscreen simulations (to resume a run). If None, a new one is created.
+
+    :param video_sink: If True, the frames of the animation are piped directly into
+        ffmpeg instead of being saved as pictures first.
+
+    :param frames_per_segment: If not None, the movie is encoded in segments
+        of this length on multiple processes.
+
+    :param record_first: If True, the matplotlib animation (1D, 2D) runs the solver first
+        and renders the movie from cached frames afterwards.
+
+    :param live_thread: If True, the mayavi animation (3D) does the time steps on a
+        background thread and shows the newest density (dropping frames)
+        instead of doing the steps between the frames.
+
+    :param render_2d: How the matplotlib animation draws 2D systems,
+        "surface" (3D surface with contours) or "heatmap" (fast, z_lim used as color limits).
+
     :return: Referenz to Schroedinger System
 
     """
     if System.dim < 3:
         # matplotlib for 1D and 2D
-        MatplotlibAnim = MatplotlibAnimation.MatplotlibAnimation(Anim)
+        MatplotlibAnim = MatplotlibAnimation.MatplotlibAnimation(Anim,
+                                                                 render_2d=render_2d,
+                                                                 clim=z_lim)
         if MatplotlibAnim.dim == 1:
             MatplotlibAnim.set_limits(0, 0, *x_lim, *y_lim)
         elif MatplotlibAnim.dim == 2:
             MatplotlibAnim.ax.set_xlim(*x_lim)
             MatplotlibAnim.ax.set_ylim(*y_lim)
-            MatplotlibAnim.ax.set_zlim(*z_lim)
+            if render_2d == "surface":
+                MatplotlibAnim.ax.set_zlim(*z_lim)
 
         # Animation.set_limits_smart(0, System)
 
@@ -89,7 +132,19 @@ def simulate_case(System: Schroedinger,
             MatplotlibAnim.start(
                 System,
                 accuracy=accuracy,
+                video_sink=video_sink,
+                frames_per_segment=frames_per_segment,
+                record_first=record_first,
             )
+
+        if use_registry:
+            # the movie has no movieNNN directory, so one with the metadata is registered
+            result_path = input_path if input_path is not None else get_path.new_path(dir_path)
+            System.save_metadata(Path(result_path, "schroedinger.json"))
+            # the animation does not report why it stopped
+            status = "diverged" if np.isnan(System.mu) else "finished"
+            Registry(dir_path).register(System, result_path, status=status,
+                                        accuracy=accuracy)
     else:
         if not offscreen:
             # mayavi for 3D
@@ -98,27 +153,52 @@ def simulate_case(System: Schroedinger,
                 slice_indices=slice_indices,
                 dir_path=dir_path,
                 offscreen=offscreen,
+                video_sink=video_sink,
             )
 
             with run_time.run_time(name="MayaviAnimation.animate"):
-                MayAnimator = MayAnim.animate(System, accuracy=accuracy,
-                                              interactive=(not offscreen),
-                                              )
+                if live_thread:
+                    MayAnimator = MayAnim.animate_live(System, accuracy=accuracy,
+                                                       interactive=(not offscreen),
+                                                       )
+                else:
+                    MayAnimator = MayAnim.animate(System, accuracy=accuracy,
+                                                  interactive=(not offscreen),
+                                                  )
 
             with run_time.run_time(name="mlab.show"):
                     mlab.show()
 
+            if MayAnim.live_solver is not None:
+                # the window may be closed before the solver finished
+                MayAnim.live_solver.stop()
+                MayAnim.live_solver.join()
+
             result_path = MayAnim.create_movie(dir_path=dir_path,
                                                input_data_file_pattern="*.png",
-                                               delete_input=delete_input)
+                                               delete_input=delete_input,
+                                               frames_per_segment=frames_per_segment)
 
             cut_1d(System, slice_indices=slice_indices,
                    dir_path=result_path, y_lim=(0.0, 0.05))
+
+            if use_registry:
+                if MayAnim.live_solver is not None:
+                    status = MayAnim.live_solver.status
+                else:
+                    # the animation does not report why it stopped
+                    status = "diverged" if np.isnan(System.mu) else "finished"
+                Registry(dir_path).register(System, result_path, status=status,
+                                            accuracy=accuracy)
         else:
             System.simulate_raw(accuracy=accuracy,
                                 dir_path=dir_path,
                                 steps_per_npz=steps_per_npz,
                                 frame_start=frame_start,
+                                use_registry=use_registry,
+                                products=products,
+                                output_scheduler=output_scheduler,
+                                input_path=input_path,
                                 )
 
         return System
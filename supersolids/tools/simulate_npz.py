@@ -13,15 +13,17 @@ time-dependent Schrodinger equation for 1D, 2D and 3D in single-core.
 import argparse
 import functools
 import json
+import sys
 from pathlib import Path
 
-import dill
 import numpy as np
 
 from supersolids.Animation.Animation import Animation
 
 from supersolids.Schroedinger import Schroedinger
-from supersolids.helper import functions
+from supersolids.helper import functions, output_scheduler, products, resample
+from supersolids.helper.manifest import Manifest
+from supersolids.helper.registry import Registry, statuses_ended
 from supersolids.tools.simulate_case import simulate_case
 
 # Script runs, if script is run as main script (called by python *.py)
@@ -36,11 +38,14 @@ if __name__ == "__main__":
     parser.add_argument("-Res", metavar="Resolution", type=json.loads,
                         default=None,
                         help="Dictionary of resolutions for the box (1D, 2D, 3D). "
-                             "Needs to be 2 ** int.")
+                             "Needs to be 2 ** int. If it differs from the loaded System, "
+                             "psi_val is resampled by Fourier zero-padding or truncation.")
     parser.add_argument("-Box", metavar="Box", type=json.loads,
                         default=None,
                         help=("Dictionary for the Box dimensionality. "
-                              "Two values per dimension to set start and end (1D, 2D, 3D)."))
+                              "Two values per dimension to set start and end (1D, 2D, 3D). "
+                              "If it differs from the loaded System, psi_val is resampled "
+                              "by band-limited interpolation."))
     parser.add_argument("-w", metavar="Trap frequency", type=json.loads,
                         default=None,
                         help="Frequency of harmonic trap in x, y, z direction. If None, "
@@ -66,8 +71,9 @@ if __name__ == "__main__":
                              "For example the standard naming convention is movie001")
     parser.add_argument("-filename_schroedinger",
                         metavar="filename_schroedinger", type=str,
-                        default="schroedinger.pkl",
-                        help="Name of file, where the Schroedinger object is saved")
+                        default="schroedinger.json",
+                        help="Name of file, where the Schroedinger metadata is saved "
+                             "(schroedinger.pkl for older runs)")
     parser.add_argument("-filename_npz", metavar="filename_npz",
                         type=str, default="step_" + "%06d" % 0 + ".npz",
                         help="Name of file, where psi_val is saved. "
@@ -75,6 +81,28 @@ if __name__ == "__main__":
     parser.add_argument("-steps_per_npz", metavar="steps_per_npz",
                         type=int, default=10,
                         help="Number of dt steps skipped between saved npz.")
+    parser.add_argument("-save_policy", metavar="save_policy", type=str, default="steps",
+                        choices=output_scheduler.policies,
+                        help="When to save psi_val: every steps_per_npz steps (steps), "
+                             "every save_seconds (wall_clock) or when the relative change "
+                             "of the density exceeds save_change (change). "
+                             "The final frame is always saved.")
+    parser.add_argument("-save_seconds", metavar="save_seconds", type=float, default=60.0,
+                        help="Wall-clock seconds between saved npz for -save_policy=wall_clock.")
+    parser.add_argument("-save_change", metavar="save_change", type=float, default=10 ** -2,
+                        help="Relative L2 change of the density since the last saved npz "
+                             "needed to save the next one for -save_policy=change.")
+    parser.add_argument("-steps_per_products", metavar="steps_per_products",
+                        type=int, default=None,
+                        help="Number of dt steps between recorded reduced data products "
+                             "(slices, cuts, column densities). If None, none are recorded.")
+    parser.add_argument("-products", metavar="products", type=str, nargs="+",
+                        default=["slices", "cuts"], choices=products.kinds,
+                        help=f"Reduced data products to record. Any of {products.kinds}")
+    parser.add_argument("--resume", default=False, action="store_true",
+                        help="Resume the interrupted run dir_name offscreen from its last "
+                             "valid frame and append to it (instead of a new directory). "
+                             "filename_npz is ignored, the frame is found via the manifest.")
     parser.add_argument("--offscreen", default=False, action="store_true",
                         help="If not used, interactive animation is shown and saved as mp4."
                              "If used, Schroedinger is saved as pkl and allows offscreen usage.")
@@ -98,105 +126,157 @@ if __name__ == "__main__":
                                 filename="anim.mp4",
                                 )
 
-    try:
-        print("Load schroedinger")
-        with open(schroedinger_path, "rb") as f:
-            # WARNING: this is just the input Schroedinger at t=0
-            System_loaded = dill.load(file=f)
+    if args.steps_per_products is None:
+        Products = None
+    else:
+        Products = products.Products(steps_per_products=args.steps_per_products,
+                                     products=args.products)
+
+    Scheduler = output_scheduler.get_scheduler(policy=args.save_policy,
+                                               steps_per_npz=args.steps_per_npz,
+                                               seconds=args.save_seconds,
+                                               threshold=args.save_change)
 
-        print(f"File at {schroedinger_path} loaded.")
+    if args.resume:
+        # continue the interrupted run at its last valid frame (found via the manifest)
+        # and append to the same directory, keeping t, mu and the frame counter
+        row = Registry(dir_path).get(args.dir_name)
+        for status_end in [Manifest(input_path).get_status(), row and row["status"]]:
+            if status_end in statuses_ended:
+                sys.exit(f"The run in {input_path} already ended ({status_end}), "
+                         "it is not resumed.")
+        System, entry = Schroedinger.load_last_frame(
+            input_path, filename_schroedinger=args.filename_schroedinger)
+        frame = entry["frame"] + 1
+        System.max_timesteps = entry.get("frame_end", frame + args.max_timesteps) - frame
+        print(f"Resume {input_path} at frame {frame} (t={System.t}).")
+
+        SystemResult: Schroedinger = simulate_case(
+            System=System,
+            Anim=Anim,
+            accuracy=args.accuracy,
+            dir_path=dir_path,
+            offscreen=True,
+            steps_per_npz=args.steps_per_npz,
+            frame_start=frame,
+            products=Products,
+            output_scheduler=Scheduler,
+            input_path=input_path,
+            )
+
+    else:
         try:
-            # get the psi_val of Schroedinger at other timesteps (t!=0)
-            with open(psi_val_path, "rb") as f:
-                System_loaded.psi_val = np.load(file=f)["psi_val"]
-
-            # get the frame number as it encodes the number steps dt,
-            # so System.t can be reconstructed
-            frame = int(args.filename_npz.split(".npz")[0].split("_")[-1])
-            System_loaded.t = System_loaded.dt * frame
-            System_loaded.max_timesteps = args.max_timesteps
-
-            if args.Box is None:
-                Box: functions.Box = System_loaded.Box
-            else:
-                Box = functions.Box(**args.Box)
-
-            if args.Res is None:
-                Res: functions.Resolution = System_loaded.Res
-            else:
-                Res = functions.Resolution(**args.Res)
-
-            if args.w is None:
-                w_x = System_loaded.w_x
-                w_y = System_loaded.w_y
-                w_z = System_loaded.w_z
-                alpha_y, alpha_z = functions.get_alphas(w_x=w_x, w_y=w_y, w_z=w_z)
-            else:
-                w_x = args.w["w_x"]
-                w_y = args.w["w_y"]
-                w_z = args.w["w_z"]
-                alpha_y, alpha_z = functions.get_alphas(w_x=w_x, w_y=w_y, w_z=w_z)
-
-            V_loaded = functools.partial(functions.v_harmonic_3d,
-                                         alpha_y=alpha_y,
-                                         alpha_z=alpha_z)
-
-            if args.V is None:
-                V = V_loaded
-            else:
-                if System_loaded.V is None:
-                    V = (lambda x, y, z: args.V(x, y, z))
+            print("Load schroedinger")
+            # WARNING: this is just the input Schroedinger at t=0
+            System_loaded = Schroedinger.load(schroedinger_path)
+
+            print(f"File at {schroedinger_path} loaded.")
+            try:
+                # get the psi_val of Schroedinger at other timesteps (t!=0)
+                with open(psi_val_path, "rb") as f:
+                    System_loaded.psi_val = np.load(file=f)["psi_val"]
+
+                # get the frame number as it encodes the number steps dt,
+                # so System.t can be reconstructed
+                frame = int(args.filename_npz.split(".npz")[0].split("_")[-1])
+                System_loaded.t = System_loaded.dt * frame
+                System_loaded.max_timesteps = args.max_timesteps
+
+                if args.Box is None:
+                    Box: functions.Box = System_loaded.Box
                 else:
-                    V = (lambda x, y, z: V_loaded(x, y, z) + args.V(x, y, z))
-
-            System: Schroedinger = Schroedinger(System_loaded.N,
-                                                Box,
-                                                Res,
-                                                max_timesteps=args.max_timesteps,
-                                                dt=args.dt,
-                                                dt_func=System_loaded.dt_func,
-                                                g=System_loaded.g,
-                                                g_qf=System_loaded.g_qf,
-                                                w_x=w_x,
-                                                w_y=w_y,
-                                                w_z=w_z,
-                                                a_s=System_loaded.a_s,
-                                                e_dd=System_loaded.e_dd,
-                                                imag_time=System_loaded.imag_time,
-                                                mu=System_loaded.mu,
-                                                E=System_loaded.E,
-                                                V=V,
-                                                psi_0_noise=None
-                                                )
-
-            # As psi_0_noise needs to be applied on the loaded psi_val and not the initial psi_val
-            # we apply noise after loading the old System
-            if args.noise is None:
-                System.psi_val = System_loaded.psi_val
-            else:
-                psi_0_noise_3d: np.ndarray = functions.noise_mesh(
-                    min=args.noise[0],
-                    max=args.noise[1],
-                    shape=(Res.x, Res.y, Res.z)
+                    Box = functions.Box(**args.Box)
+
+                if args.Res is None:
+                    Res: functions.Resolution = System_loaded.Res
+                else:
+                    Res = functions.Resolution(**args.Res)
+
+                if args.w is None:
+                    w_x = System_loaded.w_x
+                    w_y = System_loaded.w_y
+                    w_z = System_loaded.w_z
+                    alpha_y, alpha_z = functions.get_alphas(w_x=w_x, w_y=w_y, w_z=w_z)
+                else:
+                    w_x = args.w["w_x"]
+                    w_y = args.w["w_y"]
+                    w_z = args.w["w_z"]
+                    alpha_y, alpha_z = functions.get_alphas(w_x=w_x, w_y=w_y, w_z=w_z)
+
+                V_loaded = functools.partial(functions.v_harmonic_3d,
+                                             alpha_y=alpha_y,
+                                             alpha_z=alpha_z)
+
+                if args.V is None:
+                    V = V_loaded
+                else:
+                    if System_loaded.V is None:
+                        V = (lambda x, y, z: args.V(x, y, z))
+                    else:
+                        V = (lambda x, y, z: V_loaded(x, y, z) + args.V(x, y, z))
+
+                System: Schroedinger = Schroedinger(System_loaded.N,
+                                                    Box,
+                                                    Res,
+                                                    max_timesteps=args.max_timesteps,
+                                                    dt=args.dt,
+                                                    dt_func=System_loaded.dt_func,
+                                                    g=System_loaded.g,
+                                                    g_qf=System_loaded.g_qf,
+                                                    w_x=w_x,
+                                                    w_y=w_y,
+                                                    w_z=w_z,
+                                                    a_s=System_loaded.a_s,
+                                                    e_dd=System_loaded.e_dd,
+                                                    imag_time=System_loaded.imag_time,
+                                                    mu=System_loaded.mu,
+                                                    E=System_loaded.E,
+                                                    V=V,
+                                                    psi_0_noise=None
+                                                    )
+
+                # map the loaded psi_val onto the new grid, if Res or Box changed
+                psi_val_loaded: np.ndarray = resample.resample(System_loaded.psi_val,
+                                                               System_loaded.Box,
+                                                               System_loaded.Res,
+                                                               Box,
+                                                               Res)
+                if psi_val_loaded is not System_loaded.psi_val:
+                    print(f"psi_val resampled from Box={System_loaded.Box}, "
+                          f"Res={System_loaded.Res} to Box={Box}, Res={Res}.")
+                    psi_val_loaded = psi_val_loaded / np.sqrt(
+                        System.get_norm_trapez(np.abs(psi_val_loaded) ** 2.0))
+
+                # As psi_0_noise needs to be applied on the loaded psi_val and not the initial psi_val
+                # we apply noise after loading the old System
+                if args.noise is None:
+                    System.psi_val = psi_val_loaded
+                else:
+                    psi_0_noise_3d: np.ndarray = functions.noise_mesh(
+                        min=args.noise[0],
+                        max=args.noise[1],
+                        shape=(Res.x, Res.y, Res.z)
+                        )
+                    System.psi_val = psi_0_noise_3d * psi_val_loaded
+
+                SystemResult: Schroedinger = simulate_case(
+                    System=System,
+                    Anim=Anim,
+                    accuracy=args.accuracy,
+                    delete_input=True,
+                    dir_path=dir_path,
+                    offscreen=args.offscreen,
+                    x_lim=(-2.0, 2.0),  # from here just matplotlib
+                    y_lim=(-2.0, 2.0),
+                    z_lim=(0, 0.5),
+                    steps_per_npz=args.steps_per_npz,
+                    frame_start=frame,
+                    products=Products,
+                    output_scheduler=Scheduler,
                     )
-                System.psi_val = psi_0_noise_3d * System_loaded.psi_val
-
-            SystemResult: Schroedinger = simulate_case(
-                System=System,
-                Anim=Anim,
-                accuracy=args.accuracy,
-                delete_input=True,
-                dir_path=dir_path,
-                offscreen=args.offscreen,
-                x_lim=(-2.0, 2.0),  # from here just matplotlib
-                y_lim=(-2.0, 2.0),
-                z_lim=(0, 0.5),
-                steps_per_npz=args.steps_per_npz,
-                frame_start=frame,
-                )
 
-        except FileNotFoundError:
-            print(f"File at {psi_val_path} not found.")
+            except FileNotFoundError:
+                print(f"File at {psi_val_path} not found.")
 
-    except FileNotFoundError:
-        print(f"File at {schroedinger_path} not found.")
+        except FileNotFoundError:
+            print(f"File at {schroedinger_path} not found.")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Worker pulling cases from a work queue on a shared directory
+(see :mod:`supersolids.helper.work_queue`).
+Start any number of them on any hosts seeing queue_path, e.g.:
+python -m supersolids.worker -queue_path=/shared/supersolids/queue
+
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from supersolids.helper.work_queue import WorkQueue, get_worker_name, run_task
+
+# Script runs, if script is run as main script (called by python *.py)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run cases of a shared work queue.")
+    parser.add_argument("-queue_path", metavar="queue_path", type=str,
+                        default="~/supersolids/queue",
+                        help="Absolute path of the queue directory (shared by all hosts)")
+    parser.add_argument("-lease_seconds", metavar="lease_seconds", type=float, default=300.0,
+                        help="Leases without heartbeat for this long are requeued.")
+    parser.add_argument("-heartbeat_seconds", metavar="heartbeat_seconds", type=float,
+                        default=30.0,
+                        help="Interval of the heartbeat of a running case. "
+                             "Needs to be well below lease_seconds.")
+    parser.add_argument("-poll_seconds", metavar="poll_seconds", type=float, default=5.0,
+                        help="Interval of looking for new cases, while the queue is empty.")
+    parser.add_argument("-idle_seconds", metavar="idle_seconds", type=float, default=None,
+                        help="Exit, when the queue was empty for this long. "
+                             "Default: wait forever.")
+    parser.add_argument("-max_cases", metavar="max_cases", type=int, default=None,
+                        help="Exit after this many cases. Default: no limit.")
+    args = parser.parse_args()
+    print(f"args: {args}")
+
+    queue = WorkQueue(Path(args.queue_path).expanduser(), lease_seconds=args.lease_seconds)
+    worker_name = get_worker_name()
+    cases = 0
+    idle_start = time.perf_counter()
+    while (args.max_cases is None) or (cases < args.max_cases):
+        requeued = queue.requeue_stale()
+        if requeued:
+            print(f"worker {worker_name}: requeued stale tasks {requeued}")
+
+        claimed = queue.claim()
+        if claimed is None:
+            if ((args.idle_seconds is not None)
+                    and (time.perf_counter() - idle_start > args.idle_seconds)):
+                print(f"worker {worker_name}: queue empty for {args.idle_seconds}s, exit.")
+                break
+            time.sleep(args.poll_seconds)
+            continue
+
+        task_id, task = claimed
+        print(f"worker {worker_name}: running task {task_id}")
+        result = run_task(queue, task_id, task, heartbeat_seconds=args.heartbeat_seconds)
+        status = "failed" if "exception" in result else "done"
+        print(f"worker {worker_name}: task {task_id} {status}, {queue.count()}")
+        cases += 1
+        idle_start = time.perf_counter()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Checks the order parameters of 2D states (array axes (y, x)) with non-square grids.
+
+"""
+
+import numpy as np
+
+from supersolids.helper.phase_diagram import classify, get_order_parameters, get_profile
+
+
+def test_profile_2d_along_x():
+    x = np.linspace(-8.0, 8.0, 128)
+    y = np.linspace(-2.0, 2.0, 16)
+    # three droplets along x, layout of np.meshgrid: shape (Res.y, Res.x)
+    x_mesh, y_mesh = np.meshgrid(x, y)
+    psi_val = np.sqrt(sum(np.exp(-8.0 * (x_mesh - x_0) ** 2) for x_0 in [-4.0, 0.0, 4.0])
+                      * np.exp(-y_mesh ** 2))
+
+    assert get_profile(psi_val).shape == (128,)
+    order_parameters = get_order_parameters(psi_val)
+    assert order_parameters["peaks"] == 3.0
+    assert classify(order_parameters) == "droplets"
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Checks the axis order of the reductions (2D grids of the solver are (y, x)).
+
+"""
+
+import numpy as np
+
+from supersolids.helper.products import reduce_density
+
+
+def test_reduce_density_2d_non_square():
+    res_x, res_y = 64, 16
+    dx, dy = 0.5, 0.25
+    x = np.arange(res_x)
+    y = np.arange(res_y)
+    # layout of np.meshgrid as used by the solver: shape (Res.y, Res.x)
+    x_mesh, y_mesh = np.meshgrid(x, y)
+    density = 1.0 + x_mesh + 100.0 * y_mesh
+
+    reduced = reduce_density(density, [dx, dy],
+                             products=["slices", "cuts", "column_densities"],
+                             slice_indices=[3, 5, None])
+
+    assert reduced["cut_x"].shape == (res_x,)
+    assert reduced["cut_y"].shape == (res_y,)
+    np.testing.assert_allclose(reduced["cut_x"], 1.0 + x + 100.0 * 5)
+    np.testing.assert_allclose(reduced["cut_y"], 1.0 + 3 + 100.0 * y)
+
+    # integrated along x with dx, a function of y
+    assert reduced["column_x"].shape == (res_y,)
+    np.testing.assert_allclose(reduced["column_x"], density.sum(axis=1) * dx)
+    assert reduced["column_y"].shape == (res_x,)
+    np.testing.assert_allclose(reduced["column_y"], density.sum(axis=0) * dy)
+
+    assert reduced["density"].shape == (res_y, res_x)
+
+
+def test_reduce_density_3d_non_square():
+    shape = (12, 8, 4)
+    density = np.random.default_rng(0).random(shape)
+    reduced = reduce_density(density, [0.5, 0.25, 0.125],
+                             products=["slices", "cuts", "column_densities"])
+
+    assert reduced["cut_x"].shape == (12,)
+    assert reduced["cut_z"].shape == (4,)
+    assert reduced["slice_x"].shape == (8, 4)
+    assert reduced["column_z"].shape == (12, 8)
+    np.testing.assert_allclose(reduced["column_x"], density.sum(axis=0) * 0.5)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Checks the orientation of rendered 2D and 3D reductions with non-square grids.
+
+"""
+
+import numpy as np
+
+from supersolids.helper.products import reduce_density
+from supersolids.tools.render_npz import get_axes, get_image, render_frame
+
+products = ["slices", "cuts", "column_densities"]
+
+
+def test_render_frame_2d_non_square():
+    box = {"x0": -8.0, "x1": 8.0, "y0": -2.0, "y1": 2.0, "z0": None, "z1": None}
+    res = {"x": 64, "y": 16, "z": None}
+    axes = get_axes(box, res)
+    x_mesh, y_mesh = np.meshgrid(*axes)
+    reduced = reduce_density(np.exp(-x_mesh ** 2 - y_mesh ** 2), [0.25, 0.25],
+                             products=products)
+
+    # x horizontal, y vertical
+    values, shown = get_image("density", reduced["density"], 2)
+    assert shown == [0, 1]
+    assert values.shape == (res["y"], res["x"])
+
+    rgb = render_frame(None, reduced, axes, products, dpi=50)
+    assert rgb.ndim == 3
+
+
+def test_get_image_3d_non_square():
+    density = np.zeros((12, 8, 4))
+    reduced = reduce_density(density, [1.0, 1.0, 1.0], products=products)
+
+    # slice at fixed x: y horizontal, z vertical
+    values, shown = get_image("slice_x", reduced["slice_x"], 3)
+    assert shown == [1, 2]
+    assert values.shape == (4, 8)
+
+    values, shown = get_image("column_z", reduced["column_z"], 3)
+    assert shown == [0, 1]
+    assert values.shape == (8, 12)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Checks resampling of 2D states (array axes (y, x)) with non-square grids.
+
+"""
+
+import numpy as np
+
+from supersolids.helper import functions
+from supersolids.helper.resample import get_box_axes, resample
+
+
+def gauss_2d(Box: functions.Box, Res: functions.Resolution) -> np.ndarray:
+    y, x = get_box_axes(Box, Res)
+    x_mesh, y_mesh = np.meshgrid(x, y)
+
+    return np.exp(-(x_mesh - 0.5) ** 2 - 4.0 * y_mesh ** 2)
+
+
+def test_resample_fourier_2d_non_square():
+    Box = functions.Box(x0=-8.0, x1=8.0, y0=-2.0, y1=2.0)
+    Res_old = functions.Resolution(x=64, y=16)
+    Res_new = functions.Resolution(x=128, y=16)
+
+    psi_new = resample(gauss_2d(Box, Res_old), Box, Res_old, Box, Res_new)
+
+    assert psi_new.shape == (16, 128)
+    np.testing.assert_allclose(psi_new, gauss_2d(Box, Res_new), atol=1e-6)
+
+
+def test_resample_band_limited_2d_non_square():
+    Box_old = functions.Box(x0=-8.0, x1=8.0, y0=-2.0, y1=2.0)
+    Res_old = functions.Resolution(x=64, y=32)
+    Box_new = functions.Box(x0=-6.0, x1=6.0, y0=-1.5, y1=1.5)
+    Res_new = functions.Resolution(x=48, y=16)
+
+    psi_new = resample(gauss_2d(Box_old, Res_old), Box_old, Res_old, Box_new, Res_new)
+
+    assert psi_new.shape == (16, 48)
+    np.testing.assert_allclose(psi_new, gauss_2d(Box_new, Res_new), atol=1e-4)
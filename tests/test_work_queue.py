@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# author: Daniel Scheiermann
+# email: daniel.scheiermann@stud.uni-hannover.de
+# license: MIT
+# Please feel free to use and modify this, but keep the above information.
+
+"""
+Checks claims, stale leases and results of the work queue.
+
+"""
+
+import os
+from pathlib import Path
+
+from supersolids.helper.work_queue import WorkQueue
+
+
+def make_stale(queue: WorkQueue, task_id: str) -> None:
+    for lease_path in Path(queue.queue_path, "leases").glob(task_id + ".*"):
+        os.utime(lease_path, (0.0, 0.0))
+
+
+def test_claim_of_old_pending_task_is_not_stale(tmp_path):
+    queue = WorkQueue(tmp_path, lease_seconds=60.0)
+    task_id = queue.put(print, "case")
+    os.utime(queue.get_path("pending", task_id), (0.0, 0.0))
+
+    claimed_id, task = queue.claim()
+
+    assert claimed_id == task_id
+    assert queue.requeue_stale() == []
+    assert queue.finish(task_id, {"result": 1}, claim=task["claim"])
+    assert queue.count() == {"pending": 0, "leases": 0, "done": 1}
+
+
+def test_requeued_task_finished_by_first_worker(tmp_path):
+    queue = WorkQueue(tmp_path, lease_seconds=60.0)
+    task_id = queue.put(print, "case")
+    _, task = queue.claim()
+    make_stale(queue, task_id)
+    assert queue.requeue_stale() == [task_id]
+
+    # the first worker still finishes, before another one claims the requeued copy
+    assert queue.finish(task_id, {"result": 1}, claim=task["claim"])
+    assert queue.claim() is None
+    assert queue.count() == {"pending": 0, "leases": 0, "done": 1}
+
+
+def test_requeued_task_claimed_again_saves_one_result(tmp_path):
+    queue = WorkQueue(tmp_path, lease_seconds=60.0)
+    task_id = queue.put(print, "case")
+    _, task_first = queue.claim()
+    make_stale(queue, task_id)
+    queue.requeue_stale()
+    _, task_second = queue.claim()
+
+    assert not queue.heartbeat(task_id, task_first["claim"])
+    assert not queue.finish(task_id, {"result": 1}, claim=task_first["claim"])
+    assert queue.finish(task_id, {"result": 2}, claim=task_second["claim"])
+
+    assert queue.get_result(task_id) == {"result": 2}
+    queue.remove_result(task_id)
+    assert queue.count() == {"pending": 0, "leases": 0, "done": 0}
+    assert not list(Path(tmp_path, "requeue").iterdir())